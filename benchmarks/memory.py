@@ -0,0 +1,117 @@
+"""Memory benchmark for `org2ical.loads()`.
+
+Reports the peak memory allocated by each conversion phase, measured with
+`tracemalloc`, over a synthetic corpus and any org files given on the
+command line::
+
+    python benchmarks/memory.py [--headings N] [FILE.org ...]
+
+Phases:
+
+* `fix`: the `_fix_time_format` copy of the input
+* `parse`: the orgparse tree
+* `events`: the list of converted events (`ical_entries`)
+* `dumps`: the final joined iCalendar string
+
+Each phase is traced on its own, so its peak excludes memory retained by
+earlier phases. `peak` is the peak of a traced end-to-end `loads()` call.
+"""
+
+import argparse
+import random
+import sys
+import tracemalloc
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Tuple
+
+import org2ical
+
+PHASES = ["fix", "parse", "events", "dumps"]
+# The options of the synthetic workload, shared with `threads.py`.
+NOW = datetime(2021, 1, 1, tzinfo=timezone.utc)
+INCLUDE_TYPES = {org2ical.DEADLINE, org2ical.SCHEDULED, org2ical.TIMESTAMP,
+                 org2ical.CLOCK, org2ical.BIRTHDAY, org2ical.DIARY}
+
+
+def synthetic_org(headings: int, seed: int = 0) -> str:
+    """Returns an org string exercising every event type."""
+    rng = random.Random(seed)
+    lines: List[str] = []
+    for i in range(headings):
+        day = date(2020, 1, 1) + timedelta(days=rng.randrange(1000))
+        stamp = day.strftime("%Y-%m-%d %a")
+        kind = i % 6
+        level = "*" * (1 + i % 3)
+        if kind == 0:
+            lines += [f"{level} TODO Task {i}", f"SCHEDULED: <{stamp}>"]
+        elif kind == 1:
+            lines += [f"{level} TODO Deadline {i} :work:", f"DEADLINE: <{stamp} +1w>"]
+        elif kind == 2:
+            lines += [f"{level} Meeting {i}", f"  <{stamp} {rng.randrange(8, 18)}:00-{rng.randrange(18, 20)}:30>"]
+        elif kind == 3:
+            lines += [f"{level} Clocked {i}", ":LOGBOOK:"]
+            lines += [f"CLOCK: [{stamp} 09:{m:02d}]--[{stamp} 10:{m:02d}] =>  1:00"
+                      for m in range(0, 60, 15)]
+            lines += [":END:"]
+        elif kind == 4:
+            lines += [f"{level} Contact {i}", ":PROPERTIES:",
+                      f":BIRTHDAY: {1950 + i % 50}-0{1 + i % 9}-1{i % 9}", ":END:"]
+        else:
+            lines += [f"{level} Regular {i}", f"  <%%(diary-float t {i % 7} {1 + i % 4})>"]
+        lines += ["Some notes about this entry, long enough to be realistic."] * (i % 4)
+    return "\n".join(lines) + "\n"
+
+
+def _traced(fn: Callable[[], Any]) -> Tuple[Any, int]:
+    """Runs `fn` with tracemalloc and returns its result and peak bytes."""
+    tracemalloc.start()
+    try:
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+
+def measure(org_str: str) -> Dict[str, int]:
+    """Returns the peak bytes of each phase, of a full conversion (`peak`),
+    the input size in bytes (`input`) and the number of events."""
+    import orgparse  # pylint: disable=import-outside-toplevel
+
+    converter = org2ical.Converter(now=NOW, include_types=INCLUDE_TYPES)
+    stats: Dict[str, int] = {"input": len(org_str.encode("utf-8"))}
+    fixed, stats["fix"] = _traced(lambda: org2ical._fix_time_format(org_str))
+    env = orgparse.OrgEnv(filename=None, todos=converter.todo_states,
+                          dones=converter.done_states)
+    source, stats["parse"] = _traced(lambda: orgparse.loads(fixed, None, env=env))
+    (events, _), stats["events"] = _traced(lambda: converter.events(source, now=NOW))
+    _, stats["dumps"] = _traced(lambda: converter.dumps(events, now=NOW))
+    del fixed, source
+    _, stats["peak"] = _traced(lambda: converter.loads(org_str))
+    stats["events_count"] = len(events)
+    return stats
+
+
+def _report(name: str, stats: Dict[str, int]) -> None:
+    mb = 1024 * 1024
+    print(f"{name}: {stats['input'] / mb:.2f} MB input, {stats['events_count']} events")
+    for phase in PHASES + ["peak"]:
+        print(f"  {phase:7s} {stats[phase] / mb:8.2f} MB")
+    print(f"  {stats['peak'] / max(stats['events_count'], 1):8.0f} B/event, "
+          f"{stats['peak'] / stats['input']:.1f} B per input byte")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="*", help="org files to measure")
+    parser.add_argument("--headings", type=int, default=20000,
+                        help="headings in the synthetic corpus")
+    args = parser.parse_args()
+    _report(f"synthetic ({args.headings} headings)", measure(synthetic_org(args.headings)))
+    for path in args.files:
+        with open(path, "r", encoding="utf-8") as f:
+            _report(path, measure(f.read()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""Thread scaling benchmark for `org2ical.loads_many()`.
+
+Converts a corpus of synthetic org documents with pools of 1, 2, 4, ...
+threads (up to the CPU count) and reports the throughput of each pool
+relative to a single thread::
+
+    python benchmarks/threads.py [--documents N] [--headings N] [--threads N ...]
+
+Conversion only scales with threads on a free-threaded build of CPython
+(3.13t and later, e.g. `python3.13t benchmarks/threads.py`); with the GIL,
+every pool size converts at about the speed of one thread. The output of
+every pool is checked against a serial conversion.
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import List, Sequence, Tuple
+
+import org2ical
+
+from memory import INCLUDE_TYPES, NOW, synthetic_org  # pylint: disable=wrong-import-order
+
+
+def gil_enabled() -> bool:
+    """Whether the GIL is enabled (always, before Python 3.13)."""
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled() if is_gil_enabled is not None else True
+
+
+def measure(documents: Sequence[str], threads: Sequence[int], repeat: int = 3) -> List[Tuple[int, float]]:
+    """Returns the best documents per second for each pool size."""
+    options = {"now": NOW, "include_types": INCLUDE_TYPES}
+    expected = [org2ical.loads(doc, **options) for doc in documents]
+    results = []
+    for workers in threads:
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            converted = org2ical.loads_many(documents, max_workers=workers, **options)
+            best = min(best, time.perf_counter() - start)
+            if converted != expected:
+                raise AssertionError(f"{workers} threads converted differently")
+        results.append((workers, len(documents) / best))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=64,
+                        help="documents in the corpus")
+    parser.add_argument("--headings", type=int, default=200,
+                        help="headings per document")
+    parser.add_argument("--threads", type=int, nargs="+",
+                        help="pool sizes (default: powers of two up to the CPU count)")
+    args = parser.parse_args()
+    threads = args.threads
+    if not threads:
+        cpus = os.cpu_count() or 1
+        threads = [1 << i for i in range(cpus.bit_length()) if 1 << i <= cpus]
+    documents = [synthetic_org(args.headings, seed=i) for i in range(args.documents)]
+    print(f"Python {sys.version.split()[0]}, GIL {'enabled' if gil_enabled() else 'disabled'}, "
+          f"{args.documents} documents of {args.headings} headings")
+    results = measure(documents, threads)
+    base = results[0][1]
+    for workers, throughput in results:
+        print(f"  {workers:3d} threads {throughput:8.1f} documents/s  {throughput / base:5.2f}x")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,47 +1,36 @@
-"""Converts a org-mode string to an iCalendar string."""
+"""Converts a org-mode string to an iCalendar string.
+
+Submodules that only some conversions need (`clock`, `diary`, `include`,
+`lint`, `recurrence`, `selector`, `series`) are imported where they are
+used, and on first access as attributes of `org2ical`, to keep
+`import org2ical` (and the CLI startup) cheap.
+"""
 
 # pylint: disable=too-many-locals
 # pylint: disable=too-many-arguments
 # pylint: disable=protected-access
 # pylint: disable=too-many-branches
 # pylint: disable=too-many-statements
-import hashlib
-import textwrap
 from datetime import date, datetime, timezone, timedelta
-from typing import List, Optional, Set, Tuple, Union
+import time
+from typing import (TYPE_CHECKING, Any, Callable, Dict, Iterable, List, NamedTuple, Optional,
+                    Set, Tuple, Union)
+import importlib
 import re
 
-import orgparse
+from org2ical import diagnostics, extractors
+from org2ical.event import (BIRTHDAY, CLOCK, DAY, DEADLINE, DIARY, HEADING, SCHEDULED,
+                            TIMESTAMP, Event)
 
-DEADLINE = 'DEADLINE'
-SCHEDULED = 'SCHEDULED'
-TIMESTAMP = 'TIMESTAMP'
-CLOCK = 'CLOCK'
-BIRTHDAY = 'BIRTHDAY'
-DIARY = 'DIARY'
-# Ignore inactive timestamps
+if TYPE_CHECKING:
+    import orgparse
+    from org2ical import diary, include
 
+_LAZY_SUBMODULES = ("clock", "diary", "include", "lint", "recurrence", "selector", "series")
 
-def loads(
-        org_str: str,
-        *,
-        prod_id: str = "-//stefan2904//org2ical//EN",
-        now: datetime = datetime.now(tz=timezone.utc),
-        categories: Optional[Set[str]] = None,
-        ignore_states: Optional[Set[str]] = None,
-        ignore_tags: Optional[Set[str]] = None,
-        include_types: Optional[Set[str]] = None,
-        from_tz: timezone = timezone.utc,
-        to_tz: timezone = timezone.utc,
-        todo_states: Optional[List[str]] = None,
-        done_states: Optional[List[str]] = None,
-        just_entries: bool = False,
-        mytimezone: str = "",
-        mytimezoneid: str = "",
-        ) -> Tuple[str, List[str]]:
-    """Returns the generated ical string and a list of warnings."""
-
-    mytimezone = """
+_PROD_ID = "-//stefan2904//org2ical//EN"
+_VTIMEZONE_ID = "Europe/Vienna"
+_VTIMEZONE = """
 BEGIN:VTIMEZONE
 TZID:Europe/Vienna
 X-LIC-LOCATION:Europe/Vienna
@@ -61,357 +50,684 @@ RRULE:FREQ=YEARLY;UNTIL=20361026T010000Z;BYDAY=-1SU;BYMONTH=10
 END:STANDARD
 END:VTIMEZONE"""
 
-    mytimezoneid = "Europe/Vienna"
-
-    mytimezoneprefix = ";TZID={}".format(mytimezoneid)
-
-    categories = (categories if categories is not None
-                  else set())
-    ignore_states = (ignore_states if ignore_states is not None
-                     else {"DONE", "CANCELED"})
-    ignore_tags = (ignore_tags if ignore_tags is not None
-                   else {"ARCHIVE"})
-    include_types = (include_types if include_types is not None
-                     else {DEADLINE, SCHEDULED, TIMESTAMP})
-    diff = include_types - {DEADLINE, SCHEDULED, TIMESTAMP, CLOCK, BIRTHDAY, DIARY}
-    todo_states = (todo_states if todo_states is not None
-                   else ["TODO"])
-    done_states = (done_states if done_states is not None
-                   else ["DONE"])
-    if len(diff) > 0:
-        raise ValueError(f"Invalid include_types: {diff}")
-    
-    def _fix_time_format(text: str) -> str:
-        # Define a regex pattern to match date and time formats like <YYYY-MM-DD DDD H:MM> or <YYYY-MM-DD DDD H:MM-H:MM>
-        pattern = re.compile(r'<(\d{4}-\d{2}-\d{2} \w{3}) (\d{1,2}:\d{2})(-(\d{1,2}:\d{2}))?>')
-        
-        def replacer(match):
-            # Extract the date and time parts from the match
-            date_part = match.group(1)
-            start_time = match.group(2)
-            end_time = match.group(4)
-            
-            # Ensure leading zero for single-digit hours
-            fixed_start = start_time.zfill(5)
-            fixed_end = end_time.zfill(5) if end_time else ''
-            
-            # Reconstruct the formatted time string
-            return f'<{date_part} {fixed_start}{"-" + fixed_end if fixed_end else ""}>'
-        
-        # Substitute all occurrences of the pattern in the input text
-        return pattern.sub(replacer, text)
-
-    def _encode_datetime(dt: datetime) -> str:
+
+class Limits(NamedTuple):
+    """Resource limits for untrusted input; `None` means unlimited.
+
+    Conversions that hit a limit stop cleanly, with the events found so
+    far and a `limit` warning.
+    """
+    max_input_bytes: Optional[int] = None  # Longer input is cut at a line break
+    max_nodes: Optional[int] = None
+    max_depth: Optional[int] = None  # Deeper headings are skipped
+    max_events: Optional[int] = None
+    max_body_length: Optional[int] = None  # Longer descriptions are cut
+    deadline: Optional[float] = None  # Seconds for extracting events
+
+
+def _construct_vcalendar(ical_entries_str: str, prod_id: str) -> str:
+    """Wraps already joined VEVENT entries into a VCALENDAR string."""
+    return f"""\
+BEGIN:VCALENDAR
+VERSION:2.0
+PRODID:{prod_id}{_VTIMEZONE}
+{ical_entries_str}
+END:VCALENDAR
+"""
+
+
+class Converter:
+    """Converts org-mode strings with a fixed set of options.
+
+    The options are validated once, so a converter can be reused for many
+    inputs. `loads()` is a shortcut for a one-off conversion.
+
+    A converter is reentrant: it is never modified after `__init__`, and
+    all state of a conversion is local to the call, so one converter can
+    be shared by any number of threads (see `loads_many()`).
+    """
+
+    def __init__(
+            self,
+            *,
+            prod_id: str = _PROD_ID,
+            now: Optional[datetime] = None,
+            categories: Optional[Set[str]] = None,
+            ignore_states: Optional[Set[str]] = None,
+            ignore_tags: Optional[Set[str]] = None,
+            include_types: Optional[Set[str]] = None,
+            from_tz: timezone = timezone.utc,
+            to_tz: timezone = timezone.utc,
+            todo_states: Optional[List[str]] = None,
+            done_states: Optional[List[str]] = None,
+            clock_merge: Optional[str] = None,
+            clock_merge_gap: timedelta = timedelta(0),
+            max_warnings: Optional[int] = None,
+            select: Optional[str] = None,
+            limits: Limits = Limits(),
+            collapse_series: bool = False,
+            dtstamp: Optional[datetime] = None,
+            ):
+        self.prod_id = prod_id
+        # `None` means the time of each conversion.
+        self.now = now
+        self.categories = (categories if categories is not None
+                           else set())
+        self.ignore_states = (ignore_states if ignore_states is not None
+                              else {"DONE", "CANCELED"})
+        self.ignore_tags = (ignore_tags if ignore_tags is not None
+                            else {"ARCHIVE"})
+        self.include_types = (include_types if include_types is not None
+                              else {DEADLINE, SCHEDULED, TIMESTAMP})
+        diff = self.include_types - set(extractors.names())
+        self.from_tz = from_tz
+        self.to_tz = to_tz
+        self.todo_states = (todo_states if todo_states is not None
+                            else ["TODO"])
+        self.done_states = (done_states if done_states is not None
+                            else ["DONE"])
+        if len(diff) > 0:
+            raise ValueError(f"Invalid include_types: {diff}")
+        if clock_merge not in (None, HEADING, DAY):
+            raise ValueError(f"Invalid clock_merge: {clock_merge}")
+        self.clock_merge = clock_merge
+        self.clock_merge_gap = clock_merge_gap
+        if max_warnings is not None and max_warnings < 0:
+            raise ValueError(f"Invalid max_warnings: {max_warnings}")
+        # `None` collects all warnings, `0` turns them off.
+        self.max_warnings = max_warnings
+        self.select = select
+        self._select: Optional[Callable[["orgparse.OrgNode"], bool]] = None
+        if select:
+            from org2ical import selector  # pylint: disable=import-outside-toplevel
+            self._select = selector.compile_selector(select)
+        if any(limit is not None and limit < 0 for limit in limits):
+            raise ValueError(f"Invalid limits: {limits}")
+        self.limits = limits
+        # Whether the TIMESTAMP events of a node become recurring events
+        # (see `org2ical.series`).
+        self.collapse_series = collapse_series
+        # `None` stamps events with `now`; a fixed value makes the output,
+        # including the UIDs hashed from it, depend on the input only.
+        self.dtstamp = dtstamp
+        self._markers = extractors.marker_table(self.include_types)
+        self.tzprefix = ";TZID={}".format(_VTIMEZONE_ID)
+
+    def parse(
+            self,
+            org_str: str,
+            *,
+            warnings: Optional[diagnostics.Warnings] = None,
+            ) -> "orgparse.node.OrgRootNode":
+        """Parses an org-mode string with this converter's TODO keywords.
+
+        Input beyond `limits.max_input_bytes` is dropped, with a warning
+        added to `warnings`.
+        """
+        # Imported here to keep `import org2ical` (and the CLI startup) cheap.
+        import orgparse  # pylint: disable=import-outside-toplevel
+
+        max_input_bytes = self.limits.max_input_bytes
+        if max_input_bytes is not None and len(org_str) * 4 > max_input_bytes:
+            data = org_str.encode("utf-8")
+            if len(data) > max_input_bytes:
+                data = data[:max_input_bytes]
+                org_str = data[:data.rfind(b"\n") + 1].decode("utf-8", errors="ignore")
+                if warnings is not None:
+                    warnings.add(diagnostics.LIMIT,
+                                 f"Input truncated to {max_input_bytes} bytes")
+        org_str = _fix_time_format(org_str) # fix (active) timestamps without leading zero
+        env = orgparse.OrgEnv(filename=None, todos=self.todo_states, dones=self.done_states)
+        return orgparse.loads(org_str, None, env=env)
+
+    def loads(
+            self,
+            org_str: str,
+            *,
+            just_entries: bool = False,
+            ) -> Tuple[str, List[diagnostics.OrgWarning]]:
+        """Returns the generated ical string and a list of warnings."""
+        now = self._now()
+        warnings = diagnostics.Warnings(self.max_warnings)
+        source = self.parse(org_str, warnings=warnings)
+        events, _ = self.events(source, now=now, warnings=warnings)
+        return self.dumps(events, now=now, just_entries=just_entries), warnings
+
+    def dumps(
+            self,
+            events: List[Event],
+            *,
+            now: Optional[datetime] = None,
+            just_entries: bool = False,
+            ) -> str:
+        """Serializes events into an ical string."""
+        now_str = self.encode_dtstamp(now)
+        ical_entries_str = "".join(
+            _construct_vevent(now_str, event) for event in events).strip()
+        if just_entries:
+            return ical_entries_str
+        return _construct_vcalendar(ical_entries_str, self.prod_id)
+
+    def events(
+            self,
+            source: "orgparse.node.OrgRootNode",
+            *,
+            now: Optional[datetime] = None,
+            warnings: Optional[diagnostics.Warnings] = None,
+            ) -> Tuple[List[Event], List[diagnostics.OrgWarning]]:
+        """Returns the events of a parsed org tree and a list of warnings,
+        appending to `warnings` if given."""
+        now = now if now is not None else self._now()
+        if warnings is None:
+            warnings = diagnostics.Warnings(self.max_warnings)
+        route = _Route(self, warnings)
+        _traverse(source, self, [route], now)
+        return route.finish()
+
+    def _day_clock_events(
+            self,
+            day_clocks: List[Tuple[datetime, datetime, str]],
+            ) -> List[Event]:
+        """Summarizes the clocks of each day into a single event."""
+        from org2ical import clock  # pylint: disable=import-outside-toplevel
+
+        days: Dict[date, List[Tuple[datetime, datetime, str]]] = {}
+        for d in day_clocks:
+            days.setdefault(d[0].date(), []).append(d)
+        ical_entries = []
+        for day in sorted(days):
+            merged = clock.merge_intervals([(start, end) for start, end, _ in days[day]])
+            start, end = merged[0][0], max(m[1] for m in merged)
+            clocked = sum((m[2] for m in merged), timedelta(0))
+            path_intervals: Dict[str, List[Tuple[datetime, datetime]]] = {}
+            for clock_start, clock_end, path in days[day]:
+                path_intervals.setdefault(path, []).append((clock_start, clock_end))
+            total = clock.format_duration(clocked)
+            # Overlaps within a heading count once, like in the day total.
+            description = "".join(
+                "- {}: {}\n".format(path, clock.format_duration(
+                    sum((m[2] for m in clock.merge_intervals(intervals)), timedelta(0))))
+                for path, intervals in path_intervals.items()) + "\n"
+            ical_entries.append(Event(
+                self._encode_datetime(start), self._encode_datetime(end),
+                f"Clocked {total}", description,
+                self.categories.union({CLOCK})))
+        return ical_entries
+
+    def encode_dtstamp(self, now: Optional[datetime] = None) -> str:
+        """Returns the encoded DTSTAMP of a conversion at `now` (default:
+        the converter's `now`), or the fixed `dtstamp` if given."""
+        if self.dtstamp is not None:
+            return self._encode_datetime(self.dtstamp)
+        return self._encode_datetime(now if now is not None else self._now())
+
+    def _now(self) -> datetime:
+        return (self.now if self.now is not None
+                else datetime.now(tz=timezone.utc))
+
+    def _encode_datetime(self, dt: datetime) -> str:
         """Encodes a datetime object into an iCalendar-compatible string."""
         # The replacement here is reversed to mitigate the time difference.
-        dt = dt.replace(tzinfo=to_tz)
-        dt = dt.astimezone(tz=from_tz)
+        dt = dt.replace(tzinfo=self.to_tz)
+        dt = dt.astimezone(tz=self.from_tz)
         return dt.strftime("%Y%m%dT%H%M%SZ")
 
-    def _encode_date(d: Union[date, datetime], is_range_end=False) -> str:
+    def _encode_date(self, d: Union[date, datetime], is_range_end=False) -> str:
         """Encodes a date or datetime object into an iCalendar-compatible
         string."""
         if isinstance(d, datetime):
-            return _encode_datetime(d)
+            return self._encode_datetime(d)
         if is_range_end:
             d += timedelta(days=1)
         return d.strftime("%Y%m%d")
 
-    def _encode_rrule(cookie: Tuple[str, str, str]) -> str:
-        """Encodes a repeater tuple into an iCalendar-compatible string."""
-        if cookie is None:
-            return ""
-        assert len(cookie) == 3
-        repeater = cookie[0]
-        # This 3 repeaters all mean the same thing during parsing
-        assert repeater in ['+', '++', '.+']
-        interval = cookie[1]
-        freq = {
-            'h': 'HOURLY',
-            'd': 'DAILY',
-            'w': 'WEEKLY',
-            'm': 'MONTHLY',
-            'y': 'YEARLY'
-        }[cookie[2]]
-        return f"RRULE:FREQ={freq};INTERVAL={interval}"
-
-    def _node_is_ignored(node: orgparse.OrgNode) -> bool:
+    def _node_is_ignored(self, node: "orgparse.OrgNode") -> bool:
         """Determines if a node should be ignored."""
-        assert ignore_states is not None
-        assert ignore_tags is not None
-        if ignore_states.intersection([node.todo]):
+        if self._select is not None and not self._select(node):
+            return True
+        if self.ignore_states.intersection([node.todo]):
             return True
-        if ignore_tags.intersection(node.tags):
+        if self.ignore_tags.intersection(node.tags):
             return True
         # Check manually since orgparse doesn't support custom Todo states
         if node.todo is not None:
             return False
-        for s in ignore_states:
+        for s in self.ignore_states:
             if node.heading.startswith(s):
                 if len(node.heading) > len(s) and node.heading[len(s)] == " ":
                     return True
         return False
 
-    def _node_full_path(node: orgparse.OrgNode) -> str:
-        """Returns the full path of a node with ` > ` as delimiter."""
-        headings = []
-        while node != source:
-            headings.append(node.heading)
-            node = node.parent
+    def _active_extractors(self, text: str) -> Dict[int, "extractors.Extractor"]:
+        """Returns the extractors whose markers appear in a node's raw
+        text, by registration index."""
+        active: Dict[int, extractors.Extractor] = {}
+        for marker, registered in self._markers:
+            if marker in text:
+                active.update(registered)
+        return active
+
+    def _node_context(
+            self,
+            node: "orgparse.OrgNode",
+            now: datetime,
+            warnings: diagnostics.Warnings,
+            day_clocks: List[Tuple[datetime, datetime, str]],
+            paths: Optional[Dict[int, str]] = None,
+            ) -> "extractors.Context":
+        """Prepares what the extractors get to know about a node,
+        appending to `warnings`. `paths` caches org paths by node id."""
+        summary = node.heading
+        location = node.get_property('LOCATION')
+        #if node.priority:  # Restore priority removed by orgparse
+        #    summary = f"[{node.priority}] {summary}"
+        summary = summary.strip()
+        if summary.startswith("[") and "]" in summary:
+            summary = summary[summary.index("]") + 1:].strip()
+        description = node.body
+        path = _node_full_path(node, paths)
+        max_body_length = self.limits.max_body_length
+        if max_body_length is not None and len(description) > max_body_length:
+            description = description[:max_body_length]
+            warnings.add(diagnostics.LIMIT,
+                         f"Body truncated to {max_body_length} characters", node, path)
+        if description != "":
+            description += "\n\n"
+        description += "Org Path: " + path
+        return extractors.Context(
+            self, node, now, warnings, summary, description, location, path, day_clocks)
+
+
+class _Route:
+    """The events, warnings and limits of one converter in a traversal.
+
+    With `add_categories`, the converter's categories are added to the
+    events routed here, which were extracted without any.
+    """
+
+    def __init__(
+            self,
+            converter: Converter,
+            warnings: diagnostics.Warnings,
+            *,
+            add_categories: bool = False,
+            ):
+        self.converter = converter
+        self.warnings = warnings
+        self.categories = converter.categories if add_categories else None
+        self.events: List[Event] = []
+        # (start, end, org path) of all clocks, for `clock_merge=DAY`
+        self.day_clocks: List[Tuple[datetime, datetime, str]] = []
+        self.too_deep = 0
+        self.done = False
+        limits = converter.limits
+        self.deadline = (time.monotonic() + limits.deadline
+                         if limits.deadline is not None else None)
+
+    def accepts(self, i: int, node: "orgparse.OrgNode") -> bool:
+        """Whether the `i`th node is converted, which ends the route when
+        a limit is reached."""
+        limits = self.converter.limits
+        if limits.max_nodes is not None and i >= limits.max_nodes:
+            self.warnings.add(diagnostics.LIMIT, f"Stopped after {limits.max_nodes} nodes")
+            self.done = True
+            return False
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            self.warnings.add(diagnostics.LIMIT,
+                              f"Stopped after the deadline of {limits.deadline} seconds")
+            self.done = True
+            return False
+        if limits.max_depth is not None and node.level > limits.max_depth:
+            self.too_deep += 1
+            return False
+        return not self.converter._node_is_ignored(node)
+
+    def add(self, events: List[Event]) -> None:
+        if self.categories:
+            events = [e._replace(categories=e.categories | self.categories) for e in events]
+        self.events.extend(events)
+        max_events = self.converter.limits.max_events
+        if max_events is not None and len(self.events) > max_events:
+            self.done = True
+
+    def finish(self) -> Tuple[List[Event], List[diagnostics.OrgWarning]]:
+        """Returns the events and warnings of the route."""
+        limits = self.converter.limits
+        if self.too_deep:
+            self.warnings.add(diagnostics.LIMIT, f"Skipped {self.too_deep} nodes deeper than "
+                                                 f"level {limits.max_depth}")
+        if self.day_clocks:
+            self.events.extend(self.converter._day_clock_events(self.day_clocks))
+        if limits.max_events is not None and len(self.events) > limits.max_events:
+            del self.events[limits.max_events:]
+            self.warnings.add(diagnostics.LIMIT, f"Stopped after {limits.max_events} events")
+        return self.events, self.warnings
+
+
+def _traverse(
+        source: "orgparse.node.OrgRootNode",
+        base: Converter,
+        routes: List[_Route],
+        now: datetime,
+        ) -> None:
+    """Converts the nodes of a parsed org tree for all `routes`, running
+    each extractor once per node with `base`, whose `include_types` cover
+    those of all routes. An extractor's events and warnings go to every
+    route that converts the node and includes the extractor's type."""
+    names = extractors.names()
+    # Org paths by node id, so that a path is built from its parent's
+    paths: Dict[int, str] = {}
+    for i, node in enumerate(source[1:]):  # [1:] for skipping root itself
+        accepting = [route for route in routes if not route.done and route.accepts(i, node)]
+        if not accepting:
+            if all(route.done for route in routes):
+                break
+            continue
+        active = base._active_extractors(str(node))
+        if not active:
+            continue
+        if len(accepting) == 1 and accepting[0].converter is base:
+            route = accepting[0]
+            ctx = base._node_context(node, now, route.warnings, route.day_clocks, paths)
+            for index in sorted(active):
+                route.add(active[index](ctx))
+            continue
+        ctx_warnings = diagnostics.Warnings()
+        ctx = base._node_context(node, now, ctx_warnings, [], paths)
+        dispatched = set()
+        for index in sorted(active):
+            name = names[index]
+            targets = [route for route in accepting if name in route.converter.include_types]
+            if not targets:
+                continue
+            for route in targets:
+                if route not in dispatched:
+                    dispatched.add(route)
+                    route.warnings.add_all(ctx_warnings)
+            warnings = diagnostics.Warnings()
+            day_clocks: List[Tuple[datetime, datetime, str]] = []
+            events = active[index](ctx._replace(warnings=warnings, day_clocks=day_clocks))
+            for route in targets:
+                route.add(events)
+                route.warnings.add_all(warnings)
+                route.day_clocks.extend(day_clocks)
+
+
+def loads(
+        org_str: str,
+        *,
+        prod_id: str = _PROD_ID,
+        now: Optional[datetime] = None,
+        categories: Optional[Set[str]] = None,
+        ignore_states: Optional[Set[str]] = None,
+        ignore_tags: Optional[Set[str]] = None,
+        include_types: Optional[Set[str]] = None,
+        from_tz: timezone = timezone.utc,
+        to_tz: timezone = timezone.utc,
+        todo_states: Optional[List[str]] = None,
+        done_states: Optional[List[str]] = None,
+        clock_merge: Optional[str] = None,
+        clock_merge_gap: timedelta = timedelta(0),
+        max_warnings: Optional[int] = None,
+        select: Optional[str] = None,
+        limits: Limits = Limits(),
+        collapse_series: bool = False,
+        dtstamp: Optional[datetime] = None,
+        just_entries: bool = False,
+        mytimezone: str = "",
+        mytimezoneid: str = "",
+        ) -> Tuple[str, List[diagnostics.OrgWarning]]:
+    """Returns the generated ical string and a list of warnings.
+
+    Warnings are `diagnostics.OrgWarning` objects, which compare equal to
+    their text. `max_warnings` caps their number; `0` turns them off.
+    `select` only converts the nodes matching a selector (see
+    `org2ical.selector`), e.g. `+work todo=NEXT`. `limits` bounds the work
+    spent on untrusted input (see `Limits`). `collapse_series` turns the
+    explicit timestamps of a node into one recurring event per time of
+    day (see `org2ical.series`). `dtstamp` fixes the `DTSTAMP` of all
+    events, e.g. for reproducible output; it defaults to `now`.
+    """
+    converter = Converter(
+        prod_id=prod_id,
+        now=now,
+        categories=categories,
+        ignore_states=ignore_states,
+        ignore_tags=ignore_tags,
+        include_types=include_types,
+        from_tz=from_tz,
+        to_tz=to_tz,
+        todo_states=todo_states,
+        done_states=done_states,
+        clock_merge=clock_merge,
+        clock_merge_gap=clock_merge_gap,
+        max_warnings=max_warnings,
+        select=select,
+        limits=limits,
+        collapse_series=collapse_series,
+        dtstamp=dtstamp,
+    )
+    return converter.loads(org_str, just_entries=just_entries)
+
+
+def load(
+        path: str,
+        *,
+        loader: Optional["include.Loader"] = None,
+        **options: Any,
+        ) -> Tuple[str, List[diagnostics.OrgWarning]]:
+    """Like `loads()`, but reads an org file, resolving its `#+INCLUDE:`
+    and `#+SETUPFILE:` directives.
+
+    Pass the same `loader` when converting several files to read shared
+    includes only once. TODO keywords from `#+TODO:` lines are used unless
+    `todo_states` or `done_states` are given. Warnings point at the file
+    and line they come from (`file` and `line`).
+    """
+    from org2ical import include  # pylint: disable=import-outside-toplevel
+
+    loader = loader if loader is not None else include.Loader()
+    org_file = loader.load(path)
+    _apply_file_states(org_file, options)
+    ical_str, conversion_warnings = loads(org_file.text, **options)
+    org_file.locate_warnings(conversion_warnings)
+    warnings = diagnostics.Warnings(options.get("max_warnings"))
+    warnings.add_all(org_file.warnings)
+    warnings.add_all(conversion_warnings)
+    return ical_str, warnings
+
+
+def loads_many(
+        org_strs: Iterable[str],
+        *,
+        max_workers: Optional[int] = None,
+        just_entries: bool = False,
+        **options: Any,
+        ) -> List[Tuple[str, List[diagnostics.OrgWarning]]]:
+    """Like `loads()` for many strings, converted by a pool of
+    `max_workers` threads sharing one `Converter`. Returns the results in
+    the order of `org_strs`.
+
+    Threads only convert in parallel on a free-threaded Python build
+    (3.13t and later); with the GIL, the pool costs little but gains
+    little either.
+    """
+    from concurrent.futures import ThreadPoolExecutor  # pylint: disable=import-outside-toplevel
+
+    converter = Converter(**options)
+    with ThreadPoolExecutor(max_workers) as pool:
+        return list(pool.map(
+            lambda org_str: converter.loads(org_str, just_entries=just_entries), org_strs))
+
+
+def load_many(
+        paths: Iterable[str],
+        *,
+        max_workers: Optional[int] = None,
+        loader: Optional["include.Loader"] = None,
+        **options: Any,
+        ) -> List[Tuple[str, List[diagnostics.OrgWarning]]]:
+    """Like `load()` for many files, converted by a pool of `max_workers`
+    threads sharing one `loader`. Returns the results in the order of
+    `paths`."""
+    # pylint: disable=import-outside-toplevel
+    from concurrent.futures import ThreadPoolExecutor
+    from org2ical import include
+
+    loader = loader if loader is not None else include.Loader()
+    with ThreadPoolExecutor(max_workers) as pool:
+        return list(pool.map(lambda path: load(path, loader=loader, **options), paths))
+
+
+def _apply_file_states(org_file: "include.LoadedFile", options: Dict[str, Any]) -> None:
+    """Uses the TODO keywords of a file's `#+TODO:` lines, unless
+    `todo_states` or `done_states` are given."""
+    if (org_file.todo_states or org_file.done_states) and \
+            options.get("todo_states") is None and options.get("done_states") is None:
+        options["todo_states"] = org_file.todo_states
+        options["done_states"] = org_file.done_states
+
+
+# Matches date and time formats like <YYYY-MM-DD DDD H:MM> or <YYYY-MM-DD DDD H:MM-H:MM>
+_TIME_RE = re.compile(r'<(\d{4}-\d{2}-\d{2} \w{3}) (\d{1,2}:\d{2})(-(\d{1,2}:\d{2}))?>')
+
+
+def _fix_time_format(text: str) -> str:
+    def replacer(match):
+        # Extract the date and time parts from the match
+        date_part = match.group(1)
+        start_time = match.group(2)
+        end_time = match.group(4)
+
+        # Ensure leading zero for single-digit hours
+        fixed_start = start_time.zfill(5)
+        fixed_end = end_time.zfill(5) if end_time else ''
+
+        # Reconstruct the formatted time string
+        return f'<{date_part} {fixed_start}{"-" + fixed_end if fixed_end else ""}>'
+
+    # Substitute all occurrences of the pattern in the input text
+    return _TIME_RE.sub(replacer, text)
+
+
+def _encode_rrule(cookie: Tuple[str, str, str]) -> str:
+    """Encodes a repeater tuple into an iCalendar-compatible string."""
+    if cookie is None:
+        return ""
+    assert len(cookie) == 3
+    repeater = cookie[0]
+    # This 3 repeaters all mean the same thing during parsing
+    assert repeater in ['+', '++', '.+']
+    interval = cookie[1]
+    freq = {
+        'h': 'HOURLY',
+        'd': 'DAILY',
+        'w': 'WEEKLY',
+        'm': 'MONTHLY',
+        'y': 'YEARLY'
+    }[cookie[2]]
+    return f"RRULE:FREQ={freq};INTERVAL={interval}"
+
+
+def _node_full_path(
+        node: "orgparse.OrgNode",
+        cache: Optional[Dict[int, str]] = None,
+        ) -> str:
+    """Returns the full path of a node with ` > ` as delimiter.
+
+    With a `cache` of paths by node id, a path is built from the nearest
+    cached ancestor's, and the paths of all ancestors are cached, so that
+    the paths of a whole tree take time linear in its size (plus the
+    length of the paths themselves).
+    """
+    headings = []
+    nodes = []
+    prefix = ""
+    while not node.is_root():
+        if cache is not None:
+            cached = cache.get(id(node))
+            if cached is not None:
+                prefix = cached
+                break
+            nodes.append(node)
+        headings.append(node.heading)
+        node = node.parent
+    if cache is None:
         headings.reverse()
         return " > ".join(headings)
+    path = prefix
+    for node, heading in zip(reversed(nodes), reversed(headings)):
+        path = f"{path} > {heading}" if path else heading
+        cache[id(node)] = path
+    return path
 
-    def _construct_warning(node: orgparse.OrgNode, message: str) -> str:
-        """Helper function for constructing warning messages."""
-        return textwrap.dedent(
-            f"""WARNING: {message} in node: `{_node_full_path(node)}`.""")
-
-    def _node_get_diaries(node: orgparse.OrgNode) -> List[str]:
-        diaries = []
-        # TODO: better error handling in case of malformed diary-float
-        if "<%%(diary-float" in node.heading:
-            d = re.findall(r'<%%\(diary-float\s+.*\)>', node.heading)[0]
-            diaries.append(d)
-        for line in node.body.split("\n"):
-            if line.strip().startswith("<%%(diary-float"):
-                # with time in title (so not in the diary-float sexp)
-                d = re.findall(r'<%%\(diary-float\s+.*\)>', line)
-                if len(d) == 1:
-                    diaries.append(d[0])
-                elif len(d) > 1:
-                    warnings.append(_construct_warning(
-                        node, f"Invalid diary-float in body 1: too many matches"))
-                    
-                # with inline time (new in org 9.7)
-                # <%%(diary-float t 2 2) 19:00>
-                # <%%(diary-float t 2 2) 19:00-23:00>
-                d = re.findall(r'(<%%\(diary-float\s+.*\)\s+\d?\d:\d\d(-\d?\d:\d\d)?>)', line)
-                if len(d) == 1:
-                    diaries.append(d[0][0]) # findall returns the captured groups as tuple, and we want the first group
-                elif len(d) > 1:
-                    warnings.append(_construct_warning(
-                        node, f"Invalid diary-float in body 2: too many matches"))
-
-        return diaries
-
-    def _encode_diary_to_rrule(diary: str) -> str:
-        # <%%(diary-float t 2 2)>
-        m = re.search(r'<%%\(diary-float\s([t\+\-\d]*)\s([\+\-\d]*)\s([\+\-\d]*)\)\s*(\d?\d:\d\d)?(-(\d?\d:\d\d))?>', diary)
-        if not m:
-            return None
-        month = m.group(1)
-        if month != "t":
-            # TODO: Implement non-montly diary-float
-            return None
-        weekday = m.group(2)
-        pos = m.group(3)
-        day = ["SU", "MO", "TU", "WE", "TH", "FR", "SA"][int(weekday)]
-        # FREQ=MONTHLY;BYSETPOS=-1;BYDAY=MO;INTERVAL=1
-        return f"RRULE:FREQ=MONTHLY;BYSETPOS={pos};BYDAY={day};INTERVAL=1"
-
-    def _parse_diary_time(diary: str, node: orgparse.OrgNode) -> Tuple[str, str, str]:
-        cleantime = lambda x: x.replace(':', '').replace('-', '') if x else None
-
-        # time in sexp:
-        m = re.search(r'<%%\(diary-float\s([t\+\-\d]*)\s([\+\-\d]*)\s([\+\-\d]*)\)\s*(\d?\d:\d\d)?(-(\d?\d:\d\d))?>', diary)
-        if m and m.group(4):
-            return cleantime(m.group(4)), cleantime(m.group(6)), node.heading.strip()
-
-        # time in title:
-        # 19:00-23:00 STG
-        m = re.search(r'(\d{2}:\d{2})-(\d{2}:\d{2}) (.*)', node.heading)
-        if m:
-            return cleantime(m.group(1)), cleantime(m.group(2)), m.group(3).strip()
-        m = re.search(r'(\d{2}:\d{2})', node.heading)
-        if m:
-            return cleantime(m.group(1)), None, m.group(3).strip()
-        
-        return None, None, None # stime, etime, summary2
-
-
-    def _construct_vevent(
-            now: str,
-            startutc: str,
-            endutc: str,
-            summary: str,
-            description: str,
-            categories: Set[str],
-            *,
-            rrule: str = "",
-            is_dayevent: bool = False,
-            tzprefix: str = "",
-            location: str,
-            ) -> str:
-        startutc = "DTSTART{};VALUE=DATE:{}".format(tzprefix, startutc) if is_dayevent else "DTSTART{}:{}".format(tzprefix, startutc)
-        endutc = "DTEND{}:{}".format(tzprefix, endutc) if endutc else ''
-        """Constructs an iCaldendar VEVENT entry string."""
-        description = description.replace("\r\n", "\n").replace("\n", "\\n")
-        entry_begin = f"""
+
+def _node_get_diaries(
+        node: "orgparse.OrgNode",
+        warnings: diagnostics.Warnings,
+        path: Optional[str] = None,
+        ) -> List["diary.DiaryRule"]:
+    """Returns the compiled diary sexps of a node, appending to `warnings`
+    with the node's org `path`."""
+    from org2ical import diary  # pylint: disable=import-outside-toplevel
+
+    rules = []
+    for text in (node.heading, node.body):
+        if "<%%(" not in text:
+            continue
+        for sexp in diary.find_sexps(text):
+            try:
+                rules.append(diary.compile_sexp(sexp))
+            except ValueError as e:
+                warnings.add(diagnostics.INVALID_DIARY, str(e), node, path)
+    return rules
+
+
+def _construct_vevent(now: str, event: Event) -> str:
+    """Constructs an iCaldendar VEVENT entry string."""
+    # Imported here to keep `import org2ical` (and the CLI startup) cheap.
+    # pylint: disable=import-outside-toplevel
+    import hashlib
+    import textwrap
+
+    (startutc, endutc, summary, description, categories, rrule,
+     is_dayevent, tzprefix, location, rdates) = event
+    startutc = "DTSTART{};VALUE=DATE:{}".format(tzprefix, startutc) if is_dayevent else "DTSTART{}:{}".format(tzprefix, startutc)
+    endutc = "DTEND{}:{}".format(tzprefix, endutc) if endutc else ''
+    description = description.replace("\r\n", "\n").replace("\n", "\\n")
+    entry_begin = f"""
         BEGIN:VEVENT
         DTSTAMP:{now}
         """.strip()
-        entry_mid = f"""
+    entry_mid = f"""
         {startutc}
         {endutc}
         SUMMARY:{summary}
         DESCRIPTION:{description}
-        CATEGORIES:{",".join(categories)}
+        CATEGORIES:{",".join(sorted(categories))}
         {rrule}
         """.strip()
-        entry_mid = "{}\n        LOCATION:{}".format(entry_mid, location) if location else entry_mid
-        entry_end = """
+    if rdates:
+        entry_mid = "{}\n        RDATE{}{}:{}".format(
+            entry_mid, tzprefix, ";VALUE=DATE" if is_dayevent else "", ",".join(rdates))
+    entry_mid = "{}\n        LOCATION:{}".format(entry_mid, location) if location else entry_mid
+    entry_end = """
         END:VEVENT
         """.strip()
-        md5hash = hashlib.md5((entry_begin + entry_mid + entry_end)
-                              .encode('utf-8')).hexdigest()
-        entry = textwrap.dedent(f"""\
+    md5hash = hashlib.md5((entry_begin + entry_mid + entry_end)
+                          .encode('utf-8')).hexdigest()
+    entry = textwrap.dedent(f"""\
         {entry_begin}
         UID:{md5hash}
         {entry_mid}
         {entry_end}
         """)
-        return entry
+    return entry
 
-    warnings = []
-    ical_entries = []
-    now_str = _encode_datetime(now)
 
-    org_str = _fix_time_format(org_str) # fix (active) timestamps without leading zero
-    env = orgparse.OrgEnv(filename=None, todos=todo_states, dones=done_states)
-    source = orgparse.loads(org_str, None, env=env)
-    for node in source.root[1:]:  # [1:] for skipping root itself
-        if _node_is_ignored(node):
-            continue
-        summary = node.heading
-        location = node.get_property('LOCATION')
-        #if node.priority:  # Restore priority removed by orgparse
-        #    summary = f"[{node.priority}] {summary}"
-        summary = summary.strip()
-        if summary.startswith("[") and "]" in summary:
-            summary = summary[summary.index("]") + 1:].strip()
-        description = node.body
-        if description != "":
-            description += "\n\n"
-        description += "Org Path: " + _node_full_path(node)
-        if SCHEDULED in include_types:
-            n_scheduled = node.body.count(SCHEDULED)
-            if n_scheduled > 0:
-                if node.scheduled:
-                    warnings.append(_construct_warning(
-                        node, f"Multiple {SCHEDULED} keywords found"))
-                else:
-                    warnings.append(_construct_warning(
-                        node, f"{SCHEDULED} keyword found but no timestamp"))
-            if node.scheduled:
-                start = _encode_date(node.scheduled.start)
-                rrule = _encode_rrule(node.scheduled._repeater)
-                ical_entries.append(_construct_vevent(
-                    now_str, start, None, summary, description,
-                    categories.union({SCHEDULED}), rrule=rrule, is_dayevent=True, location=location))
-        if DEADLINE in include_types:
-            n_deadline = node.body.count(DEADLINE)
-            if n_deadline > 0:
-                if node.deadline:
-                    warnings.append(_construct_warning(
-                        node, f"Multiple {DEADLINE} keywords found"))
-                else:
-                    warnings.append(_construct_warning(
-                        node, f"{DEADLINE} keyword found but no timestamp"))
-            if node.deadline:
-                start = _encode_date(node.deadline.start)
-                rrule = _encode_rrule(node.deadline._repeater)
-                ical_entries.append(_construct_vevent(
-                    now_str, start, None, summary, description,
-                    categories.union({DEADLINE}), rrule=rrule, is_dayevent=True, location=location))
-        if TIMESTAMP in include_types:
-            datelist = node.get_timestamps(active=True, point=True)
-            for d in datelist:
-                is_dayevent = type(d.start) == date
-                start = _encode_date(d.start)
-                end = _encode_date(d.start + timedelta(hours=1)) if not is_dayevent else None
-                rrule = _encode_rrule(d._repeater)
-                ical_entries.append(_construct_vevent(
-                    now_str, start, end, summary, description,
-                    categories.union({TIMESTAMP}), rrule=rrule, is_dayevent=is_dayevent, location=location))
-            rangelist = node.get_timestamps(active=True, range=True)
-            for d in rangelist:
-                start = _encode_date(d.start)
-                end = _encode_date(d.end, is_range_end=True)
-                rrule = _encode_rrule(d._repeater)
-                ical_entries.append(_construct_vevent(
-                    now_str, start, end, summary, description,
-                    categories.union({"TIMESTAMP"}), rrule=rrule, location=location))
-        if CLOCK in include_types:
-            for d in node.clock:
-                start = _encode_date(d.start)
-                if d.end is None:
-                    continue  # Skip clocks that are still running
-                end = _encode_date(d.end)
-                ical_entries.append(_construct_vevent(
-                    now_str, start, end, summary, description,
-                    categories.union({CLOCK}), location=location))
-                assert d._repeater is None
-        if BIRTHDAY in include_types:
-            if node.properties.get("BIRTHDAY"):
-                start = node.properties.get("BIRTHDAY")
-                start = datetime.strptime(start, "%Y-%m-%d")
-                #start = start.replace(year=now.year)
-                rrule = "RRULE:FREQ=YEARLY;INTERVAL=1"
-                bage = now.year - start.year
-                description = "- Birthyear: {}\n- Age {}: {}\n\n".format(start.year, now.year, bage)
-                start = start.strftime("%Y%m%d")
-                ical_entries.append(_construct_vevent(
-                    now_str, start, None, '{} Birthday'.format(summary), description,
-                    categories.union({BIRTHDAY}), rrule=rrule, is_dayevent=True, location=location))
-        if DIARY in include_types:
-            diaries = _node_get_diaries(node)
-            for diary in diaries:
-                rrule = _encode_diary_to_rrule(diary)
-                if not rrule:
-                    warnings.append(_construct_warning(
-                        node, f"Invalid diary-float"))
-                    continue
-                start = None #node.properties.get("CREATED")
-                start = start.strftime("%Y%m%d") if start else "19850101" # diary-sexp without explicit start date → start at beginning of time
-                
-                # parse start/end-time from heading if it exists
-                stime, etime, summary2 = _parse_diary_time(diary, node)
-                if stime:
-                    startt = start + "T" + stime + "00"
-                    #startt = _encode_datetime(datetime.strptime(startt, "%Y%m%dT%H%M%S"))
-                else:
-                    startt = start
-                if etime:
-                    endt = start + "T" + etime + "00"
-                    #endt = _encode_datetime(datetime.strptime(endt, "%Y%m%dT%H%M%S"))
-                elif stime:
-                    # parse start into datetime
-                    startts = datetime.strptime(stime, "%H%M")
-                    etime = (startts + timedelta(hours=1)).strftime("%H%M")
-                    endt = start + "T" + etime + "00"
-                else:
-                    endt = start
-                summary = summary2 if summary2 else summary
-
-                # repeated-dates without specific start-date are a bit annoying, 
-                # so we hardcode `mytimezoneprefix`
-
-                entry = _construct_vevent(
-                    now_str, startt, endt, summary, description,
-                    categories.union({'REGULAR'}), rrule=rrule, tzprefix=mytimezoneprefix, location=location)
-                ical_entries.append(entry)
-
-
-    ical_entries_str = "".join(ical_entries).strip()
-    
-    if just_entries:
-        return ical_entries_str, warnings
-    else:
-        ical_str = f"""\
-BEGIN:VCALENDAR
-VERSION:2.0
-PRODID:{prod_id}{mytimezone}
-{ical_entries_str}
-END:VCALENDAR
-"""
-    return ical_str, warnings
+def __getattr__(name: str) -> Any:
+    """Imports the lazily loaded submodules on first access, so that
+    e.g. `org2ical.include.Loader()` works after `import org2ical`."""
+    if name in _LAZY_SUBMODULES:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
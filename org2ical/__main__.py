@@ -0,0 +1,6 @@
+"""Allows running the command-line interface with `python -m org2ical`."""
+import sys
+
+from org2ical.cli import main
+
+sys.exit(main())
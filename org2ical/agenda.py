@@ -0,0 +1,202 @@
+"""Date range queries on converted events, without an iCalendar round trip.
+
+A `Calendar` keeps the events of a conversion in an interval index, so an
+agenda view can ask for what is on in a window directly::
+
+    cal, warnings = org2ical.agenda.loads(org_str, now=now)
+    cal.between(monday, monday + timedelta(days=7))
+    cal.next(5)
+
+Every event is indexed by its lifespan, from its first start to the end
+of its last occurrence (forever for endless recurrences). `between()`
+finds the overlapping lifespans in a centered interval tree and in a list
+sorted by start, in O(log n + k), and only expands the recurrences of the
+series found. All-day events are placed at midnight in the calendar's
+time zone.
+
+Recurring events need python-dateutil: `pip install org2ical[recur]`.
+"""
+
+import bisect
+import heapq
+import itertools
+from datetime import date, datetime, time, timezone, tzinfo
+from typing import Any, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+import org2ical
+from org2ical import diagnostics, recurrence
+
+_FOREVER = datetime.max.replace(tzinfo=timezone.utc)
+
+
+class Occurrence(NamedTuple):
+    """An occurrence of `event` from `start` to `end` (exclusive, aware
+    datetimes). All-day occurrences span whole days."""
+    start: datetime
+    end: datetime
+    all_day: bool
+    event: org2ical.Event
+
+
+class _Item(NamedTuple):
+    start: datetime
+    end: datetime  # of the last occurrence
+    event: org2ical.Event
+    first: recurrence.Span
+
+
+class _Node:
+    """A node of the centered interval tree: the items containing
+    `center` (or starting at it), sorted by start and by descending end."""
+    __slots__ = ("center", "by_start", "by_end", "left", "right")
+
+    def __init__(self, items: List[_Item]):
+        # `items` are sorted by start; the median start keeps the tree
+        # balanced and guarantees that both subtrees are smaller.
+        self.center = items[len(items) // 2].start
+        here, left, right = [], [], []
+        for item in items:
+            if item.start > self.center:
+                right.append(item)
+            elif item.end <= self.center and item.start < self.center:
+                left.append(item)
+            else:
+                here.append(item)
+        self.by_start = here
+        self.by_end = sorted(here, key=lambda item: item.end, reverse=True)
+        self.left = _Node(left) if left else None
+        self.right = _Node(right) if right else None
+
+    def stab(self, point: datetime) -> Iterator[_Item]:
+        """Yields the items with `start < point < end`."""
+        node: Optional[_Node] = self
+        while node is not None:
+            if point > node.center:
+                # All items here start at or before the center
+                for item in node.by_end:
+                    if item.end <= point:
+                        break
+                    yield item
+                node = node.right
+            else:
+                # All items here starting before the center end after it
+                for item in node.by_start:
+                    if item.start >= point:
+                        break
+                    yield item
+                node = node.left if point < node.center else None
+
+
+class Calendar:
+    """The events of a conversion, indexed for date range queries.
+
+    `tz` is the time zone of all-day events, and of naive query times.
+    """
+
+    def __init__(self, events: Iterable[org2ical.Event], *, tz: tzinfo = timezone.utc):
+        self.events = list(events)
+        self.tz = tz
+        items = []
+        for event in self.events:
+            first = recurrence.span(event)
+            final = recurrence.last(event) if recurrence.recurs(event) else first
+            items.append(_Item(self._anchor(first.start),
+                               self._anchor(final.end) if final else _FOREVER, event, first))
+        items.sort(key=lambda item: item.start)
+        self._items = items
+        self._starts = [item.start for item in items]
+        self._tree = _Node(items) if items else None
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def between(self, start: datetime, end: datetime) -> List[Occurrence]:
+        """Returns the occurrences overlapping `[start, end)`, sorted by
+        start. An occurrence without duration overlaps if it starts in the
+        window."""
+        start, end = self._aware(start), self._aware(end)
+        if start >= end:
+            return []
+        lo = bisect.bisect_left(self._starts, start)
+        hi = bisect.bisect_left(self._starts, end)
+        items = itertools.chain(self._tree.stab(start) if self._tree else (),
+                                self._items[lo:hi])
+        found = []
+        for item in items:
+            if not recurrence.recurs(item.event):
+                found.append(self._occurrence(item.first, item.event))
+                continue
+            for span in recurrence.occurrences(
+                    item.event, start.astimezone(self.tz), end.astimezone(self.tz)):
+                occurrence = self._occurrence(span, item.event)
+                if start <= occurrence.start < end or occurrence.start < start < occurrence.end:
+                    found.append(occurrence)
+        found.sort(key=lambda occurrence: occurrence.start)
+        return found
+
+    def next(self, n: int, after: Optional[datetime] = None) -> List[Occurrence]:
+        """Returns the first `n` occurrences starting at or after `after`
+        (default: now), sorted by start."""
+        after = self._aware(after) if after is not None else datetime.now(tz=timezone.utc)
+        # A heap of the next occurrence of each active series and event,
+        # fed with the events in start order as the heap reaches them.
+        heap: List[Tuple[datetime, int, Occurrence, Iterator[Occurrence]]] = []
+        counter = itertools.count()
+
+        def push(item: _Item) -> None:
+            occurrences = self._following(item.event, after)
+            for occurrence in occurrences:
+                heapq.heappush(heap, (occurrence.start, next(counter), occurrence, occurrences))
+                return
+
+        if self._tree is not None:
+            for item in self._tree.stab(after):
+                if recurrence.recurs(item.event):
+                    push(item)
+        pending = bisect.bisect_left(self._starts, after)
+        found: List[Occurrence] = []
+        while len(found) < n:
+            while pending < len(self._items) and (not heap or self._starts[pending] <= heap[0][0]):
+                push(self._items[pending])
+                pending += 1
+            if not heap:
+                break
+            _, _, occurrence, occurrences = heapq.heappop(heap)
+            found.append(occurrence)
+            for following in occurrences:
+                heapq.heappush(heap, (following.start, next(counter), following, occurrences))
+                break
+        return found
+
+    def _following(self, event: org2ical.Event, after: datetime) -> Iterator[Occurrence]:
+        for span in recurrence.following(event, after.astimezone(self.tz)):
+            occurrence = self._occurrence(span, event)
+            if occurrence.start >= after:
+                yield occurrence
+
+    def _occurrence(self, span: recurrence.Span, event: org2ical.Event) -> Occurrence:
+        return Occurrence(self._anchor(span.start), self._anchor(span.end), span.all_day, event)
+
+    def _anchor(self, value: Union[date, datetime]) -> datetime:
+        if isinstance(value, datetime):
+            return value
+        return datetime.combine(value, time(0), tzinfo=self.tz)
+
+    def _aware(self, dt: datetime) -> datetime:
+        return dt if dt.tzinfo is not None else dt.replace(tzinfo=self.tz)
+
+
+def loads(
+        org_str: str,
+        *,
+        tz: Optional[tzinfo] = None,
+        **options: Any,
+        ) -> Tuple[Calendar, List[diagnostics.OrgWarning]]:
+    """Converts an org-mode string into a `Calendar` and the warnings.
+    `options` are the `Converter` options; `tz` defaults to the time zone
+    of the org file (`to_tz`)."""
+    converter = org2ical.Converter(**options)
+    warnings = diagnostics.Warnings(converter.max_warnings)
+    source = converter.parse(org_str, warnings=warnings)
+    events, _ = converter.events(source, warnings=warnings)
+    return Calendar(events, tz=tz if tz is not None else converter.to_tz), warnings
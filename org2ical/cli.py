@@ -0,0 +1,393 @@
+"""Command-line entry point: `org2ical [INPUT ...] [-o OUTPUT]`.
+
+Editor save hooks call this many times a day, so startup time matters more
+than anything else for small files. Keep module-level imports to the
+standard library essentials; `orgparse` is only imported by `loads()`.
+"""
+
+# pylint: disable=protected-access
+import argparse
+import os
+import sys
+from datetime import datetime, time, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import org2ical
+
+
+def _parse_tz(value: str) -> timezone:
+    """Parses a UTC offset such as `+01:00`, `-0530` or `UTC`."""
+    if value.upper() in ("Z", "UTC"):
+        return timezone.utc
+    sign = -1 if value.startswith("-") else 1
+    digits = value.lstrip("+-").replace(":", "")
+    if not digits.isdigit() or len(digits) not in (2, 4):
+        raise argparse.ArgumentTypeError(f"invalid UTC offset: {value!r}")
+    hours, minutes = int(digits[:2]), int(digits[2:] or 0)
+    return timezone(sign * timedelta(hours=hours, minutes=minutes))
+
+
+def _parse_now(value: str) -> datetime:
+    """Parses an ISO 8601 datetime, assuming UTC when no offset is given."""
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from e
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def _parse_select(value: str) -> str:
+    """Checks a selector such as `+work todo=NEXT`."""
+    try:
+        org2ical.selector.compile_selector(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from e
+    return value
+
+
+def _parse_limit(value: str) -> Tuple[str, Union[int, float]]:
+    """Parses a resource limit such as `max_nodes=10000`."""
+    name, _, number = value.partition("=")
+    name = name.strip().replace("-", "_")
+    if name not in org2ical.Limits._fields:
+        raise argparse.ArgumentTypeError(
+            f"unknown limit {name!r}, expected one of: {', '.join(org2ical.Limits._fields)}")
+    try:
+        return name, float(number) if name == "deadline" else int(number)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(f"invalid value for {name}: {number!r}") from e
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="org2ical",
+        description="Generate an iCalendar (.ics) file from OrgMode (.org) files.")
+    parser.add_argument(
+        "inputs", nargs="*", metavar="INPUT", default=["-"],
+        help="org files to convert; `-` reads stdin (default)")
+    parser.add_argument(
+        "-o", "--output", default="-",
+        help="output .ics path; `-` writes stdout (default)")
+    parser.add_argument("--prod-id", help="PRODID of the generated calendar")
+    parser.add_argument(
+        "--now", type=_parse_now,
+        help="DTSTAMP as ISO 8601 datetime (default: current time)")
+    parser.add_argument(
+        "--category", dest="categories", action="append", metavar="CATEGORY",
+        help="category added to every event (repeatable)")
+    parser.add_argument(
+        "--ignore-state", dest="ignore_states", action="append",
+        metavar="STATE", help="skip nodes in this TODO state (repeatable)")
+    parser.add_argument(
+        "--ignore-tag", dest="ignore_tags", action="append", metavar="TAG",
+        help="skip nodes with this tag (repeatable)")
+    parser.add_argument(
+        "--include-type", dest="include_types", action="append",
+        metavar="TYPE",
+        choices=org2ical.extractors.names(),
+        help="event type to export (repeatable)")
+    parser.add_argument(
+        "--select", type=_parse_select, metavar="SELECTOR",
+        help="only export nodes matching SELECTOR, e.g. '+work -someday todo=NEXT'")
+    parser.add_argument(
+        "--from-tz", type=_parse_tz, default=timezone.utc,
+        help="UTC offset of the generated timestamps (default: UTC)")
+    parser.add_argument(
+        "--to-tz", type=_parse_tz, default=timezone.utc,
+        help="UTC offset of the org timestamps (default: UTC)")
+    parser.add_argument(
+        "--todo-state", dest="todo_states", action="append", metavar="STATE",
+        help="TODO keyword recognized by the parser (repeatable)")
+    parser.add_argument(
+        "--done-state", dest="done_states", action="append", metavar="STATE",
+        help="DONE keyword recognized by the parser (repeatable)")
+    parser.add_argument(
+        "--clock-merge", choices=[org2ical.HEADING, org2ical.DAY],
+        help="merge CLOCK intervals into one summary event per heading or day")
+    parser.add_argument(
+        "--clock-merge-gap", type=int, default=0, metavar="MINUTES",
+        help="merge CLOCK intervals of a heading at most this far apart")
+    parser.add_argument(
+        "--collapse-series", action="store_true",
+        help="turn the explicit timestamps of a heading into one recurring "
+             "event per time of day (RRULE or RDATE)")
+    parser.add_argument(
+        "--limit", dest="limits", action="append", type=_parse_limit,
+        metavar="NAME=VALUE",
+        help="resource limit for untrusted input, e.g. max_input_bytes=1000000, "
+             "max_nodes, max_depth, max_events, max_body_length or deadline "
+             "(seconds) (repeatable)")
+    parser.add_argument(
+        "--just-entries", action="store_true",
+        help="only output the VEVENT entries, without the VCALENDAR wrapper")
+    parser.add_argument(
+        "--format", choices=["ical", "jcal", "ndjson"], default="ical",
+        help="output iCalendar text (default), jCal (RFC 7265) or one JSON "
+             "object per event and line")
+    parser.add_argument(
+        "-q", "--quiet", action="store_true",
+        help="do not print warnings to stderr")
+    parser.add_argument(
+        "--max-warnings", type=int, metavar="N",
+        help="report at most N warnings per input (0: do not check)")
+    parser.add_argument(
+        "--publish", action="store_true",
+        help="stamp events with --now or a fixed DTSTAMP, only rewrite OUTPUT "
+             "on real changes, and write OUTPUT.gz and a SHA256SUMS manifest "
+             "next to it")
+    parser.add_argument(
+        "--freebusy", type=int, metavar="DAYS",
+        help="only output the busy time (VFREEBUSY) of the next DAYS days")
+    parser.add_argument(
+        "--merge", metavar="ICS",
+        help="merge the events into this calendar, replacing only the events "
+             "of an earlier merge from the same --merge-source")
+    parser.add_argument(
+        "--merge-source", default="org2ical", metavar="NAME",
+        help="owner of the merged events (default: org2ical)")
+    parser.add_argument(
+        "--store", metavar="DB",
+        help="upsert the events into this SQLite database instead of writing "
+             "a calendar, converting only changed inputs")
+    parser.add_argument(
+        "--check", action="store_true",
+        help="only check the inputs: print their warnings as FILE:LINE: "
+             "WARNING, write no calendar, and exit with 1 on any warning")
+    parser.add_argument(
+        "--worker", action="store_true",
+        help="serve line-delimited JSON-RPC requests on stdin/stdout")
+    return parser
+
+
+def _write_output(path: str, ical_str: str) -> None:
+    if path == "-":
+        sys.stdout.write(ical_str)
+        return
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(ical_str)
+
+
+def _print_warnings(args: argparse.Namespace, warnings: List[Any]) -> None:
+    if not args.quiet:
+        for warning in warnings:
+            print(warning, file=sys.stderr)
+
+
+def _iter_events(
+        inputs: List[str],
+        options: Dict[str, Any],
+        warnings: List[Any],
+        ) -> Iterator[org2ical.Event]:
+    """Yields the events of all inputs, one input at a time, appending to
+    `warnings`."""
+    loader = org2ical.include.Loader()
+    for path in inputs:
+        input_options = dict(options)
+        if path == "-":
+            text = sys.stdin.read()
+        else:
+            org_file = loader.load(path)
+            text = org_file.text
+            warnings.extend(org_file.warnings)
+            org2ical._apply_file_states(org_file, input_options)
+        converter = org2ical.Converter(**input_options)
+        warnings_ = org2ical.diagnostics.Warnings(converter.max_warnings)
+        source = converter.parse(text, warnings=warnings_)
+        events, _ = converter.events(source, warnings=warnings_)
+        warnings.extend(warnings_)
+        yield from events
+
+
+def _freebusy(
+        inputs: List[str],
+        days: int,
+        options: Dict[str, Any],
+        ) -> Tuple[str, List[Any]]:
+    """Returns the VFREEBUSY calendar of all inputs, from the start of
+    today (UTC) for `days` days, and the warnings."""
+    # pylint: disable=import-outside-toplevel
+    from org2ical import freebusy
+    start = datetime.combine(options["now"].astimezone(timezone.utc).date(),
+                             time(), tzinfo=timezone.utc)
+    end = start + timedelta(days=days)
+    warnings: List[Any] = []
+    events = list(_iter_events(inputs, options, warnings))
+    converter = org2ical.Converter(**options)
+    ical_str = freebusy.dumps(
+        freebusy.periods(events, start, end), start, end,
+        dtstamp=converter.encode_dtstamp(),
+        prod_id=converter.prod_id)
+    return ical_str, warnings
+
+
+def _write_json(output: str, format_: str, inputs: List[str], options: Dict[str, Any]) -> List[Any]:
+    """Writes the events of all inputs as jCal or NDJSON, and returns the
+    warnings."""
+    # pylint: disable=import-outside-toplevel
+    from org2ical import jcal
+    warnings: List[Any] = []
+    events = _iter_events(inputs, options, warnings)
+    converter = org2ical.Converter(**options)
+    dtstamp = converter.encode_dtstamp()
+    fp = sys.stdout if output == "-" else open(output, "w", encoding="utf-8", newline="")
+    try:
+        if format_ == "ndjson":
+            jcal.dump_ndjson(events, fp, dtstamp=dtstamp)
+        else:
+            jcal.dump(events, fp, dtstamp=dtstamp, prod_id=converter.prod_id)
+    finally:
+        if fp is not sys.stdout:
+            fp.close()
+    return warnings
+
+
+def _check(inputs: List[str], options: Dict[str, Any], quiet: bool) -> int:
+    """Prints the warnings of all inputs, unless `quiet`, and returns the
+    exit status."""
+    # pylint: disable=import-outside-toplevel
+    from org2ical import lint
+    status = 0
+    loader = org2ical.include.Loader()
+    for path in inputs:
+        if path == "-":
+            warnings = lint.check(sys.stdin.read(), **options)
+        else:
+            warnings = lint.check_file(path, loader=loader, **options)
+        for warning in warnings if not quiet else ():
+            location = (f"{warning.file or path}:{warning.line}" if warning.line is not None
+                        else path)
+            print(f"{location}: {warning}")
+        status = status or int(bool(warnings))
+    return status
+
+
+def _merge(path: str, output: str, entries_str: str, source: str, prod_id: str) -> None:
+    # pylint: disable=import-outside-toplevel
+    from org2ical.merge import merge, merge_file
+    if output != "-":
+        merge_file(path, entries_str, output, source=source, prod_id=prod_id)
+    elif os.path.exists(path):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            merge(f, entries_str, sys.stdout, source=source, prod_id=prod_id)
+    else:
+        merge([], entries_str, sys.stdout, source=source, prod_id=prod_id)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Runs the command-line interface and returns the exit status."""
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    if args.publish and args.output == "-":
+        parser.error("--publish requires --output")
+    if args.publish and args.merge:
+        parser.error("--publish cannot be combined with --merge")
+    if args.freebusy is not None and (args.merge or args.just_entries):
+        parser.error("--freebusy cannot be combined with --merge or --just-entries")
+    if args.format != "ical" and (args.freebusy is not None or args.merge
+                                  or args.just_entries or args.publish):
+        parser.error(f"--format {args.format} cannot be combined with --freebusy, "
+                     "--merge, --just-entries or --publish")
+    if args.store and (args.check or args.freebusy is not None or args.merge
+                       or args.publish or args.format != "ical"):
+        parser.error("--store cannot be combined with --check, --freebusy, --merge, "
+                     "--publish or --format")
+    if args.check and (args.freebusy is not None or args.merge or args.publish):
+        parser.error("--check cannot be combined with --freebusy, --merge or --publish")
+    if args.worker:
+        # pylint: disable=import-outside-toplevel
+        from org2ical.worker import serve
+        serve()
+        return 0
+    options: Dict[str, Any] = {
+        "now": (args.now if args.now is not None
+                else datetime.now(tz=timezone.utc)),
+        "categories": set(args.categories) if args.categories else None,
+        "ignore_states": (set(args.ignore_states)
+                          if args.ignore_states else None),
+        "ignore_tags": set(args.ignore_tags) if args.ignore_tags else None,
+        "include_types": (set(args.include_types)
+                          if args.include_types else None),
+        "from_tz": args.from_tz,
+        "to_tz": args.to_tz,
+        "todo_states": args.todo_states,
+        "done_states": args.done_states,
+        "clock_merge": args.clock_merge,
+        "clock_merge_gap": timedelta(minutes=args.clock_merge_gap),
+        "max_warnings": 0 if args.quiet else args.max_warnings,
+        "select": args.select,
+        "limits": org2ical.Limits(**dict(args.limits or [])),
+        "collapse_series": args.collapse_series,
+    }
+    if args.publish:
+        # pylint: disable=import-outside-toplevel
+        from org2ical.publish import DTSTAMP
+        options["dtstamp"] = args.now if args.now is not None else DTSTAMP
+    prod_id = (args.prod_id if args.prod_id is not None
+               else org2ical._PROD_ID)
+    options["prod_id"] = prod_id
+
+    if args.store:
+        # pylint: disable=import-outside-toplevel
+        from org2ical.store import Store
+        if "-" in args.inputs:
+            parser.error("--store cannot read stdin")
+        with Store(args.store, **options) as store:
+            _, store_warnings = store.update(args.inputs)
+        _print_warnings(args, store_warnings)
+        return 0
+
+    if args.check:
+        # `-q` only silences the output, the exit status still counts
+        return _check(args.inputs, dict(options, max_warnings=args.max_warnings), args.quiet)
+
+    if args.freebusy is not None:
+        ical_str, freebusy_warnings = _freebusy(args.inputs, args.freebusy, options)
+        if args.publish:
+            # pylint: disable=import-outside-toplevel
+            from org2ical.publish import publish
+            publish(args.output, ical_str)
+        else:
+            _write_output(args.output, ical_str)
+        _print_warnings(args, freebusy_warnings)
+        return 0
+
+    if args.format != "ical":
+        _print_warnings(args, _write_json(args.output, args.format, args.inputs, options))
+        return 0
+
+    entries: List[str] = []
+    warnings: List[org2ical.diagnostics.OrgWarning] = []
+    loader = org2ical.include.Loader()
+    for path in args.inputs:
+        if path == "-":
+            entries_str, warnings_ = org2ical.loads(
+                sys.stdin.read(), just_entries=True, **options)
+        else:
+            entries_str, warnings_ = org2ical.load(
+                path, loader=loader, just_entries=True, **options)
+        if entries_str:
+            entries.append(entries_str)
+        warnings.extend(warnings_)
+
+    entries_str = "\n".join(entries)
+    if args.merge:
+        _merge(args.merge, args.output, entries_str, args.merge_source, prod_id)
+    else:
+        if args.just_entries:
+            ical_str = entries_str
+        else:
+            ical_str = org2ical._construct_vcalendar(entries_str, prod_id)
+        if args.publish:
+            # pylint: disable=import-outside-toplevel
+            from org2ical.publish import publish
+            publish(args.output, ical_str)
+        else:
+            _write_output(args.output, ical_str)
+    _print_warnings(args, warnings)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
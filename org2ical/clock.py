@@ -0,0 +1,216 @@
+"""Columnar export and aggregation of CLOCK intervals.
+
+Years of clock history are better analysed as arrays than as one VEVENT
+per CLOCK line. `ClockTable` stores finished clock intervals column by
+column as NumPy arrays, and totals per heading, tag, day or week are
+computed with vectorized operations::
+
+    table = org2ical.clock.loads(org_str, ignore_states=set())
+    paths, seconds = table.totals_by_path()
+
+Times are kept as written in the org file (wall-clock time, no timezone
+conversion), and an interval is attributed to the day it started on.
+NumPy is an optional dependency: `pip install org2ical[clock]`. The
+interval merging used by `loads(..., clock_merge=...)` is pure Python.
+"""
+
+# pylint: disable=protected-access
+import csv
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+
+import org2ical
+
+if TYPE_CHECKING:
+    import numpy
+    import orgparse
+
+_CSV_FIELDS = ["start", "end", "duration", "path", "tags"]
+
+
+def _numpy() -> Any:
+    try:
+        import numpy  # pylint: disable=import-outside-toplevel
+    except ImportError as e:
+        raise ImportError(
+            "org2ical.clock requires NumPy: pip install org2ical[clock]") from e
+    return numpy
+
+
+def merge_intervals(
+        intervals: List[Tuple[datetime, datetime]],
+        gap: timedelta = timedelta(0),
+        ) -> List[Tuple[datetime, datetime, timedelta, int]]:
+    """Merges overlapping intervals, and intervals at most `gap` apart,
+    with a sort and a linear sweep.
+
+    Returns `(start, end, clocked, count)` tuples, where `clocked` is the
+    time covered by the `count` merged intervals, excluding the gaps.
+    """
+    merged: List[Tuple[datetime, datetime, timedelta, int]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + gap:
+            last_start, last_end, clocked, count = merged[-1]
+            if end > last_end:
+                clocked += end - max(start, last_end)
+                last_end = end
+            merged[-1] = (last_start, last_end, clocked, count + 1)
+        else:
+            merged.append((start, end, end - start, 1))
+    return merged
+
+
+def format_duration(duration: timedelta) -> str:
+    """Formats a duration like org does, e.g. `1:05`."""
+    minutes = int(duration.total_seconds()) // 60
+    return f"{minutes // 60}:{minutes % 60:02d}"
+
+
+class ClockTable:
+    """Finished CLOCK intervals in columnar form.
+
+    Row `i` is the interval from `start[i]` to `end[i]` (`datetime64[s]`),
+    lasting `duration[i]` seconds, clocked on heading `paths[path_id[i]]`.
+    The tags of row `i` are `tags[tag_ids[tag_offsets[i]:tag_offsets[i + 1]]]`,
+    including inherited tags.
+    """
+
+    def __init__(
+            self,
+            start: "numpy.ndarray",
+            end: "numpy.ndarray",
+            path_id: "numpy.ndarray",
+            paths: List[str],
+            tag_offsets: "numpy.ndarray",
+            tag_ids: "numpy.ndarray",
+            tags: List[str],
+            ):
+        np = _numpy()
+        self.start = start
+        self.end = end
+        self.duration = (end - start).astype(np.int64)
+        self.path_id = path_id
+        self.paths = paths
+        self.tag_offsets = tag_offsets
+        self.tag_ids = tag_ids
+        self.tags = tags
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def totals_by_path(self) -> Tuple["numpy.ndarray", "numpy.ndarray"]:
+        """Returns headings (org paths) and their total clocked seconds."""
+        np = _numpy()
+        totals = np.bincount(self.path_id, weights=self.duration,
+                             minlength=len(self.paths))
+        return np.array(self.paths, dtype=object), totals.astype(np.int64)
+
+    def totals_by_tag(self) -> Tuple["numpy.ndarray", "numpy.ndarray"]:
+        """Returns tags and their total clocked seconds. An interval counts
+        fully towards each of its tags."""
+        np = _numpy()
+        weights = np.repeat(self.duration, np.diff(self.tag_offsets))
+        totals = np.bincount(self.tag_ids, weights=weights,
+                             minlength=len(self.tags))
+        return np.array(self.tags, dtype=object), totals.astype(np.int64)
+
+    def totals_by_day(self) -> Tuple["numpy.ndarray", "numpy.ndarray"]:
+        """Returns days (`datetime64[D]`) and their total clocked seconds."""
+        return self._totals_by(self.start.astype("datetime64[D]"))
+
+    def totals_by_week(self) -> Tuple["numpy.ndarray", "numpy.ndarray"]:
+        """Returns the Mondays starting each week and the week's total
+        clocked seconds."""
+        np = _numpy()
+        days = self.start.astype("datetime64[D]")
+        # 1970-01-01 was a Thursday, three days after a Monday.
+        offsets = (days.astype(np.int64) + 3) % 7
+        return self._totals_by(days - offsets.astype("timedelta64[D]"))
+
+    def _totals_by(self, keys: "numpy.ndarray") -> Tuple["numpy.ndarray", "numpy.ndarray"]:
+        np = _numpy()
+        unique, inverse = np.unique(keys, return_inverse=True)
+        totals = np.bincount(inverse.ravel(), weights=self.duration,
+                             minlength=len(unique))
+        return unique, totals.astype(np.int64)
+
+    def to_csv(self, path: str) -> None:
+        """Writes one row per interval, with `:`-separated tags."""
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(_CSV_FIELDS)
+            for i in range(len(self)):
+                row_tags = self.tag_ids[self.tag_offsets[i]:self.tag_offsets[i + 1]]
+                writer.writerow([
+                    str(self.start[i]), str(self.end[i]), int(self.duration[i]),
+                    self.paths[self.path_id[i]],
+                    ":".join(self.tags[t] for t in row_tags),
+                ])
+
+    def save(self, path: str) -> None:
+        """Writes the table as a compressed NumPy `.npz` file."""
+        np = _numpy()
+        np.savez_compressed(
+            path, start=self.start, end=self.end, path_id=self.path_id,
+            paths=np.array(self.paths, dtype=str),
+            tag_offsets=self.tag_offsets, tag_ids=self.tag_ids,
+            tags=np.array(self.tags, dtype=str))
+
+    @classmethod
+    def load(cls, path: str) -> "ClockTable":
+        """Reads a table written by `save()`."""
+        np = _numpy()
+        with np.load(path) as data:
+            return cls(data["start"], data["end"], data["path_id"],
+                       data["paths"].tolist(), data["tag_offsets"],
+                       data["tag_ids"], data["tags"].tolist())
+
+
+def extract(
+        converter: "org2ical.Converter",
+        source: "orgparse.node.OrgRootNode",
+        ) -> ClockTable:
+    """Collects the finished clocks of a parsed org tree, skipping the
+    nodes that `converter` ignores."""
+    np = _numpy()
+    starts: List[Any] = []
+    ends: List[Any] = []
+    path_ids: List[int] = []
+    paths: List[str] = []
+    tag_offsets = [0]
+    tag_ids: List[int] = []
+    tag_index: Dict[str, int] = {}
+    path_cache: Dict[int, str] = {}
+    for node in source[1:]:  # [1:] for skipping root itself
+        if not node.clock or converter._node_is_ignored(node):
+            continue
+        node_tags = [tag_index.setdefault(tag, len(tag_index))
+                     for tag in sorted(node.tags)]
+        path_id = -1
+        for d in node.clock:
+            if d.end is None:
+                continue  # Skip clocks that are still running
+            if path_id < 0:
+                path_id = len(paths)
+                paths.append(org2ical._node_full_path(node, path_cache))
+            starts.append(d.start)
+            ends.append(d.end)
+            path_ids.append(path_id)
+            tag_ids.extend(node_tags)
+            tag_offsets.append(len(tag_ids))
+    return ClockTable(
+        np.array(starts, dtype="datetime64[s]"),
+        np.array(ends, dtype="datetime64[s]"),
+        np.array(path_ids, dtype=np.int32),
+        paths,
+        np.array(tag_offsets, dtype=np.int64),
+        np.array(tag_ids, dtype=np.int32),
+        list(tag_index))
+
+
+def loads(org_str: str, **options: Any) -> ClockTable:
+    """Parses an org-mode string and returns its clock table. `options`
+    are the `Converter` options; only the ignore and TODO keyword options
+    have an effect."""
+    converter = org2ical.Converter(**options)
+    return extract(converter, converter.parse(org_str))
@@ -0,0 +1,123 @@
+"""Structured conversion warnings.
+
+Warnings are collected as `OrgWarning` objects that take the line and
+org path of their node when created, without keeping the node (and with
+it the parsed tree) alive, and only render their text when asked to.
+Conversions pass the org path they already built for the node, so that
+a warning does not walk up the tree again.
+Batch conversions that discard warnings therefore do not pay for
+formatting them, and `max_warnings=0` skips collecting them.
+"""
+
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import org2ical
+
+if TYPE_CHECKING:
+    import orgparse
+
+# Warning codes
+MULTIPLE_KEYWORDS = "multiple-keywords"
+MISSING_TIMESTAMP = "missing-timestamp"
+INVALID_DIARY = "invalid-diary"
+INCLUDE = "include"
+LIMIT = "limit"
+
+
+class OrgWarning:
+    """A conversion warning.
+
+    `line` is the 1-based line number of the node's heading, if any, in
+    `file` when it was located in an org file (see `org2ical.load()`), or
+    in the converted text. `path` is the node's org path, which is
+    computed from the node if not given. The text (`str(warning)`) is
+    rendered on demand, and a warning compares equal to its text.
+    """
+    __slots__ = ("code", "message", "line", "file", "path")
+
+    def __init__(
+            self,
+            code: str,
+            message: str,
+            node: Optional["orgparse.OrgNode"] = None,
+            path: Optional[str] = None,
+            ):
+        self.code = code
+        self.message = message
+        self.line: Optional[int] = node.linenumber if node is not None else None
+        self.file: Optional[str] = None
+        # The org path of the node, with ` > ` as delimiter
+        if path is None and node is not None:
+            path = org2ical._node_full_path(node)  # pylint: disable=protected-access
+        self.path = path
+
+    def __str__(self) -> str:
+        if self.path is None:
+            return f"WARNING: {self.message}."
+        return f"WARNING: {self.message} in node: `{self.path}`."
+
+    def __repr__(self) -> str:
+        return f"OrgWarning({self.code!r}, {str(self)!r}, line={self.line})"
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, OrgWarning):
+            return (self.code, self.line, str(self)) == (other.code, other.line, str(other))
+        if isinstance(other, str):
+            return str(self) == other
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(str(self))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns the warning as a JSON-compatible dict."""
+        return {
+            "code": self.code,
+            "message": self.message,
+            "line": self.line,
+            "path": self.path,
+            "text": str(self),
+        }
+
+
+class Warnings(List[OrgWarning]):
+    """A list of warnings that stops collecting at `limit` warnings.
+
+    `limit=None` collects all warnings and `limit=0` none at all. The
+    number of warnings that did not fit is counted in `dropped`.
+    """
+
+    def __init__(self, limit: Optional[int] = None):
+        super().__init__()
+        self.limit = limit
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether warnings are collected at all."""
+        return self.limit != 0
+
+    def add(
+            self,
+            code: str,
+            message: str,
+            node: Optional["orgparse.OrgNode"] = None,
+            path: Optional[str] = None,
+            ) -> None:
+        """Adds a warning, unless the limit has been reached. `path` is
+        the org path of `node`, if already known."""
+        if self.limit is not None and len(self) >= self.limit:
+            self.dropped += 1
+            return
+        self.append(OrgWarning(code, message, node, path))
+
+    def add_all(self, warnings: List[OrgWarning]) -> None:
+        """Adds already constructed warnings, up to the limit. The warnings
+        dropped by `warnings`, if a `Warnings`, count as dropped."""
+        if isinstance(warnings, Warnings):
+            self.dropped += warnings.dropped
+        for warning in warnings:
+            if self.limit is not None and len(self) >= self.limit:
+                self.dropped += 1
+            else:
+                self.append(warning)
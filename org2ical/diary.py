@@ -0,0 +1,196 @@
+"""Compiles org diary sexps (`<%%(diary-...)>`) into recurrence rules.
+
+Supported sexps, with dates in the default (American) `month day year`
+order, or in ISO `year month day` order when the first number has four
+digits:
+
+* `(diary-float MONTHS DAYNAME N [DAY])`: the N-th DAYNAME of MONTHS, where
+  MONTHS is `t`, a month or a list such as `'(3 9)`.
+* `(diary-anniversary MONTH DAY YEAR)`: every year since the given date.
+* `(diary-block M1 D1 Y1 M2 D2 Y2)`: every day between the two dates.
+* `(diary-cyclic N MONTH DAY YEAR)`: every N days since the given date.
+
+All patterns are compiled once at import time, and the sexps of a node
+are found with a single scan over its text.
+"""
+
+import functools
+import re
+from datetime import date, datetime, timedelta
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+# A diary-sexp timestamp, optionally followed by a time (range) as
+# supported since org 9.7: `<%%(diary-float t 2 2) 19:00-23:00>`.
+# Arguments may contain one level of parentheses for month lists.
+_SEXP_RE = re.compile(
+    r"<%%\((diary-[a-z-]+)((?:[^()<>]|\([^()<>]*\))*)\)"
+    r"(?:\s+(\d?\d:\d\d)(?:-(\d?\d:\d\d))?)?\s*>")
+_ARG_RE = re.compile(r"'?\([^()]*\)|[^\s()]+")
+_INT_RE = re.compile(r"[+-]?\d+")
+# Time in the heading: `19:00-23:00 STG` or `19:00 STG`.
+_HEADING_TIME_RE = re.compile(r"(\d{2}:\d{2})(?:-(\d{2}:\d{2}))?(?: (.*))?")
+
+# Diary sexps without an explicit start date start at the beginning of time.
+_EPOCH = date(1985, 1, 1)
+_DAYS = ["SU", "MO", "TU", "WE", "TH", "FR", "SA"]
+
+
+class DiaryRule(NamedTuple):
+    """A compiled diary sexp.
+
+    `end` is the inclusive last day of a `diary-block`, times are `HHMM`
+    strings, and `rrule` is a full `RRULE:` line or empty.
+    """
+    sexp: str
+    start: date
+    end: Optional[date] = None
+    rrule: str = ""
+    start_time: Optional[str] = None
+    end_time: Optional[str] = None
+
+
+class DiarySexp(NamedTuple):
+    """A diary-sexp timestamp as found in the text, not yet compiled."""
+    text: str
+    function: str
+    args: Tuple[str, ...]
+    start_time: Optional[str]
+    end_time: Optional[str]
+
+
+def find_sexps(text: str) -> Iterator[DiarySexp]:
+    """Finds all diary-sexp timestamps in `text` in a single pass."""
+    for m in _SEXP_RE.finditer(text):
+        yield DiarySexp(
+            m.group(0), m.group(1), tuple(_ARG_RE.findall(m.group(2))),
+            _clean_time(m.group(3)), _clean_time(m.group(4)))
+
+
+def compile_sexp(sexp: DiarySexp) -> DiaryRule:
+    """Compiles a diary sexp, raising `ValueError` if it is unsupported or
+    malformed."""
+    rule = _compile_args(sexp.function, sexp.args)
+    if sexp.start_time:
+        rule = rule._replace(start_time=sexp.start_time, end_time=sexp.end_time)
+    return rule
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile_args(function: str, args: Tuple[str, ...]) -> DiaryRule:
+    """Compiles the time-less part of a sexp. Cached, since holiday and
+    meeting files repeat the same sexps many times."""
+    compiler = _COMPILERS.get(function)
+    if compiler is None:
+        raise ValueError(f"Unsupported diary sexp `{function}`")
+    try:
+        return compiler(args)
+    except (IndexError, ValueError) as e:
+        raise ValueError(f"Invalid {function}") from e
+
+
+def parse_heading_time(heading: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """Returns the start time, end time and remaining summary of a heading
+    such as `19:00-23:00 STG`."""
+    m = _HEADING_TIME_RE.search(heading)
+    if not m:
+        return None, None, None
+    summary = m.group(3).strip() if m.group(3) else None
+    return _clean_time(m.group(1)), _clean_time(m.group(2)), summary
+
+
+def _clean_time(time: Optional[str]) -> Optional[str]:
+    return time.replace(":", "").zfill(4) if time else None
+
+
+def _int(arg: str) -> int:
+    if not _INT_RE.fullmatch(arg):
+        raise ValueError(f"Not an integer: {arg}")
+    return int(arg)
+
+
+def _date(args: Tuple[str, ...]) -> date:
+    """Parses a `month day year` (or ISO `year month day`) triple."""
+    if len(args) != 3:
+        raise ValueError("Expected a date")
+    a, b, c = (_int(arg) for arg in args)
+    if len(args[0].lstrip("+-")) == 4:
+        return date(a, b, c)
+    return date(c, a, b)
+
+
+def _months(arg: str) -> List[int]:
+    """Parses `t`, a month number or a month list such as `'(3 9)`."""
+    if arg == "t":
+        return []
+    months = [_int(m) for m in arg.lstrip("'").strip("()").split()]
+    if not months or any(not 1 <= m <= 12 for m in months):
+        raise ValueError(f"Invalid months: {arg}")
+    return sorted(set(months))
+
+
+def _compile_float(args: Tuple[str, ...]) -> DiaryRule:
+    if len(args) not in (3, 4):
+        raise ValueError("Expected MONTHS DAYNAME N [DAY]")
+    months = _months(args[0])
+    weekday = _int(args[1])
+    pos = _int(args[2])
+    if not 0 <= weekday <= 6 or pos == 0 or abs(pos) > 5:
+        raise ValueError("Invalid DAYNAME or N")
+    day = _DAYS[weekday]
+    if len(args) == 3 and not months:
+        # FREQ=MONTHLY;BYSETPOS=-1;BYDAY=MO;INTERVAL=1
+        rrule = f"RRULE:FREQ=MONTHLY;BYSETPOS={pos};BYDAY={day};INTERVAL=1"
+        return DiaryRule("diary-float", _EPOCH, rrule=rrule)
+    if len(args) == 4:
+        # The N-th DAYNAME on or after (N < 0: on or before) DAY always
+        # falls within a fixed week of month days.
+        month_day = _int(args[3])
+        first = month_day + 7 * (pos - 1) if pos > 0 else month_day + 7 * (pos + 1) - 6
+        if first < 1 or first + 6 > 28:
+            raise ValueError("DAY does not fall within every month")
+        by_day = f"BYDAY={day};BYMONTHDAY={','.join(str(first + i) for i in range(7))}"
+    else:
+        by_day = f"BYDAY={pos}{day}"
+    if not months:
+        rrule = f"RRULE:FREQ=MONTHLY;{by_day};INTERVAL=1"
+    else:
+        by_month = ",".join(str(m) for m in months)
+        rrule = f"RRULE:FREQ=YEARLY;BYMONTH={by_month};{by_day};INTERVAL=1"
+    return DiaryRule("diary-float", _EPOCH, rrule=rrule)
+
+
+def _compile_anniversary(args: Tuple[str, ...]) -> DiaryRule:
+    return DiaryRule("diary-anniversary", _date(args[:3]),
+                     rrule="RRULE:FREQ=YEARLY;INTERVAL=1")
+
+
+def _compile_block(args: Tuple[str, ...]) -> DiaryRule:
+    if len(args) != 6:
+        raise ValueError("Expected two dates")
+    start, end = _date(args[:3]), _date(args[3:])
+    if end < start:
+        raise ValueError("Block ends before it starts")
+    return DiaryRule("diary-block", start, end)
+
+
+def _compile_cyclic(args: Tuple[str, ...]) -> DiaryRule:
+    if len(args) != 4:
+        raise ValueError("Expected N and a date")
+    interval = _int(args[0])
+    if interval < 1:
+        raise ValueError("Invalid interval")
+    return DiaryRule("diary-cyclic", _date(args[1:]),
+                     rrule=f"RRULE:FREQ=DAILY;INTERVAL={interval}")
+
+
+_COMPILERS = {
+    "diary-float": _compile_float,
+    "diary-anniversary": _compile_anniversary,
+    "diary-block": _compile_block,
+    "diary-cyclic": _compile_cyclic,
+}
+
+
+def time_after(time: str, hours: int = 1) -> str:
+    """Returns the `HHMM` time `hours` after `time`."""
+    return (datetime.strptime(time, "%H%M") + timedelta(hours=hours)).strftime("%H%M")
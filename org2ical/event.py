@@ -0,0 +1,35 @@
+"""The event types and the converted `Event`.
+
+A leaf module, so that the converter (`org2ical`) and the extractors
+(`org2ical.extractors`) can both import it at the top; use the names
+re-exported by `org2ical`.
+"""
+
+from typing import NamedTuple, Optional, Set, Tuple
+
+DEADLINE = 'DEADLINE'
+SCHEDULED = 'SCHEDULED'
+TIMESTAMP = 'TIMESTAMP'
+CLOCK = 'CLOCK'
+BIRTHDAY = 'BIRTHDAY'
+DIARY = 'DIARY'
+# Ignore inactive timestamps
+
+# Values of `clock_merge`
+HEADING = 'heading'
+DAY = 'day'
+
+
+class Event(NamedTuple):
+    """A converted event, with dates already in iCalendar encoding.
+    `rdates` are the starts of further occurrences (`RDATE`)."""
+    start: str
+    end: Optional[str]
+    summary: str
+    description: str
+    categories: Set[str]
+    rrule: str = ""
+    is_dayevent: bool = False
+    tzprefix: str = ""
+    location: Optional[str] = None
+    rdates: Tuple[str, ...] = ()
@@ -0,0 +1,230 @@
+"""The event extractors, one per `include_types` value.
+
+An extractor turns a node into events of one type. It declares the
+textual markers a node needs to contain for it to find anything, e.g.
+`CLOCK:` for clock entries, and the converter only dispatches a node to
+the extractors whose markers appear in the node's raw text. Nodes
+without any marker cost a few substring searches and nothing else.
+
+Custom extractors are registered with a decorator and enabled through
+`include_types`::
+
+    @org2ical.extractors.register("ANNIVERSARY", markers=[":ANNIVERSARY:"])
+    def anniversary(ctx):
+        day = ctx.node.get_property("ANNIVERSARY")
+        ...
+        return [org2ical.Event(...)]
+
+    org2ical.loads(org_str, include_types={"ANNIVERSARY"})
+"""
+
+# pylint: disable=protected-access
+from datetime import date, datetime, timedelta
+from typing import (TYPE_CHECKING, Callable, Dict, Iterable, List, NamedTuple, Optional,
+                    Sequence, Tuple)
+
+import org2ical
+from org2ical import diagnostics
+from org2ical.event import (BIRTHDAY, CLOCK, DAY, DEADLINE, DIARY, HEADING, SCHEDULED,
+                            TIMESTAMP, Event)
+
+if TYPE_CHECKING:
+    import orgparse
+
+
+class Context(NamedTuple):
+    """What an extractor gets to know about a node.
+
+    `summary`, `description` (with the org path) and `location` are
+    prepared once per node for all extractors.
+    """
+    converter: "org2ical.Converter"
+    node: "orgparse.OrgNode"
+    now: datetime
+    warnings: diagnostics.Warnings
+    summary: str
+    description: str
+    location: Optional[str]
+    path: str
+    # (start, end, org path) of all clocks, for `clock_merge=DAY`
+    day_clocks: List[Tuple[datetime, datetime, str]]
+
+
+Extractor = Callable[[Context], Iterable[Event]]
+
+
+class _Registered(NamedTuple):
+    function: Extractor
+    markers: Tuple[str, ...]
+
+
+_REGISTRY: Dict[str, _Registered] = {}
+
+
+def register(name: str, markers: Sequence[str]) -> Callable[[Extractor], Extractor]:
+    """Registers an extractor for the `include_types` value `name`.
+
+    `markers` are substrings of which at least one appears in the raw
+    text (heading, planning lines, drawers and body) of every node the
+    extractor finds events in. Extractors run in registration order.
+
+    Register extractors at import time: a `Converter` takes its table of
+    extractors when it is created, and the registry is not locked.
+    """
+    if not markers:
+        raise ValueError(f"Extractor {name} needs at least one marker")
+
+    def decorator(function: Extractor) -> Extractor:
+        _REGISTRY[name] = _Registered(function, tuple(markers))
+        return function
+    return decorator
+
+
+def names() -> List[str]:
+    """Returns the names of all registered extractors."""
+    return list(_REGISTRY)
+
+
+def marker_table(include_types: Iterable[str]) -> List[Tuple[str, List[Tuple[int, Extractor]]]]:
+    """Returns, for each marker of the given extractors, the extractors
+    (with their registration index, for ordering) that need it."""
+    include_types = set(include_types)
+    table: Dict[str, List[Tuple[int, Extractor]]] = {}
+    for index, (name, registered) in enumerate(_REGISTRY.items()):
+        if name in include_types:
+            for marker in registered.markers:
+                table.setdefault(marker, []).append((index, registered.function))
+    return list(table.items())
+
+
+@register(SCHEDULED, markers=[SCHEDULED])
+def _scheduled(ctx: Context) -> List[Event]:
+    return _planning(ctx, SCHEDULED, ctx.node.scheduled)
+
+
+@register(DEADLINE, markers=[DEADLINE])
+def _deadline(ctx: Context) -> List[Event]:
+    return _planning(ctx, DEADLINE, ctx.node.deadline)
+
+
+def _planning(ctx: Context, keyword: str, timestamp: "orgparse.date.OrgDate") -> List[Event]:
+    from org2ical import lint  # pylint: disable=import-outside-toplevel
+
+    lint.check_planning(ctx.node, keyword, timestamp, ctx.warnings, ctx.path)
+    if not timestamp:
+        return []
+    start = ctx.converter._encode_date(timestamp.start)
+    rrule = org2ical._encode_rrule(timestamp._repeater)
+    return [Event(
+        start, None, ctx.summary, ctx.description,
+        ctx.converter.categories.union({keyword}), rrule=rrule, is_dayevent=True,
+        location=ctx.location)]
+
+
+@register(TIMESTAMP, markers=["<"])
+def _timestamp(ctx: Context) -> List[Event]:
+    node, _encode_date = ctx.node, ctx.converter._encode_date
+    categories = ctx.converter.categories.union({TIMESTAMP})
+    events = []
+    for d in node.get_timestamps(active=True, point=True):
+        is_dayevent = type(d.start) == date  # pylint: disable=unidiomatic-typecheck
+        start = _encode_date(d.start)
+        end = _encode_date(d.start + timedelta(hours=1)) if not is_dayevent else None
+        rrule = org2ical._encode_rrule(d._repeater)
+        events.append(Event(
+            start, end, ctx.summary, ctx.description,
+            categories, rrule=rrule, is_dayevent=is_dayevent, location=ctx.location))
+    for d in node.get_timestamps(active=True, range=True):
+        start = _encode_date(d.start)
+        end = _encode_date(d.end, is_range_end=True)
+        rrule = org2ical._encode_rrule(d._repeater)
+        events.append(Event(
+            start, end, ctx.summary, ctx.description,
+            categories, rrule=rrule, location=ctx.location))
+    if ctx.converter.collapse_series:
+        from org2ical import series  # pylint: disable=import-outside-toplevel
+        return series.collapse(events)
+    return events
+
+
+@register(CLOCK, markers=["CLOCK:"])
+def _clock(ctx: Context) -> List[Event]:
+    converter, node = ctx.converter, ctx.node
+    categories = converter.categories.union({CLOCK})
+    if converter.clock_merge == DAY:
+        ctx.day_clocks.extend((d.start, d.end, ctx.path) for d in node.clock if d.end is not None)
+        return []
+    if converter.clock_merge == HEADING:
+        from org2ical import clock  # pylint: disable=import-outside-toplevel
+        intervals = [(d.start, d.end) for d in node.clock if d.end is not None]
+        return [Event(
+            converter._encode_date(start), converter._encode_date(end), ctx.summary,
+            "Clocked: {} in {} interval{}\n\n{}".format(
+                clock.format_duration(clocked), count, "" if count == 1 else "s",
+                ctx.description),
+            categories, location=ctx.location)
+                for start, end, clocked, count
+                in clock.merge_intervals(intervals, converter.clock_merge_gap)]
+    events = []
+    for d in node.clock:
+        if d.end is None:
+            continue  # Skip clocks that are still running
+        events.append(Event(
+            converter._encode_date(d.start), converter._encode_date(d.end),
+            ctx.summary, ctx.description, categories, location=ctx.location))
+    return events
+
+
+@register(BIRTHDAY, markers=[":BIRTHDAY:"])
+def _birthday(ctx: Context) -> List[Event]:
+    birthday = ctx.node.properties.get("BIRTHDAY")
+    if not birthday:
+        return []
+    start = datetime.strptime(birthday, "%Y-%m-%d")
+    age = ctx.now.year - start.year
+    description = "- Birthyear: {}\n- Age {}: {}\n\n".format(start.year, ctx.now.year, age)
+    return [Event(
+        start.strftime("%Y%m%d"), None, "{} Birthday".format(ctx.summary), description,
+        ctx.converter.categories.union({BIRTHDAY}),
+        rrule="RRULE:FREQ=YEARLY;INTERVAL=1", is_dayevent=True, location=ctx.location)]
+
+
+@register(DIARY, markers=["<%%("])
+def _diary(ctx: Context) -> List[Event]:
+    from org2ical import diary  # pylint: disable=import-outside-toplevel
+
+    converter, node = ctx.converter, ctx.node
+    summary = ctx.summary
+    events = []
+    for rule in org2ical._node_get_diaries(node, ctx.warnings, ctx.path):
+        start = rule.start.strftime("%Y%m%d")
+        rrule = rule.rrule
+
+        # take start/end-time from the sexp, or from the heading if it exists
+        if rule.start_time:
+            stime, etime, summary2 = rule.start_time, rule.end_time, node.heading.strip()
+        else:
+            stime, etime, summary2 = diary.parse_heading_time(node.heading)
+        summary = summary2 if summary2 else summary
+        if not stime:
+            # an untimed sexp covers whole days, up to the end of a block
+            endt = converter._encode_date(
+                rule.end if rule.end is not None else rule.start, is_range_end=True)
+            events.append(Event(
+                start, endt, summary, ctx.description,
+                converter.categories.union({'REGULAR'}), rrule=rrule,
+                is_dayevent=True, location=ctx.location))
+            continue
+        startt = start + "T" + stime + "00"
+        endt = start + "T" + (etime or diary.time_after(stime)) + "00"
+        if rule.end is not None:
+            # a timed block repeats its time slot on every day
+            rrule = "RRULE:FREQ=DAILY;COUNT={}".format((rule.end - rule.start).days + 1)
+
+        # repeated-dates without specific start-date are a bit annoying,
+        # so we hardcode `converter.tzprefix`
+        events.append(Event(
+            startt, endt, summary, ctx.description,
+            converter.categories.union({'REGULAR'}), rrule=rrule,
+            tzprefix=converter.tzprefix, location=ctx.location))
+    return events
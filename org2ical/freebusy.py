@@ -0,0 +1,98 @@
+"""Availability (VFREEBUSY) output.
+
+Instead of every event with its summary and body, `loads()` publishes
+only the busy time in a window: the timed occurrences of timestamps,
+SCHEDULED items with a time, CLOCK entries and diary events are collected
+(recurring events are expanded within the window), clipped to the window
+and merged with a sort and a sweep into compact `FREEBUSY` periods::
+
+    ical_str, warnings = org2ical.freebusy.loads(
+        org_str, start, end, include_types={"TIMESTAMP", "SCHEDULED", "DIARY"})
+
+All-day events, deadlines and birthdays do not block time.
+"""
+
+# pylint: disable=protected-access
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable, List, Tuple
+
+import org2ical
+from org2ical import clock, diagnostics, recurrence
+
+# Events with these categories never block time.
+_FREE_CATEGORIES = {org2ical.DEADLINE, org2ical.BIRTHDAY}
+
+
+def periods(
+        events: Iterable[org2ical.Event],
+        start: datetime,
+        end: datetime,
+        *,
+        gap: timedelta = timedelta(0),
+        ) -> List[Tuple[datetime, datetime]]:
+    """Returns the merged busy periods of `events` within `[start, end)`,
+    in UTC. Periods at most `gap` apart are merged as well."""
+    intervals = []
+    for event in events:
+        if _FREE_CATEGORIES.intersection(event.categories):
+            continue
+        for occurrence in recurrence.occurrences(event, start, end):
+            if occurrence.all_day:
+                break
+            intervals.append((max(occurrence.start, start), min(occurrence.end, end)))
+    utc = timezone.utc
+    return [(busy_start.astimezone(utc), busy_end.astimezone(utc))
+            for busy_start, busy_end, _, _ in clock.merge_intervals(intervals, gap)
+            if busy_end > busy_start]
+
+
+def dumps(
+        busy: List[Tuple[datetime, datetime]],
+        start: datetime,
+        end: datetime,
+        *,
+        dtstamp: str,
+        prod_id: str = org2ical._PROD_ID,
+        ) -> str:
+    """Serializes busy periods into a VCALENDAR with a single VFREEBUSY,
+    stamped with the encoded `dtstamp`. Every period gets its own
+    `FREEBUSY` line, so no line needs folding."""
+    lines = [f"FREEBUSY:{_utc(s)}/{_utc(e)}" for s, e in busy]
+    uid = hashlib.md5("\n".join([_utc(start), _utc(end)] + lines)
+                      .encode("utf-8")).hexdigest()
+    return "\n".join([
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{prod_id}",
+        "METHOD:PUBLISH",
+        "BEGIN:VFREEBUSY",
+        f"DTSTAMP:{dtstamp}",
+        f"UID:{uid}",
+        f"DTSTART:{_utc(start)}",
+        f"DTEND:{_utc(end)}",
+    ] + lines + [
+        "END:VFREEBUSY",
+        "END:VCALENDAR",
+        "",
+    ])
+
+
+def loads(
+        org_str: str,
+        start: datetime,
+        end: datetime,
+        **options: Any,
+        ) -> Tuple[str, List[diagnostics.OrgWarning]]:
+    """Returns the VFREEBUSY calendar of an org-mode string for the window
+    `[start, end)` (aware datetimes), and the warnings. `options` are the
+    `Converter` options."""
+    converter = org2ical.Converter(**options)
+    events, warnings = converter.events(converter.parse(org_str))
+    return dumps(periods(events, start, end), start, end,
+                 dtstamp=converter.encode_dtstamp(),
+                 prod_id=converter.prod_id), warnings
+
+
+def _utc(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
@@ -0,0 +1,303 @@
+"""Loads org files, resolving `#+INCLUDE:` and `#+SETUPFILE:` directives.
+
+`loads()` only sees a single string. `Loader` reads a file from disk,
+replaces `#+INCLUDE:` lines with the (recursively resolved) included file,
+and collects the TODO keywords of `#+TODO:` lines in the file itself and
+in its `#+SETUPFILE:` files. Each file is read and scanned for directives
+once, and the result is cached keyed on its path and modification time,
+so a shared include used by many files is only processed once per run.
+The resolved text of each file is still parsed as a whole: org syntax
+(TODO keywords, `:minlevel`) depends on the including file, so parsed
+subtrees are not cached.
+
+Supported `#+INCLUDE:` options are `:lines "A-B"` (lines A to B, with B
+excluded like in Org), `:minlevel N` and the block types (`src`,
+`example`, `export`, ...), which wrap the included text in a
+`#+BEGIN_...`/`#+END_...` block. Remote setup files are not supported.
+"""
+
+import bisect
+import os
+import re
+import shlex
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+from org2ical.diagnostics import INCLUDE, OrgWarning
+
+_DIRECTIVE_RE = re.compile(
+    r"^[ \t]*#\+(INCLUDE|SETUPFILE|(?:SEQ_|TYP_)?TODO):[ \t]*(.*)$",
+    re.IGNORECASE | re.MULTILINE)
+_HEADING_RE = re.compile(r"^(\*+)(?=\s)", re.MULTILINE)
+# Fast-access keys and logging settings, e.g. `TODO(t)` or `DONE(d!)`.
+_KEY_RE = re.compile(r"\([^()]*\)$")
+
+
+class _Include(NamedTuple):
+    path: str
+    lines: Optional[Tuple[Optional[int], Optional[int]]]
+    minlevel: Optional[int]
+    block: Optional[List[str]]
+
+
+class _File(NamedTuple):
+    """A scanned file: text chunks and includes, its own TODO keyword
+    lines and its setup files."""
+    key: Tuple[int, int]
+    segments: List[Union[str, _Include]]
+    todo_lines: List[str]
+    setupfiles: List[str]
+    warnings: List[OrgWarning]
+
+
+# (first line of the resolved text (0-based), file, its line there): the
+# following lines, up to the next run, come from consecutive lines of file.
+_Run = Tuple[int, str, int]
+
+
+class LoadedFile(NamedTuple):
+    """An org file with all includes resolved. `runs` map the lines of
+    `text` to the files they come from."""
+    text: str
+    todo_states: List[str]
+    done_states: List[str]
+    warnings: List[OrgWarning]
+    runs: Tuple[_Run, ...] = ()
+
+    def locate(self, line: int) -> Tuple[str, int]:
+        """Returns the file and line number that a (1-based) line of
+        `text` comes from."""
+        i = bisect.bisect_right(self.runs, (line - 1, "\U0010ffff")) - 1
+        if i < 0:
+            return "", line
+        first, path, source_line = self.runs[i]
+        return path, source_line + line - 1 - first
+
+    def locate_warnings(self, warnings: List[OrgWarning]) -> None:
+        """Points the `file` and `line` of warnings at the file and line
+        they come from."""
+        for warning in warnings:
+            if warning.line is not None:
+                warning.file, warning.line = self.locate(warning.line)
+
+
+class Loader:
+    """Reads org files, caching each file's scan on path and mtime.
+
+    A loader can be shared between threads.
+    """
+
+    def __init__(self):
+        self._files: Dict[str, _File] = {}
+        self._lock = threading.Lock()
+        self.reads = 0  # Number of files actually read from disk
+
+    def load(self, path: str) -> LoadedFile:
+        """Reads `path` and resolves its includes and setup files.
+
+        TODO keywords are empty when no `#+TODO:` line was found.
+        """
+        path = os.path.abspath(path)
+        warnings: List[OrgWarning] = []
+        todo_lines: List[str] = []
+        text, runs = self._resolve(path, (), todo_lines, warnings)
+        todo_states: List[str] = []
+        done_states: List[str] = []
+        for line in todo_lines:
+            todos, dones = _parse_todo_line(line)
+            todo_states.extend(s for s in todos if s not in todo_states)
+            done_states.extend(s for s in dones if s not in done_states)
+        return LoadedFile(text, todo_states, done_states, warnings, tuple(runs))
+
+    def _resolve(
+            self,
+            path: str,
+            stack: Tuple[str, ...],
+            todo_lines: List[str],
+            warnings: List[OrgWarning],
+            ) -> Tuple[str, List[_Run]]:
+        """Returns the resolved text of a file and where its lines come
+        from."""
+        f = self._scan(path)
+        warnings.extend(f.warnings)
+        todo_lines.extend(f.todo_lines)
+        for setupfile in f.setupfiles:
+            self._setup(setupfile, stack + (path,), todo_lines, warnings)
+        parts = []
+        runs: List[_Run] = []
+        lines = 0  # Lines of the resolved text so far
+        source_line = 1
+        for segment in f.segments:
+            if isinstance(segment, str):
+                parts.append(segment)
+                runs.append((lines, path, source_line))
+                lines += segment.count("\n")
+                source_line += segment.count("\n")
+                continue
+            directive = (path, source_line)
+            source_line += 1  # An include replaces its whole line
+            if segment.path in stack or segment.path == path:
+                warnings.append(OrgWarning(
+                    INCLUDE, f"Recursive include of `{segment.path}` in `{path}`"))
+                continue
+            if not os.path.isfile(segment.path):
+                warnings.append(OrgWarning(
+                    INCLUDE, f"Included file `{segment.path}` not found in `{path}`"))
+                continue
+            text, included_runs = _apply_options(
+                *self._resolve(segment.path, stack + (path,), todo_lines, warnings),
+                segment, directive)
+            parts.append(text)
+            runs.extend((first + lines, p, line) for first, p, line in included_runs)
+            lines += text.count("\n")
+        return "".join(parts), runs
+
+    def _setup(
+            self,
+            path: str,
+            stack: Tuple[str, ...],
+            todo_lines: List[str],
+            warnings: List[OrgWarning],
+            ) -> None:
+        """Collects the TODO keywords of a setup file, recursively."""
+        if path in stack:
+            warnings.append(OrgWarning(INCLUDE, f"Recursive setup file `{path}`"))
+            return
+        if not os.path.isfile(path):
+            warnings.append(OrgWarning(INCLUDE, f"Setup file `{path}` not found"))
+            return
+        f = self._scan(path)
+        todo_lines.extend(f.todo_lines)
+        for setupfile in f.setupfiles:
+            self._setup(setupfile, stack + (path,), todo_lines, warnings)
+
+    def _scan(self, path: str) -> _File:
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._files.get(path)
+            if cached is not None and cached.key == key:
+                return cached
+        # Read and scan outside of the lock; two threads missing the cache
+        # at once both read the file, which is harmless.
+        with open(path, "r", encoding="utf-8") as fp:
+            text = fp.read()
+        f = _scan_text(text, os.path.dirname(path), key)
+        with self._lock:
+            self.reads += 1
+            self._files[path] = f
+        return f
+
+
+def _scan_text(text: str, directory: str, key: Tuple[int, int]) -> _File:
+    segments: List[Union[str, _Include]] = []
+    todo_lines: List[str] = []
+    setupfiles: List[str] = []
+    warnings: List[OrgWarning] = []
+    pos = 0
+    for m in _DIRECTIVE_RE.finditer(text):
+        keyword = m.group(1).upper()
+        if keyword.endswith("TODO"):
+            todo_lines.append(m.group(2).rstrip())
+            continue
+        try:
+            args = shlex.split(m.group(2))
+        except ValueError:
+            args = []
+        if not args:
+            warnings.append(OrgWarning(
+                INCLUDE, f"Invalid {keyword} line `{m.group(0).strip()}`"))
+            continue
+        target = os.path.join(directory, os.path.expanduser(args[0]))
+        if keyword == "SETUPFILE":
+            setupfiles.append(target)
+            continue
+        try:
+            include = _parse_include(target, args[1:])
+        except ValueError:
+            warnings.append(OrgWarning(
+                INCLUDE, f"Invalid {keyword} line `{m.group(0).strip()}`"))
+            continue
+        segments.append(text[pos:m.start()])
+        segments.append(include)
+        pos = m.end() + 1  # Include the newline in the replaced line
+    segments.append(text[pos:])
+    return _File(key, segments, todo_lines, setupfiles, warnings)
+
+
+def _parse_include(path: str, args: List[str]) -> _Include:
+    """Parses the options of an `#+INCLUDE:` line; raises `ValueError`
+    for an invalid `:lines` or `:minlevel` value."""
+    lines = None
+    minlevel = None
+    block: Optional[List[str]] = None
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        value = args[i + 1] if i + 1 < len(args) else ""
+        if arg == ":lines":
+            start, _, end = value.partition("-")
+            lines = (int(start) if start.strip() else None,
+                     int(end) if end.strip() else None)
+            i += 2
+        elif arg == ":minlevel":
+            minlevel = int(value)
+            if minlevel < 1:
+                raise ValueError(f"Invalid :minlevel {value}")
+            i += 2
+        elif arg.startswith(":"):
+            i += 2  # Unsupported option with a value
+        else:
+            if block is None:
+                block = []
+            block.append(arg)
+            i += 1
+    return _Include(path, lines, minlevel, block)
+
+
+def _apply_options(
+        text: str,
+        runs: List[_Run],
+        include: _Include,
+        directive: Tuple[str, int],
+        ) -> Tuple[str, List[_Run]]:
+    """Applies the options of an include to the included text and its
+    runs. Block lines come from the `directive` (file, line)."""
+    if include.lines is not None:
+        start, end = include.lines
+        lines = text.splitlines(keepends=True)
+        first_line = start - 1 if start else 0
+        end_line = end - 1 if end is not None else None  # Line B is excluded
+        text = "".join(lines[first_line:end_line])
+        runs = [(max(first - first_line, 0), p, line + max(first_line - first, 0))
+                for first, p, line in runs if end_line is None or first < end_line]
+    if include.minlevel is not None:
+        levels = [len(m.group(1)) for m in _HEADING_RE.finditer(text)]
+        if levels:
+            shift = include.minlevel - min(levels)
+            if shift > 0:
+                text = _HEADING_RE.sub(lambda m: m.group(1) + "*" * shift, text)
+            elif shift < 0:
+                text = _HEADING_RE.sub(lambda m: m.group(1)[-shift:], text)
+    if include.block:
+        kind = include.block[0].upper()
+        runs = ([(0,) + directive] + [(first + 1, p, line) for first, p, line in runs]
+                + [(1 + text.count("\n"),) + directive])
+        text = "#+BEGIN_{} {}\n{}#+END_{}\n".format(
+            kind, " ".join(include.block[1:]), text, kind)
+    if text and not text.endswith("\n"):
+        text += "\n"
+    return text, runs
+
+
+def _parse_todo_line(line: str) -> Tuple[List[str], List[str]]:
+    """Splits a `#+TODO:` line into TODO and DONE keywords. Without `|`,
+    the last keyword is the DONE keyword."""
+    words = line.split()
+    if "|" in words:
+        i = words.index("|")
+        todos, dones = words[:i], words[i + 1:]
+    else:
+        todos, dones = words[:-1], words[-1:]
+    strip = lambda w: _KEY_RE.sub("", w)
+    return [strip(w) for w in todos], [strip(w) for w in dones]
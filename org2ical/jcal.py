@@ -0,0 +1,192 @@
+"""JSON output: jCal (RFC 7265) and newline-delimited JSON.
+
+Both are written straight from `Event` data, without the text VEVENT
+form, and event by event, so a generator of events streams into a file::
+
+    with open("calendar.json", "w") as fp:
+        org2ical.jcal.dump(events, fp, dtstamp=dtstamp)
+
+jCal is the iCalendar object model as JSON arrays, which calendar
+libraries read directly. NDJSON has one flat JSON object per line (see
+`to_dict()`), for consumers processing events one at a time.
+
+The `uid` of an event is a hash of its JSON form without `dtstamp`, so it
+is stable across runs.
+"""
+
+import hashlib
+import io
+import json
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import org2ical
+from org2ical import diagnostics
+
+_VTIMEZONE = ["vtimezone", [
+    ["tzid", {}, "text", org2ical._VTIMEZONE_ID],  # pylint: disable=protected-access
+    ["x-lic-location", {}, "unknown", org2ical._VTIMEZONE_ID],  # pylint: disable=protected-access
+], [
+    ["daylight", [
+        ["tzoffsetfrom", {}, "utc-offset", "+01:00"],
+        ["tzoffsetto", {}, "utc-offset", "+02:00"],
+        ["tzname", {}, "text", "CEST"],
+        ["dtstart", {}, "date-time", "1981-03-29T02:00:00"],
+        ["rrule", {}, "recur",
+         {"freq": "YEARLY", "until": "2037-03-29T01:00:00Z", "byday": "-1SU", "bymonth": 3}],
+    ], []],
+    ["standard", [
+        ["tzoffsetfrom", {}, "utc-offset", "+02:00"],
+        ["tzoffsetto", {}, "utc-offset", "+01:00"],
+        ["tzname", {}, "text", "CET"],
+        ["dtstart", {}, "date-time", "1981-10-25T03:00:00"],
+        ["rrule", {}, "recur",
+         {"freq": "YEARLY", "until": "2036-10-26T01:00:00Z", "byday": "-1SU", "bymonth": 10}],
+    ], []],
+]]
+
+
+def to_dict(event: org2ical.Event, dtstamp: str) -> Dict[str, Any]:
+    """Returns the NDJSON object of an event, stamped with the encoded
+    `dtstamp`.
+
+    Dates are ISO 8601: `2022-01-03` for all-day events,
+    `2022-01-03T09:00:00Z` in UTC, or local time in the time zone `tzid`.
+    `rrule` is the recurrence rule without the `RRULE:` prefix, and
+    `rdates` lists the starts of further occurrences.
+    """
+    obj: Dict[str, Any] = {
+        "uid": "",
+        "dtstamp": _iso(dtstamp),
+        "start": _iso(event.start),
+        "end": _iso(event.end) if event.end else None,
+        "all_day": event.is_dayevent,
+        "tzid": _tzid(event.tzprefix),
+        "summary": event.summary,
+        "description": event.description,
+        "categories": sorted(event.categories),
+        "rrule": event.rrule[len("RRULE:"):] if event.rrule else None,
+        "rdates": [_iso(rdate) for rdate in event.rdates],
+        "location": event.location,
+    }
+    obj["uid"] = _uid(obj)
+    return obj
+
+
+def vevent(event: org2ical.Event, dtstamp: str) -> List[Any]:
+    """Returns the jCal VEVENT component of an event."""
+    obj = to_dict(event, dtstamp)
+    tz_params = {"tzid": obj["tzid"]} if obj["tzid"] else {}
+    properties = [
+        ["dtstamp", {}, "date-time", obj["dtstamp"]],
+        ["uid", {}, "text", obj["uid"]],
+        ["dtstart", tz_params, _type(event.start), obj["start"]],
+    ]
+    if event.end:
+        properties.append(["dtend", tz_params, _type(event.end), obj["end"]])
+    properties += [
+        ["summary", {}, "text", event.summary],
+        ["description", {}, "text", event.description],
+        ["categories", {}, "text"] + obj["categories"],
+    ]
+    if event.rrule:
+        properties.append(["rrule", {}, "recur", _recur(obj["rrule"])])
+    if event.rdates:
+        properties.append(["rdate", tz_params, _type(event.start)] + obj["rdates"])
+    if event.location:
+        properties.append(["location", {}, "text", event.location])
+    return ["vevent", properties, []]
+
+
+def dump(
+        events: Iterable[org2ical.Event],
+        fp: IO[str],
+        *,
+        dtstamp: str,
+        prod_id: str = org2ical._PROD_ID,  # pylint: disable=protected-access
+        ) -> None:
+    """Writes a jCal VCALENDAR of `events` to `fp`, one event at a time."""
+    header = json.dumps(["vcalendar", [
+        ["version", {}, "text", "2.0"],
+        ["prodid", {}, "text", prod_id],
+    ], [_VTIMEZONE]])
+    # Leave the component list open to append the events
+    fp.write(header[:-2])
+    for event in events:
+        fp.write(",\n")
+        fp.write(json.dumps(vevent(event, dtstamp)))
+    fp.write("]]\n")
+
+
+def dumps(
+        events: Iterable[org2ical.Event],
+        *,
+        dtstamp: str,
+        prod_id: str = org2ical._PROD_ID,  # pylint: disable=protected-access
+        ) -> str:
+    """Returns the jCal VCALENDAR of `events` as a string."""
+    fp = io.StringIO()
+    dump(events, fp, dtstamp=dtstamp, prod_id=prod_id)
+    return fp.getvalue()
+
+
+def lines(events: Iterable[org2ical.Event], *, dtstamp: str) -> Iterator[str]:
+    """Yields the NDJSON line (with `\\n`) of each event."""
+    for event in events:
+        yield json.dumps(to_dict(event, dtstamp)) + "\n"
+
+
+def dump_ndjson(events: Iterable[org2ical.Event], fp: IO[str], *, dtstamp: str) -> None:
+    """Writes one JSON object per line and event to `fp`."""
+    fp.writelines(lines(events, dtstamp=dtstamp))
+
+
+def loads(
+        org_str: str,
+        *,
+        ndjson: bool = False,
+        **options: Any,
+        ) -> Tuple[str, List[diagnostics.OrgWarning]]:
+    """Like `org2ical.loads()`, but returns jCal, or NDJSON if `ndjson`."""
+    converter = org2ical.Converter(**options)
+    warnings = diagnostics.Warnings(converter.max_warnings)
+    source = converter.parse(org_str, warnings=warnings)
+    events, _ = converter.events(source, warnings=warnings)
+    dtstamp = converter.encode_dtstamp()
+    if ndjson:
+        return "".join(lines(events, dtstamp=dtstamp)), warnings
+    return dumps(events, dtstamp=dtstamp, prod_id=converter.prod_id), warnings
+
+
+def _iso(value: str) -> str:
+    """Converts an iCalendar date or date-time into ISO 8601."""
+    iso = f"{value[0:4]}-{value[4:6]}-{value[6:8]}"
+    if "T" in value:
+        iso += f"T{value[9:11]}:{value[11:13]}:{value[13:15]}{value[15:]}"
+    return iso
+
+
+def _type(value: str) -> str:
+    return "date-time" if "T" in value else "date"
+
+
+def _tzid(tzprefix: str) -> Optional[str]:
+    return tzprefix.partition("=")[2] if tzprefix else None
+
+
+def _recur(rrule: str) -> Dict[str, Any]:
+    """Converts a recurrence rule into a jCal `recur` value."""
+    recur: Dict[str, Any] = {}
+    for part in rrule.split(";"):
+        key, _, value = part.partition("=")
+        key = key.lower()
+        if key == "until":
+            recur[key] = _iso(value)
+            continue
+        values = [int(v) if v.lstrip("+-").isdigit() else v for v in value.split(",")]
+        recur[key] = values[0] if len(values) == 1 else values
+    return recur
+
+
+def _uid(obj: Dict[str, Any]) -> str:
+    return hashlib.md5(json.dumps({k: v for k, v in obj.items() if k not in ("uid", "dtstamp")},
+                                  sort_keys=True).encode("utf-8")).hexdigest()
@@ -0,0 +1,110 @@
+"""Checks org files for the problems a conversion warns about.
+
+`check()` runs only the detection logic of a conversion: it parses the
+input and walks the nodes a conversion would convert, but builds no
+summaries, descriptions or events and encodes nothing. It returns the
+same warnings as `org2ical.loads()` with the same options, e.g. for a
+pre-commit hook::
+
+    for warning in org2ical.lint.check(org_str, include_types={"SCHEDULED", "DIARY"}):
+        print(f"notes.org:{warning.line}: {warning}")
+
+Only the built-in SCHEDULED, DEADLINE and DIARY extractors warn about
+anything; other types are not checked.
+"""
+
+# pylint: disable=protected-access
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+import org2ical
+from org2ical import diagnostics, extractors
+from org2ical.event import DEADLINE, DIARY, SCHEDULED
+
+if TYPE_CHECKING:
+    import orgparse
+    from org2ical import include
+
+
+def check_planning(
+        node: "orgparse.OrgNode",
+        keyword: str,
+        timestamp: "orgparse.date.OrgDate",
+        warnings: diagnostics.Warnings,
+        path: Optional[str] = None,
+        ) -> None:
+    """Warns about a SCHEDULED or DEADLINE keyword in the body of a node,
+    i.e. one that orgparse did not take as the node's `timestamp`. `path`
+    is the node's org path, if already known."""
+    if warnings.enabled and keyword in node.body:
+        if timestamp:
+            warnings.add(diagnostics.MULTIPLE_KEYWORDS,
+                         f"Multiple {keyword} keywords found", node, path)
+        else:
+            warnings.add(diagnostics.MISSING_TIMESTAMP,
+                         f"{keyword} keyword found but no timestamp", node, path)
+
+
+_CHECKS: Dict[str, Callable[["orgparse.OrgNode", diagnostics.Warnings, str], Any]] = {
+    SCHEDULED: lambda node, warnings, path: check_planning(
+        node, SCHEDULED, node.scheduled, warnings, path),
+    DEADLINE: lambda node, warnings, path: check_planning(
+        node, DEADLINE, node.deadline, warnings, path),
+    DIARY: lambda node, warnings, path: org2ical._node_get_diaries(node, warnings, path),
+}
+
+
+def check_tree(
+        source: "orgparse.node.OrgRootNode",
+        converter: "org2ical.Converter",
+        *,
+        warnings: Optional[diagnostics.Warnings] = None,
+        ) -> List[diagnostics.OrgWarning]:
+    """Returns the warnings of a parsed org tree, appending to `warnings`
+    if given."""
+    if warnings is None:
+        warnings = diagnostics.Warnings(converter.max_warnings)
+    checks = [_CHECKS[name] for name in extractors.names()
+              if name in converter.include_types and name in _CHECKS]
+    route = org2ical._Route(converter, warnings)
+    # Org paths by node id, like in a conversion
+    paths: Dict[int, str] = {}
+    if checks and warnings.enabled:
+        for i, node in enumerate(source[1:]):  # [1:] for skipping root itself
+            if route.done:
+                break
+            if route.accepts(i, node):
+                path = org2ical._node_full_path(node, paths)
+                for check in checks:
+                    check(node, warnings, path)
+    return route.finish()[1]
+
+
+def check(org_str: str, **options: Any) -> List[diagnostics.OrgWarning]:
+    """Returns the warnings `org2ical.loads()` would return for an
+    org-mode string. `options` are the `Converter` options."""
+    converter = org2ical.Converter(**options)
+    warnings = diagnostics.Warnings(converter.max_warnings)
+    source = converter.parse(org_str, warnings=warnings)
+    return check_tree(source, converter, warnings=warnings)
+
+
+def check_file(
+        path: str,
+        *,
+        loader: Optional["include.Loader"] = None,
+        **options: Any,
+        ) -> List[diagnostics.OrgWarning]:
+    """Like `check()`, but reads an org file like `org2ical.load()`. The
+    `file` and `line` of a warning are those of the file (`path` or an
+    included file) it comes from."""
+    from org2ical import include  # pylint: disable=import-outside-toplevel
+
+    loader = loader if loader is not None else include.Loader()
+    org_file = loader.load(path)
+    org2ical._apply_file_states(org_file, options)
+    check_warnings = check(org_file.text, **options)
+    org_file.locate_warnings(check_warnings)
+    warnings = diagnostics.Warnings(options.get("max_warnings"))
+    warnings.add_all(org_file.warnings)
+    warnings.add_all(check_warnings)
+    return warnings
@@ -0,0 +1,194 @@
+"""Merges org events into an existing calendar.
+
+A calendar may mix events generated from org files with events entered
+by hand. `merge()` marks every generated VEVENT with an `X-ORG2ICAL`
+property naming its source and streams the existing calendar once:
+
+* A VEVENT owned by the same source is kept as it is, in place and with
+  its UID, when there is an identical new event, or removed otherwise.
+  Events are compared without their `DTSTAMP` and `UID`, which change
+  with the time of the conversion.
+* Everything else (other VEVENTs, VTODOs, VTIMEZONEs, calendar
+  properties, ...) is passed through line by line, unparsed and
+  byte for byte.
+* The remaining new events are added at the end of the calendar.
+
+Only one VEVENT of the existing calendar is held in memory at a time, so
+memory use is bounded by the new events, not by the existing calendar.
+"""
+
+# pylint: disable=protected-access
+import hashlib
+import os
+import tempfile
+from typing import IO, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import org2ical
+
+SOURCE = "org2ical"
+MARKER = "X-ORG2ICAL"
+
+
+class MergeResult(NamedTuple):
+    """Number of existing events kept (not owned), replaced (by an
+    identical new event) and removed, and of new events added."""
+    kept: int
+    replaced: int
+    removed: int
+    added: int
+
+
+def merge(
+        existing: Iterable[str],
+        ical_entries_str: str,
+        out: IO[str],
+        *,
+        source: str = SOURCE,
+        prod_id: str = org2ical._PROD_ID,
+        ) -> MergeResult:
+    """Merges VEVENT entries (as returned with `just_entries=True`) into
+    the lines of an existing calendar, writing the result to `out`.
+
+    `existing` lines keep their line endings, e.g. a file opened with
+    `newline=""`. Without any existing calendar, a new one is written.
+    """
+    pending, by_identity = _owned_entries(ical_entries_str, source)
+    kept = replaced = removed = added = 0
+    newline = None
+    has_timezone = ended = False
+    event: Optional[List[str]] = None
+    for line in existing:
+        content = line.rstrip("\r\n")
+        if newline is None:
+            newline = line[len(content):] or "\n"
+        if event is not None:
+            event.append(line)
+            if content != "END:VEVENT":
+                continue
+            properties = _properties(event)
+            if properties.get(MARKER) != source:
+                out.writelines(event)
+                kept += 1
+            elif by_identity.get(_identity(event)):
+                pending[by_identity[_identity(event)].pop()] = None
+                out.writelines(event)
+                replaced += 1
+            else:
+                removed += 1
+            event = None
+        elif content == "BEGIN:VEVENT":
+            event = [line]
+        elif content == "END:VCALENDAR":
+            if not has_timezone and _uses_timezone(pending):
+                _write_entry(out, org2ical._VTIMEZONE.strip().split("\n"), newline)
+            for entry in pending:
+                if entry is not None:
+                    _write_entry(out, entry, newline)
+                    added += 1
+            pending = []
+            ended = True
+            out.write(line)
+        else:
+            has_timezone = has_timezone or content == "TZID:" + org2ical._VTIMEZONE_ID
+            out.write(line)
+    if newline is None:  # No existing calendar
+        entries_str = "\n".join("\n".join(entry) for entry in pending if entry is not None)
+        out.write(org2ical._construct_vcalendar(entries_str, prod_id))
+        return MergeResult(0, 0, 0, len(pending))
+    if not ended or event is not None:
+        raise ValueError("Existing calendar is not terminated by END:VCALENDAR")
+    return MergeResult(kept, replaced, removed, added)
+
+
+def merge_file(
+        path: str,
+        ical_entries_str: str,
+        output: Optional[str] = None,
+        **options: str,
+        ) -> MergeResult:
+    """Merges VEVENT entries into the calendar file `path` (which need not
+    exist yet) and atomically writes the result to `output`, by default
+    `path` itself. `options` are passed to `merge()`."""
+    output = output if output is not None else path
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(output)), prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as out:
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8", newline="") as f:
+                    result = merge(f, ical_entries_str, out, **options)
+            else:
+                result = merge([], ical_entries_str, out, **options)
+        os.replace(tmp_path, output)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return result
+
+
+def _owned_entries(
+        ical_entries_str: str,
+        source: str,
+        ) -> Tuple[List[Optional[List[str]]], Dict[str, List[int]]]:
+    """Splits VEVENT entries into their (non-blank) lines, adding the
+    ownership marker after the UID. Also returns the indexes of the
+    entries by identity, last first; equal entries are all kept."""
+    entries: List[Optional[List[str]]] = []
+    by_identity: Dict[str, List[int]] = {}
+    for entry in _split_entries(ical_entries_str):
+        at = next((i + 1 for i, line in enumerate(entry) if line.startswith("UID:")), 1)
+        entry = entry[:at] + [f"{MARKER}:{source}"] + entry[at:]
+        by_identity.setdefault(_identity(entry), []).insert(0, len(entries))
+        entries.append(entry)
+    return entries, by_identity
+
+
+def _identity(lines: List[str]) -> str:
+    """Returns a hash of an event without the properties that change with
+    every conversion (`DTSTAMP`, and `UID`, which is hashed from it)."""
+    content = [line for line in _unfold(lines)
+               if line.partition(":")[0].partition(";")[0].upper() not in ("DTSTAMP", "UID")]
+    return hashlib.sha1("\n".join(content).encode("utf-8")).hexdigest()
+
+
+def _split_entries(ical_entries_str: str) -> Iterator[List[str]]:
+    entry: List[str] = []
+    for line in ical_entries_str.split("\n"):
+        if not line.strip():
+            continue
+        entry.append(line)
+        if line == "END:VEVENT":
+            yield entry
+            entry = []
+
+
+def _properties(lines: List[str]) -> Dict[str, str]:
+    """Returns the unfolded `NAME:value` properties of a component,
+    ignoring parameters. Later properties win."""
+    properties = {}
+    for line in _unfold(lines):
+        name, sep, value = line.partition(":")
+        if sep:
+            properties[name.partition(";")[0].upper()] = value
+    return properties
+
+
+def _unfold(lines: List[str]) -> List[str]:
+    """Returns the content lines of a component, without line endings."""
+    unfolded: List[str] = []
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and unfolded:
+            unfolded[-1] += line[1:]
+        else:
+            unfolded.append(line)
+    return unfolded
+
+
+def _uses_timezone(pending: List[Optional[List[str]]]) -> bool:
+    tzid = ";TZID=" + org2ical._VTIMEZONE_ID
+    return any(tzid in line for entry in pending if entry is not None for line in entry)
+
+
+def _write_entry(out: IO[str], lines: List[str], newline: str) -> None:
+    out.write(newline.join(lines) + newline)
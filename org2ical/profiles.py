@@ -0,0 +1,123 @@
+"""Several calendars with different options from a single parse.
+
+Feeds like "deadlines", "meetings" and "time log" from the same org files
+only differ in which events they keep. `loads()` parses the input once,
+walks the tree once and runs each extractor once per node, then routes
+every event to each profile that converts the node and includes the
+event's type::
+
+    feeds = org2ical.profiles.loads(org_str, {
+        "deadlines": {"include_types": {"DEADLINE"}, "categories": {"DUE"}},
+        "meetings": {"include_types": {"TIMESTAMP"}, "ignore_tags": {"private"}},
+        "timelog": {"include_types": {"CLOCK"}, "clock_merge": "day"},
+    })
+    ical_str, warnings = feeds["meetings"]
+
+Each result equals `org2ical.loads()` with the profile's options.
+Profiles with different TODO keywords or `max_input_bytes` need their
+own parse, and profiles with a different `now`, time zones, clock
+merging or `collapse_series` their own walk of the tree.
+"""
+
+# pylint: disable=protected-access
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, List, Mapping, Optional, Tuple
+
+import org2ical
+from org2ical import diagnostics
+
+if TYPE_CHECKING:
+    import orgparse
+
+
+def loads(
+        org_str: str,
+        profiles: Mapping[str, Mapping[str, Any]],
+        *,
+        just_entries: bool = False,
+        ) -> Dict[str, Tuple[str, List[diagnostics.OrgWarning]]]:
+    """Returns the ical string and warnings of each profile, by name.
+    A profile is a dict of `Converter` options."""
+    converters = {name: org2ical.Converter(**options) for name, options in profiles.items()}
+    now = datetime.now(tz=timezone.utc)
+    results = {}
+    for names in _group(converters, _parse_key).values():
+        first = converters[names[0]]
+        parse_warnings = diagnostics.Warnings()
+        source = first.parse(org_str, warnings=parse_warnings)
+        group = {name: converters[name] for name in names}
+        for name, (events, warnings) in _events(source, group, now, parse_warnings).items():
+            converter = converters[name]
+            ical_str = converter.dumps(
+                events, now=converter.now or now, just_entries=just_entries)
+            results[name] = (ical_str, warnings)
+    return {name: results[name] for name in profiles}
+
+
+def events(
+        source: "orgparse.node.OrgRootNode",
+        converters: Mapping[str, org2ical.Converter],
+        *,
+        now: Optional[datetime] = None,
+        ) -> Dict[str, Tuple[List[org2ical.Event], List[diagnostics.OrgWarning]]]:
+    """Returns the events and warnings of each converter for a parsed org
+    tree, by name. The converters must agree on the TODO keywords the
+    tree was parsed with."""
+    return _events(source, converters, now or datetime.now(tz=timezone.utc), [])
+
+
+def _events(
+        source: "orgparse.node.OrgRootNode",
+        converters: Mapping[str, org2ical.Converter],
+        now: datetime,
+        parse_warnings: List[diagnostics.OrgWarning],
+        ) -> Dict[str, Tuple[List[org2ical.Event], List[diagnostics.OrgWarning]]]:
+    results = {}
+    for names in _group(converters, _extraction_key).values():
+        first = converters[names[0]]
+        base = org2ical.Converter(
+            now=first.now,
+            include_types=set().union(*(converters[name].include_types for name in names)),
+            categories=set(),
+            ignore_states=set(),
+            ignore_tags=set(),
+            from_tz=first.from_tz,
+            to_tz=first.to_tz,
+            clock_merge=first.clock_merge,
+            clock_merge_gap=first.clock_merge_gap,
+            collapse_series=first.collapse_series,
+            limits=org2ical.Limits(max_body_length=first.limits.max_body_length),
+        )
+        routes = []
+        for name in names:
+            warnings = diagnostics.Warnings(converters[name].max_warnings)
+            warnings.add_all(parse_warnings)
+            routes.append(org2ical._Route(converters[name], warnings, add_categories=True))
+        org2ical._traverse(source, base, routes, first.now or now)
+        for name, route in zip(names, routes):
+            results[name] = route.finish()
+    return results
+
+
+def _group(
+        converters: Mapping[str, org2ical.Converter],
+        key: Callable[[org2ical.Converter], Hashable],
+        ) -> Dict[Hashable, List[str]]:
+    groups: Dict[Hashable, List[str]] = {}
+    for name, converter in converters.items():
+        groups.setdefault(key(converter), []).append(name)
+    return groups
+
+
+def _parse_key(converter: org2ical.Converter) -> Hashable:
+    """The options that change the parsed tree."""
+    return (tuple(converter.todo_states or ()), tuple(converter.done_states or ()),
+            converter.limits.max_input_bytes)
+
+
+def _extraction_key(converter: org2ical.Converter) -> Hashable:
+    """The options that change the extracted events, other than their
+    categories."""
+    return (converter.now, converter.from_tz, converter.to_tz, converter.clock_merge,
+            converter.clock_merge_gap, converter.limits.max_body_length,
+            converter.collapse_series)
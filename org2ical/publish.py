@@ -0,0 +1,110 @@
+"""Publishes calendars to a static web root.
+
+`publish()` only touches the disk when a calendar really changed, so a
+CDN in front of the web root is only invalidated, and subscribed clients
+only re-download, on real changes:
+
+* Events are stamped with a fixed `DTSTAMP` (see `DTSTAMP`) instead of
+  the time of the conversion, so their UIDs, which hash the whole event,
+  are stable, and the same input gives the same bytes. An unchanged
+  calendar is not written at all.
+* A deterministic `.gz` sibling (no timestamp or file name in the header)
+  is written next to the calendar, for servers serving precompressed
+  files.
+* A `sha256sum`-compatible manifest in the same directory lists the
+  checksums of all published files.
+
+Every file is written to a temporary file first and moved into place
+with `os.replace()`, so readers never see a partially written file.
+"""
+
+import gzip
+import hashlib
+import io
+import os
+import tempfile
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+MANIFEST = "SHA256SUMS"
+
+# The `dtstamp` of published calendars, unless a `now` is given.
+DTSTAMP = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def publish(
+        path: str,
+        ical_str: str,
+        *,
+        compress: bool = True,
+        manifest: Optional[str] = MANIFEST,
+        ) -> bool:
+    """Writes `ical_str` to `path` unless it is unchanged, then brings the
+    `.gz` sibling and the `manifest` up to date. Convert with a fixed
+    `dtstamp` (e.g. `DTSTAMP`) to make unchanged input give an unchanged
+    calendar.
+
+    Returns whether the calendar file was (re)written.
+    """
+    data = ical_str.encode("utf-8")
+    changed = _write_if_changed(path, data)
+    checksums = {os.path.basename(path): _sha256(data)}
+    if compress:
+        gz_data = _gzip(data)
+        _write_if_changed(path + ".gz", gz_data)
+        checksums[os.path.basename(path) + ".gz"] = _sha256(gz_data)
+    if manifest is not None:
+        _update_manifest(os.path.join(os.path.dirname(path), manifest), checksums)
+    return changed
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _gzip(data: bytes) -> bytes:
+    buf = io.BytesIO()
+    with gzip.GzipFile(filename="", mode="wb", fileobj=buf, mtime=0) as f:
+        f.write(data)
+    return buf.getvalue()
+
+
+def _read(path: str) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _write_if_changed(path: str, data: bytes) -> bool:
+    """Atomically replaces `path` with `data`, unless it already holds
+    exactly `data`."""
+    if _read(path) == data:
+        return False
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return True
+
+
+def _update_manifest(path: str, checksums: Dict[str, str]) -> bool:
+    """Merges `checksums` (by file name) into a `sha256sum` manifest."""
+    entries: Dict[str, str] = {}
+    old = _read(path)
+    if old is not None:
+        for line in old.decode("utf-8").splitlines():
+            digest, sep, name = line.partition("  ")
+            if sep:
+                entries[name] = digest
+    entries.update(checksums)
+    data = "".join(f"{entries[name]}  {name}\n" for name in sorted(entries))
+    return _write_if_changed(path, data.encode("utf-8"))
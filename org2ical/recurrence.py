@@ -0,0 +1,239 @@
+"""Decodes events back into time spans and expands their recurrences.
+
+`Event` dates are kept in their iCalendar encoding. `span()` turns an
+event into its first occurrence, with aware datetimes for timed events
+and dates (end exclusive) for all-day events, and `occurrences()` lists
+the occurrences overlapping a window. Events without an end last an
+hour when timed (like timestamps without an end time) and a day
+otherwise.
+
+The `RDATE`s of an event without an `RRULE` are its further
+occurrences, with the duration of the first one.
+
+An `RRULE` is expanded from a whole number of periods before the window
+rather than from its first occurrence, so that the cost of a query does
+not grow with the age of a series (diary sexps start in 1985).
+
+Expanding an `RRULE` needs python-dateutil, an optional dependency:
+`pip install org2ical[recur]`. Non-recurring events do not.
+"""
+
+from datetime import date, datetime, timedelta, timezone, tzinfo
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+if TYPE_CHECKING:
+    import org2ical
+
+_DEFAULT_DURATION = timedelta(hours=1)
+
+# The length of a period of an `RRULE` frequency, if fixed in wall time
+_STEPS = {
+    "HOURLY": timedelta(hours=1),
+    "DAILY": timedelta(days=1),
+    "WEEKLY": timedelta(weeks=1),
+}
+# The months of a period of an `RRULE` frequency
+_MONTHS = {"MONTHLY": 1, "YEARLY": 12}
+# Without any of these rule parts, the days of a rule come from its start
+_DAY_PARTS = ("BYDAY", "BYMONTHDAY", "BYYEARDAY", "BYWEEKNO", "BYEASTER")
+
+
+def _dateutil() -> Any:
+    try:
+        import dateutil.rrule  # pylint: disable=import-outside-toplevel
+        import dateutil.tz  # pylint: disable=import-outside-toplevel,unused-import
+    except ImportError as e:
+        raise ImportError(
+            "Expanding recurring events requires python-dateutil: "
+            "pip install org2ical[recur]") from e
+    return dateutil
+
+
+class Span(NamedTuple):
+    """An occurrence from `start` to `end` (exclusive). Both are aware
+    datetimes, or dates for all-day events."""
+    start: Union[date, datetime]
+    end: Union[date, datetime]
+
+    @property
+    def all_day(self) -> bool:
+        """Whether the span covers whole days."""
+        return not isinstance(self.start, datetime)
+
+
+def span(event: "org2ical.Event") -> Span:
+    """Returns the first occurrence of an event."""
+    tz = _tz(event.tzprefix)
+    start = _decode(event.start, tz)
+    end = _decode(event.end, tz) if event.end else None
+    if isinstance(start, datetime):
+        if not isinstance(end, datetime) or end < start:
+            end = start + _DEFAULT_DURATION
+    elif end is None or isinstance(end, datetime) or end <= start:
+        end = start + timedelta(days=1)
+    return Span(start, end)
+
+
+def recurs(event: "org2ical.Event") -> bool:
+    """Whether an event has more than one occurrence."""
+    return bool(event.rrule or event.rdates)
+
+
+def occurrences(
+        event: "org2ical.Event",
+        start: datetime,
+        end: datetime,
+        ) -> Iterator[Span]:
+    """Yields the occurrences of an event overlapping `[start, end)`, in
+    order. `start` and `end` must be aware; all-day events are compared
+    by their dates."""
+    first = span(event)
+    if first.all_day:
+        start_key: Union[date, datetime] = start.date()
+        end_key: Union[date, datetime] = end.date() + (timedelta(days=1) if end.time() else timedelta(0))
+    else:
+        start_key, end_key = start, end
+    if not event.rrule:
+        for occurrence in _explicit(event, first):
+            if occurrence.start >= end_key:
+                break
+            if occurrence.end > start_key:
+                yield occurrence
+        return
+    duration = first.end - first.start
+    after = start_key - duration
+    if first.all_day:
+        after = datetime.combine(after, datetime.min.time())
+        before = datetime.combine(end_key, datetime.min.time())
+    else:
+        before = end_key
+    for dt in _rule(event, first, after).xafter(after, inc=False):
+        if dt >= before:
+            break
+        occurrence_start = dt.date() if first.all_day else dt
+        yield Span(occurrence_start, occurrence_start + duration)
+
+
+def following(event: "org2ical.Event", start: datetime) -> Iterator[Span]:
+    """Yields the occurrences of an event starting at or after `start`
+    (aware), in order; unbounded recurrences never stop. All-day
+    events are compared by their dates."""
+    first = span(event)
+    start_key: Union[date, datetime] = start.date() if first.all_day else start
+    if not event.rrule:
+        for occurrence in _explicit(event, first):
+            if occurrence.start >= start_key:
+                yield occurrence
+        return
+    duration = first.end - first.start
+    after = (datetime.combine(start_key, datetime.min.time()) if first.all_day
+             else start_key)
+    for dt in _rule(event, first, after).xafter(after, inc=True):
+        occurrence_start = dt.date() if first.all_day else dt
+        yield Span(occurrence_start, occurrence_start + duration)
+
+
+def last(event: "org2ical.Event") -> Optional[Span]:
+    """Returns the last occurrence of an event, or `None` if it recurs
+    forever (an `RRULE` without `COUNT` or `UNTIL`)."""
+    first = span(event)
+    if not event.rrule:
+        return _explicit(event, first)[-1]
+    if "COUNT=" not in event.rrule and "UNTIL=" not in event.rrule:
+        return None
+    occurrence = None
+    for occurrence in _rule(event, first):
+        pass
+    if occurrence is None:
+        return first
+    occurrence_start = occurrence.date() if first.all_day else occurrence
+    return Span(occurrence_start, occurrence_start + (first.end - first.start))
+
+
+def _explicit(event: "org2ical.Event", first: Span) -> List[Span]:
+    """Returns the first occurrence and those of the `RDATE`s, in order."""
+    if not event.rdates:
+        return [first]
+    tz = _tz(event.tzprefix)
+    duration = first.end - first.start
+    starts = (_decode(value, tz) for value in event.rdates)
+    return sorted([first] + [Span(start, start + duration) for start in starts])
+
+
+def _rule(event: "org2ical.Event", first: Span, after: Optional[datetime] = None) -> Any:
+    """Returns the `RRULE` of an event, starting close before `after`
+    (with the same occurrences from there on) if given."""
+    dtstart = (first.start if not first.all_day
+               else datetime.combine(first.start, datetime.min.time()))
+    rule = event.rrule[len("RRULE:"):]
+    if after is not None:
+        dtstart, rule = _advance(rule, dtstart, after)
+    return _dateutil().rrule.rrulestr(rule, dtstart=dtstart)
+
+
+def _advance(rule: str, dtstart: datetime, after: datetime) -> Tuple[datetime, str]:
+    """Moves the start of a rule forward by whole periods to at least one
+    period before `after`, or returns it unchanged if that would change
+    the occurrences after `after`.
+
+    The days a start derives for a rule without day parts are made
+    explicit for monthly and yearly rules, which then start at the
+    beginning of their period; a `COUNT` is reduced by the skipped
+    occurrences if every period has exactly one.
+    Periods are counted in wall time, like dateutil does.
+    """
+    parts: Dict[str, str] = dict(part.split("=", 1) for part in rule.upper().split(";"))
+    freq = parts.get("FREQ", "")
+    interval = int(parts.get("INTERVAL", "1"))
+    derived = not any(name in parts for name in _DAY_PARTS)
+    # Then every period has exactly one occurrence
+    plain = not any(name.startswith("BY") for name in parts)
+    start = dtstart.replace(tzinfo=None)
+    target = (after.astimezone(dtstart.tzinfo) if after.tzinfo is not None
+              else after).replace(tzinfo=None)
+    if freq in _STEPS:
+        skip = (target - start) // (_STEPS[freq] * interval) - 1
+        if skip <= 0:
+            return dtstart, rule
+        moved = start + _STEPS[freq] * interval * skip
+        counted = plain
+    elif freq in _MONTHS:
+        months = _MONTHS[freq] * interval
+        skip = ((target.year - start.year) * 12 + target.month - start.month) // months - 1
+        if skip <= 0:
+            return dtstart, rule
+        month = start.year * 12 + start.month - 1 + months * skip
+        if freq == "YEARLY":
+            month -= start.month - 1
+        moved = start.replace(year=month // 12, month=month % 12 + 1, day=1)
+        if derived:
+            parts["BYMONTHDAY"] = str(start.day)
+            if freq == "YEARLY":
+                parts.setdefault("BYMONTH", str(start.month))
+        counted = plain and start.day <= 28
+    else:
+        return dtstart, rule
+    if "COUNT" in parts:
+        if not counted:
+            return dtstart, rule
+        count = int(parts["COUNT"])
+        if skip >= count:
+            return dtstart, rule
+        parts["COUNT"] = str(count - skip)
+    return (moved.replace(tzinfo=dtstart.tzinfo),
+            ";".join(f"{name}={value}" for name, value in parts.items()))
+
+
+def _tz(tzprefix: str) -> Optional[tzinfo]:
+    """Returns the timezone of a `;TZID=...` prefix."""
+    if not tzprefix:
+        return None
+    return _dateutil().tz.gettz(tzprefix.partition("=")[2])
+
+
+def _decode(value: str, tz: Optional[tzinfo]) -> Union[date, datetime]:
+    if "T" not in value:
+        return datetime.strptime(value, "%Y%m%d").date()
+    if value.endswith("Z"):
+        return datetime.strptime(value, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+    return datetime.strptime(value, "%Y%m%dT%H%M%S").replace(tzinfo=tz or timezone.utc)
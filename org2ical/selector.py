@@ -0,0 +1,162 @@
+"""Compiles node selectors, e.g. `+work -someday todo=NEXT | path={^Projects}`.
+
+A selector is compiled once into a predicate on org nodes, which the
+converter evaluates before it encodes any timestamp of a node. Syntax,
+loosely following org's tag and property matches:
+
+* `work` or `+work`: the node has the tag `work`, including inherited tags.
+* `KEY=VALUE` or `KEY!=VALUE`: compares a value of the node, where VALUE
+  is a bare word, a `"quoted string"` or a `{regex}` (searched, not
+  fully matched). KEY is one of `todo`, `priority`, `category` (the
+  inherited `CATEGORY` property, or `#+CATEGORY:`), `heading`, `path`
+  (the org path, with ` > ` as delimiter), or else a property name.
+* `-term` or `!term` negates a term; `(...)` groups.
+* Terms next to each other (or joined by `&`) must all match; `|`
+  separates alternatives.
+"""
+
+import functools
+import re
+from typing import TYPE_CHECKING, Any, Callable, List, Optional, Tuple
+
+import org2ical
+
+if TYPE_CHECKING:
+    import orgparse
+
+Predicate = Callable[["orgparse.OrgNode"], bool]
+
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<key>[A-Za-z_][\w-]*)\s*(?P<cmp>!?=)\s*
+        (?:"(?P<str>(?:[^"\\]|\\.)*)"|\{(?P<re>[^}]*)\}|(?P<word>[^\s|&()]+))
+      | (?P<tag>[\w@#%]+)
+      | (?P<op>[|&()!+-])
+    )""", re.VERBOSE)
+_ESCAPE_RE = re.compile(r"\\(.)")
+
+_Token = Tuple[str, Any]
+
+
+@functools.lru_cache(maxsize=64)
+def compile_selector(selector: str) -> Predicate:
+    """Compiles a selector into a predicate, raising `ValueError` if it
+    is malformed."""
+    parser = _Parser(_tokenize(selector), selector)
+    predicate = parser.expr()
+    if parser.peek() is not None:
+        raise ValueError(f"Invalid selector `{selector}`: unexpected `{parser.peek()[1]}`")
+    return predicate
+
+
+def _tokenize(selector: str) -> List[_Token]:
+    tokens: List[_Token] = []
+    pos = 0
+    end = len(selector.rstrip())
+    while pos < end:
+        m = _TOKEN_RE.match(selector, pos)
+        if m is None or m.end() == pos:
+            raise ValueError(f"Invalid selector `{selector}` at position {pos}")
+        pos = m.end()
+        if m.group("op"):
+            tokens.append(("op", m.group("op")))
+        elif m.group("tag"):
+            tokens.append(("atom", _tag(m.group("tag"))))
+        else:
+            if m.group("re") is not None:
+                try:
+                    pattern = re.compile(m.group("re"))
+                except re.error as e:
+                    raise ValueError(f"Invalid selector `{selector}`: {e}") from e
+                match: Callable[[str], bool] = lambda v, p=pattern: p.search(v) is not None
+            else:
+                value = (_ESCAPE_RE.sub(r"\1", m.group("str")) if m.group("str") is not None
+                         else m.group("word"))
+                match = lambda v, value=value: v == value
+            tokens.append(("atom", _compare(m.group("key"), match, m.group("cmp") == "!=")))
+    return tokens
+
+
+class _Parser:
+    """Recursive descent over the tokens, building nested closures."""
+
+    def __init__(self, tokens: List[_Token], selector: str):
+        self.tokens = tokens
+        self.selector = selector
+        self.pos = 0
+
+    def peek(self) -> Optional[_Token]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def expr(self) -> Predicate:
+        alternatives = [self.conjunction()]
+        while self.peek() == ("op", "|"):
+            self.pos += 1
+            alternatives.append(self.conjunction())
+        if len(alternatives) == 1:
+            return alternatives[0]
+        return lambda node: any(p(node) for p in alternatives)
+
+    def conjunction(self) -> Predicate:
+        terms = [self.term()]
+        while self.peek() is not None and self.peek() not in (("op", "|"), ("op", ")")):
+            if self.peek() == ("op", "&"):
+                self.pos += 1
+            terms.append(self.term())
+        if len(terms) == 1:
+            return terms[0]
+        return lambda node: all(p(node) for p in terms)
+
+    def term(self) -> Predicate:
+        token = self.peek()
+        if token is None:
+            raise ValueError(f"Invalid selector `{self.selector}`: unexpected end")
+        self.pos += 1
+        kind, value = token
+        if kind == "atom":
+            return value
+        if value in ("-", "!"):
+            negated = self.term()
+            return lambda node: not negated(node)
+        if value == "+":
+            return self.term()
+        if value == "(":
+            predicate = self.expr()
+            if self.peek() != ("op", ")"):
+                raise ValueError(f"Invalid selector `{self.selector}`: missing `)`")
+            self.pos += 1
+            return predicate
+        raise ValueError(f"Invalid selector `{self.selector}`: unexpected `{value}`")
+
+
+def _tag(tag: str) -> Predicate:
+    return lambda node: tag in node.tags
+
+
+def _compare(key: str, match: Callable[[str], bool], negate: bool) -> Predicate:
+    getter = _GETTERS.get(key.lower())
+    if getter is None:
+        getter = lambda node: node.get_property(key)
+
+    def predicate(node: "orgparse.OrgNode") -> bool:
+        value = getter(node)
+        return (value is not None and match(str(value))) != negate
+    return predicate
+
+
+def _category(node: "orgparse.OrgNode") -> Optional[str]:
+    while not node.is_root():
+        category = node.get_property("CATEGORY")
+        if category is not None:
+            return category
+        node = node.parent
+    return node.get_file_property("CATEGORY")
+
+
+_GETTERS = {
+    "todo": lambda node: node.todo,
+    "priority": lambda node: node.priority,
+    "category": _category,
+    "heading": lambda node: node.heading,
+    "path": lambda node: org2ical._node_full_path(node),  # pylint: disable=protected-access
+}
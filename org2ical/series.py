@@ -0,0 +1,75 @@
+"""Collapses the explicit timestamps of a node into recurring events.
+
+Schedule-style notes list every session as its own active timestamp::
+
+    * Yoga
+      <2022-01-03 Mon 18:00> <2022-01-10 Mon 18:00> <2022-01-17 Mon 18:00>
+
+which gives one event per timestamp. With `collapse_series=True`, the
+TIMESTAMP events of a node are grouped by their (encoded) time of day and
+duration. A group whose dates are evenly spaced by days, weeks, months or
+years becomes one event with an `RRULE` and a `COUNT`; any other group
+becomes one event with the further dates as an `RDATE` list. Timestamps
+with a repeater keep their own events.
+
+The occurrences are exactly the same: the rule or dates are in the same
+encoding as the first start, so a series in UTC repeats at the same UTC
+time.
+"""
+
+from datetime import date, datetime
+from typing import TYPE_CHECKING, Dict, Hashable, List, Optional
+
+from org2ical import recurrence
+
+if TYPE_CHECKING:
+    import org2ical
+
+
+def collapse(events: List["org2ical.Event"]) -> List["org2ical.Event"]:
+    """Returns `events` with each group of events that only differ in
+    their date replaced by one recurring event, in the order of the
+    groups' first events."""
+    groups: Dict[Hashable, List["org2ical.Event"]] = {}
+    for i, event in enumerate(events):
+        key = _key(event) if not recurrence.recurs(event) else i
+        groups.setdefault(key, []).append(event)
+    return [group[0] if len(group) == 1 else _collapse(group) for group in groups.values()]
+
+
+def _key(event: "org2ical.Event") -> Hashable:
+    first = recurrence.span(event)
+    return (event.start[8:], event.end is None, first.end - first.start,
+            event.summary, event.description, frozenset(event.categories),
+            event.is_dayevent, event.tzprefix, event.location)
+
+
+def _collapse(group: List["org2ical.Event"]) -> "org2ical.Event":
+    group = sorted(group, key=lambda event: event.start)
+    first = group[0]
+    starts = sorted({event.start for event in group})
+    if len(starts) == 1:
+        return first
+    rrule = _rrule([datetime.strptime(start[:8], "%Y%m%d").date() for start in starts])
+    if rrule:
+        return first._replace(rrule=rrule)
+    return first._replace(rdates=tuple(starts[1:]))
+
+
+def _rrule(dates: List[date]) -> Optional[str]:
+    """Returns the `RRULE` of evenly spaced dates, or `None`."""
+    count = len(dates)
+    steps = {(b - a).days for a, b in zip(dates, dates[1:])}
+    if len(steps) == 1:
+        step = steps.pop()
+        if step % 7 == 0:
+            return f"RRULE:FREQ=WEEKLY;INTERVAL={step // 7};COUNT={count}"
+        return f"RRULE:FREQ=DAILY;INTERVAL={step};COUNT={count}"
+    months = [d.year * 12 + d.month for d in dates]
+    month_steps = {b - a for a, b in zip(months, months[1:])}
+    if len(month_steps) == 1 and len({d.day for d in dates}) == 1:
+        step = month_steps.pop()
+        if step % 12 == 0:
+            return f"RRULE:FREQ=YEARLY;INTERVAL={step // 12};COUNT={count}"
+        return f"RRULE:FREQ=MONTHLY;INTERVAL={step};COUNT={count}"
+    return None
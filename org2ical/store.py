@@ -0,0 +1,269 @@
+"""An SQLite store of converted events, for archives of many org files.
+
+`Store.update()` converts org files into a database file by file. A file
+whose content (with its includes resolved) and options are unchanged is
+skipped without parsing it; the events of a changed file are upserted by
+their identity, so unchanged events keep their rows::
+
+    with org2ical.store.Store("events.db", include_types={"TIMESTAMP", "DEADLINE"}) as store:
+        store.update(glob.glob("archive/**/*.org", recursive=True))
+        events = store.events(start=datetime(2019, 1, 1), category="work")
+        ical_str = store.dumps(file="archive/2019.org")
+
+Every event is indexed by the start of its first and the end of its last
+occurrence (open for endless repeaters) in UTC, its categories and its
+org path, so queries never scan the table. Pass the events of a query to
+`org2ical.agenda.Calendar` to expand their repeaters.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import date, datetime, time, timezone
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+import org2ical
+from org2ical import diagnostics, include, recurrence
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    digest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    id TEXT PRIMARY KEY,
+    file TEXT NOT NULL,
+    path TEXT,
+    start_utc TEXT NOT NULL,
+    end_utc TEXT,
+    start TEXT NOT NULL,
+    "end" TEXT,
+    summary TEXT NOT NULL,
+    description TEXT NOT NULL,
+    categories TEXT NOT NULL,
+    rrule TEXT NOT NULL,
+    is_dayevent INTEGER NOT NULL,
+    tzprefix TEXT NOT NULL,
+    location TEXT,
+    rdates TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_file ON events (file);
+CREATE INDEX IF NOT EXISTS events_start ON events (start_utc);
+CREATE INDEX IF NOT EXISTS events_end ON events (end_utc);
+CREATE INDEX IF NOT EXISTS events_path ON events (path);
+CREATE TABLE IF NOT EXISTS categories (
+    event TEXT NOT NULL,
+    category TEXT NOT NULL,
+    PRIMARY KEY (category, event)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS categories_event ON categories (event);
+"""
+
+_COLUMNS = ("start", '"end"', "summary", "description", "categories", "rrule",
+            "is_dayevent", "tzprefix", "location", "rdates")
+_PATH_PREFIX = "Org Path: "
+
+
+class UpdateResult(NamedTuple):
+    """Number of files converted, skipped as unchanged and removed, and
+    of event rows inserted and deleted."""
+    converted: int
+    unchanged: int
+    removed: int
+    inserted: int
+    deleted: int
+
+
+class Store:
+    """An SQLite database of the events of org files, converted with
+    fixed `Converter` options.
+
+    Changing the options of an existing store converts all files again
+    on their next update.
+    """
+
+    def __init__(self, database: str, **options: Any):
+        self.converter = org2ical.Converter(**options)
+        self._options = options
+        self._options_key = _options_key(self.converter)
+        self._db = sqlite3.connect(database)
+        self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        """Closes the database."""
+        self._db.close()
+
+    def __enter__(self) -> "Store":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def update(
+            self,
+            paths: Iterable[str],
+            *,
+            loader: Optional[include.Loader] = None,
+            prune: bool = False,
+            ) -> Tuple[UpdateResult, List[diagnostics.OrgWarning]]:
+        """Brings the events of org files up to date, and returns what
+        changed and the warnings of the converted files.
+
+        With `prune`, the events of stored files not in `paths` are
+        removed. All changes are committed at once.
+        """
+        loader = loader if loader is not None else include.Loader()
+        stored = dict(self._db.execute("SELECT path, digest FROM files"))
+        converted = unchanged = inserted = deleted = 0
+        warnings: List[diagnostics.OrgWarning] = []
+        seen = set()
+        with self._db:
+            for path in paths:
+                path = os.path.abspath(path)
+                seen.add(path)
+                org_file = loader.load(path)
+                digest = hashlib.sha1(
+                    (self._options_key + "\0" + org_file.text).encode("utf-8")).hexdigest()
+                if stored.get(path) == digest:
+                    unchanged += 1
+                    continue
+                options: Dict[str, Any] = {}
+                org2ical._apply_file_states(org_file, options)  # pylint: disable=protected-access
+                converter = (org2ical.Converter(**dict(self._options, **options))
+                             if options else self.converter)
+                file_warnings = diagnostics.Warnings(converter.max_warnings)
+                file_warnings.add_all(org_file.warnings)
+                source = converter.parse(org_file.text, warnings=file_warnings)
+                events, _ = converter.events(source, warnings=file_warnings)
+                org_file.locate_warnings(file_warnings)
+                warnings.extend(file_warnings)
+                added, removed = self._replace(path, events)
+                inserted += added
+                deleted += removed
+                self._db.execute("INSERT OR REPLACE INTO files (path, digest) VALUES (?, ?)",
+                                 (path, digest))
+                converted += 1
+            pruned = [path for path in stored if path not in seen] if prune else []
+            for path in pruned:
+                deleted += self._replace(path, [])[1]
+                self._db.execute("DELETE FROM files WHERE path = ?", (path,))
+        return UpdateResult(converted, unchanged, len(pruned), inserted, deleted), warnings
+
+    def events(
+            self,
+            *,
+            start: Optional[datetime] = None,
+            end: Optional[datetime] = None,
+            category: Optional[str] = None,
+            file: Optional[str] = None,
+            path: Optional[str] = None,
+            ) -> List[org2ical.Event]:
+        """Returns the events matching all given filters, sorted by start:
+        events occurring in `[start, end)` (recurring events once, if any
+        occurrence may), with the `category`, from the org `file`, or with
+        an org path starting with `path`. Naive datetimes are in the
+        converter's `to_tz`."""
+        query = "SELECT " + ", ".join("e." + c for c in _COLUMNS) + " FROM events e"
+        conditions, params = [], []
+        if category is not None:
+            query += " JOIN categories c ON c.event = e.id AND c.category = ?"
+            params.append(category)
+        if start is not None:
+            conditions.append("(e.end_utc IS NULL OR e.end_utc > ?)")
+            params.append(self._utc(start))
+        if end is not None:
+            conditions.append("e.start_utc < ?")
+            params.append(self._utc(end))
+        if file is not None:
+            conditions.append("e.file = ?")
+            params.append(os.path.abspath(file))
+        if path is not None:
+            conditions.append("e.path >= ? AND e.path < ?")
+            params += [path, path + "\U0010ffff"]
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY e.start_utc, e.id"
+        return [_event(row) for row in self._db.execute(query, params)]
+
+    def dumps(
+            self,
+            *,
+            now: Optional[datetime] = None,
+            just_entries: bool = False,
+            **filters: Any,
+            ) -> str:
+        """Regenerates an ical string of the events matching `filters`
+        (see `events()`), e.g. a shard of one file or one year."""
+        return self.converter.dumps(self.events(**filters), now=now, just_entries=just_entries)
+
+    def _replace(self, file: str, events: List[org2ical.Event]) -> Tuple[int, int]:
+        """Replaces the rows of a file by `events`, keeping the rows of
+        unchanged events. Returns the number of inserted and deleted rows."""
+        rows: Dict[str, Tuple[Any, ...]] = {}
+        for event in events:
+            event_id = _identity(file, event)
+            while event_id in rows:  # The same event twice in one file
+                event_id = hashlib.sha1(event_id.encode("ascii")).hexdigest()
+            rows[event_id] = self._row(event_id, file, event)
+        old = {row[0] for row in self._db.execute("SELECT id FROM events WHERE file = ?", (file,))}
+        stale = [(event_id,) for event_id in old if event_id not in rows]
+        new = [row for event_id, row in rows.items() if event_id not in old]
+        self._db.executemany("DELETE FROM events WHERE id = ?", stale)
+        self._db.executemany("DELETE FROM categories WHERE event = ?", stale)
+        self._db.executemany(
+            f"INSERT INTO events VALUES ({', '.join('?' * 15)})", new)
+        self._db.executemany(
+            "INSERT INTO categories (event, category) VALUES (?, ?)",
+            [(row[0], category) for row in new for category in json.loads(row[9])])
+        return len(new), len(stale)
+
+    def _row(self, event_id: str, file: str, event: org2ical.Event) -> Tuple[Any, ...]:
+        first = recurrence.span(event)
+        final = recurrence.last(event) if recurrence.recurs(event) else first
+        description = event.description
+        path = (description[description.rindex(_PATH_PREFIX) + len(_PATH_PREFIX):]
+                if _PATH_PREFIX in description else None)
+        return (event_id, file, path,
+                self._utc(first.start), self._utc(final.end) if final else None,
+                event.start, event.end, event.summary, description,
+                json.dumps(sorted(event.categories)), event.rrule, int(event.is_dayevent),
+                event.tzprefix, event.location, json.dumps(event.rdates))
+
+    def _utc(self, value: Union[date, datetime]) -> str:
+        """Encodes a time as sortable UTC text; dates and naive datetimes
+        are in the converter's `to_tz`."""
+        if not isinstance(value, datetime):
+            value = datetime.combine(value, time(0))
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=self.converter.to_tz)
+        return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def _options_key(converter: org2ical.Converter) -> str:
+    """Returns a stable text form of the converter options that change
+    the events (other than `now`, which only changes their `DTSTAMP`)."""
+    return json.dumps([
+        sorted(converter.categories), sorted(converter.ignore_states),
+        sorted(converter.ignore_tags), sorted(converter.include_types),
+        repr(converter.from_tz), repr(converter.to_tz),
+        converter.todo_states, converter.done_states, converter.clock_merge,
+        converter.clock_merge_gap.total_seconds(), converter.select, list(converter.limits),
+        converter.collapse_series,
+    ])
+
+
+def _identity(file: str, event: org2ical.Event) -> str:
+    """Returns the identity of an event: a hash of its file and content."""
+    return hashlib.sha1(json.dumps(
+        [file, event.start, event.end, event.summary, event.description,
+         sorted(event.categories), event.rrule, event.is_dayevent, event.tzprefix,
+         event.location, event.rdates]).encode("utf-8")).hexdigest()
+
+
+def _event(row: Tuple[Any, ...]) -> org2ical.Event:
+    (start, end, summary, description, categories, rrule,
+     is_dayevent, tzprefix, location, rdates) = row
+    return org2ical.Event(start, end, summary, description, set(json.loads(categories)),
+                          rrule=rrule, is_dayevent=bool(is_dayevent), tzprefix=tzprefix,
+                          location=location, rdates=tuple(json.loads(rdates)))
@@ -0,0 +1,263 @@
+"""Long-running worker speaking line-delimited JSON-RPC 2.0 over stdio.
+
+Started with `org2ical --worker`. Every line on stdin is one request, and
+every response is written as one line on stdout::
+
+    {"jsonrpc": "2.0", "id": 1, "method": "convert",
+     "params": {"path": "~/org/calendar.org", "output": "~/calendar.ics"}}
+
+Methods:
+
+* `convert`: converts `path` (a file) or `text` (a buffer) and returns
+  `{"events": [...], "warnings": [...]}`, plus `"ical"` when no `output`
+  path is given. Warnings are objects with `code`, `message`, `line`,
+  `path` and `text`. `options` takes the keyword arguments of `loads()`,
+  with sets and lists as arrays of strings, timezones as UTC offsets,
+  `now` and `dtstamp` in ISO 8601, `clock_merge_gap` in minutes and
+  `limits` as an object of `Limits` fields. Values of another JSON type
+  are invalid params.
+* `update`: same as `convert`, but answers `{"changed": false}` without
+  converting when the document and options are unchanged since the last
+  `update` of the same `document` (defaults to `path`).
+* `shutdown`: stops the worker.
+
+Converters (compiled options) and parsed org trees are kept between
+requests, so a save only pays for the conversion itself.
+"""
+
+# pylint: disable=protected-access
+import argparse
+import hashlib
+import json
+import os
+import sys
+from datetime import timedelta
+from typing import Any, Dict, IO, List, Optional, Tuple
+
+import org2ical
+from org2ical import diagnostics
+from org2ical.cli import _parse_now, _parse_tz
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+_MAX_CACHED = 64
+
+_SET_OPTIONS = ("categories", "ignore_states", "ignore_tags", "include_types")
+_LIST_OPTIONS = ("todo_states", "done_states")
+
+
+class RPCError(Exception):
+    """An error reported back to the client as a JSON-RPC error object."""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _event_to_json(event: org2ical.Event) -> Dict[str, Any]:
+    obj = event._asdict()
+    obj["categories"] = sorted(event.categories)
+    return obj
+
+
+class Worker:
+    """Answers JSON-RPC requests, keeping converters and parses warm."""
+
+    def __init__(self):
+        self._converters: Dict[str, org2ical.Converter] = {}
+        # parse key -> parsed org tree
+        self._parses: Dict[Tuple[str, str], Any] = {}
+        # document -> (parse key, options key)
+        self._documents: Dict[str, Tuple[Tuple[str, str], str]] = {}
+        self.running = True
+
+    def handle_line(self, line: str) -> Optional[str]:
+        """Handles one request line and returns the response line, if any."""
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return self._error(None, RPCError(PARSE_ERROR, str(e)))
+        if not isinstance(request, dict) or "method" not in request:
+            return self._error(None, RPCError(
+                INVALID_REQUEST, "Request must be an object with a method"))
+        request_id = request.get("id")
+        try:
+            result = self.handle(request["method"], request.get("params") or {})
+        except RPCError as e:
+            return self._error(request_id, e)
+        except Exception as e:  # pylint: disable=broad-except
+            # Keep serving: one bad document must not stop the worker.
+            return self._error(request_id, RPCError(SERVER_ERROR, f"{type(e).__name__}: {e}"))
+        if "id" not in request:
+            return None  # Notification
+        return json.dumps({"jsonrpc": "2.0", "id": request_id, "result": result})
+
+    def handle(self, method: str, params: Dict[str, Any]) -> Any:
+        """Dispatches a request to its method."""
+        if not isinstance(params, dict):
+            raise RPCError(INVALID_PARAMS, "params must be an object")
+        if method == "convert":
+            return self.convert(params, only_if_changed=False)
+        if method == "update":
+            return self.convert(params, only_if_changed=True)
+        if method == "shutdown":
+            self.running = False
+            return None
+        raise RPCError(METHOD_NOT_FOUND, f"Unknown method: {method}")
+
+    def convert(self, params: Dict[str, Any], *, only_if_changed: bool) -> Dict[str, Any]:
+        """Implements the `convert` and `update` methods."""
+        path = params.get("path")
+        text = params.get("text")
+        if (path is None) == (text is None):
+            raise RPCError(INVALID_PARAMS, "Exactly one of path and text is required")
+        if text is not None and not isinstance(text, str):
+            raise RPCError(INVALID_PARAMS, "text must be a string")
+        document = params.get("document", path)
+        output = params.get("output")
+        for name, value in (("path", path), ("document", document), ("output", output)):
+            if value is not None and not isinstance(value, str):
+                raise RPCError(INVALID_PARAMS, f"{name} must be a string")
+        options = params.get("options") or {}
+        options_key = json.dumps(options, sort_keys=True)
+        converter = self._converter(options_key, options)
+        max_input_bytes = converter.limits.max_input_bytes
+        if text is None:
+            with open(os.path.expanduser(path), "r", encoding="utf-8") as f:
+                # A character takes at least one byte; `parse()` cuts the rest.
+                text = f.read(max_input_bytes if max_input_bytes is not None else -1)
+
+        digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        parse_key = (digest, json.dumps(
+            [converter.todo_states, converter.done_states, max_input_bytes]))
+        if only_if_changed and document is not None:
+            previous = self._documents.get(document)
+            if previous == (parse_key, options_key):
+                return {"changed": False}
+
+        parsed = self._parses.get(parse_key)
+        if parsed is None:
+            parse_warnings = diagnostics.Warnings()
+            parsed = (converter.parse(text, warnings=parse_warnings), parse_warnings)
+            _put(self._parses, parse_key, parsed)
+        source, parse_warnings = parsed
+        warnings = diagnostics.Warnings(converter.max_warnings)
+        warnings.add_all(parse_warnings)
+        now = converter._now()
+        events, _ = converter.events(source, now=now, warnings=warnings)
+        ical_str = converter.dumps(
+            events, now=now, just_entries=bool(params.get("just_entries")))
+
+        result: Dict[str, Any] = {
+            "events": [_event_to_json(event) for event in events],
+            "warnings": [warning.to_dict() for warning in warnings],
+        }
+        if output is not None:
+            with open(os.path.expanduser(output), "w", encoding="utf-8", newline="") as f:
+                f.write(ical_str)
+        else:
+            result["ical"] = ical_str
+        if only_if_changed:
+            result["changed"] = True
+            if document is not None:
+                _put(self._documents, document, (parse_key, options_key))
+        return result
+
+    def _converter(self, options_key: str, options: Dict[str, Any]) -> org2ical.Converter:
+        converter = self._converters.get(options_key)
+        if converter is None:
+            try:
+                converter = org2ical.Converter(**_decode_options(options))
+            except ValueError as e:
+                raise RPCError(INVALID_PARAMS, str(e)) from e
+            _put(self._converters, options_key, converter)
+        return converter
+
+    @staticmethod
+    def _error(request_id: Any, error: RPCError) -> str:
+        return json.dumps({
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "error": {"code": error.code, "message": error.message},
+        })
+
+
+def _put(cache: Dict[Any, Any], key: Any, value: Any) -> None:
+    """Inserts into a cache, dropping the oldest entry when it is full."""
+    cache.pop(key, None)
+    if len(cache) >= _MAX_CACHED:
+        del cache[next(iter(cache))]
+    cache[key] = value
+
+
+def _decode_options(options: Dict[str, Any]) -> Dict[str, Any]:
+    """Converts JSON option values into `Converter` keyword arguments.
+    Values of the wrong JSON type are invalid params, rather than being
+    coerced (e.g. a string into a set of its characters)."""
+    if not isinstance(options, dict):
+        raise RPCError(INVALID_PARAMS, "options must be an object")
+    kwargs: Dict[str, Any] = {}
+    try:
+        for key, value in options.items():
+            if value is None:
+                continue
+            if key in _SET_OPTIONS:
+                kwargs[key] = set(_strings(key, value))
+            elif key in _LIST_OPTIONS:
+                kwargs[key] = _strings(key, value)
+            elif key in ("from_tz", "to_tz"):
+                kwargs[key] = _parse_tz(_expect(key, value, str, "a string"))
+            elif key in ("now", "dtstamp"):
+                kwargs[key] = _parse_now(_expect(key, value, str, "a string"))
+            elif key in ("prod_id", "clock_merge", "select"):
+                kwargs[key] = _expect(key, value, str, "a string")
+            elif key == "clock_merge_gap":
+                kwargs[key] = timedelta(minutes=_expect(key, value, (int, float), "a number"))
+            elif key == "max_warnings":
+                kwargs[key] = _expect(key, value, int, "an integer")
+            elif key == "collapse_series":
+                kwargs[key] = _expect(key, value, bool, "a boolean")
+            elif key == "limits":
+                kwargs[key] = org2ical.Limits(**_expect(key, value, dict, "an object"))
+            else:
+                raise RPCError(INVALID_PARAMS, f"Unknown option: {key}")
+        return kwargs
+    except (TypeError, ValueError, argparse.ArgumentTypeError) as e:
+        raise RPCError(INVALID_PARAMS, str(e)) from e
+
+
+def _expect(key: str, value: Any, types: Any, description: str) -> Any:
+    """Returns an option value of the JSON type `types`, which is
+    `description`."""
+    # `bool` is a subclass of `int`, but `true` is no JSON number
+    if not isinstance(value, types) or (isinstance(value, bool) and types is not bool):
+        raise RPCError(INVALID_PARAMS, f"{key} must be {description}")
+    return value
+
+
+def _strings(key: str, value: Any) -> List[str]:
+    """Returns an option value that must be an array of strings."""
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise RPCError(INVALID_PARAMS, f"{key} must be an array of strings")
+    return list(value)
+
+
+def serve(stdin: Optional[IO[str]] = None, stdout: Optional[IO[str]] = None) -> None:
+    """Serves requests from `stdin` until EOF or a `shutdown` request."""
+    stdin = stdin if stdin is not None else sys.stdin
+    stdout = stdout if stdout is not None else sys.stdout
+    worker = Worker()
+    for line in stdin:
+        if not line.strip():
+            continue
+        response = worker.handle_line(line)
+        if response is not None:
+            stdout.write(response + "\n")
+            stdout.flush()
+        if not worker.running:
+            break
@@ -36,8 +36,13 @@ setuptools.setup(
     install_requires=[
         "orgparse>=0.3.2"
     ],
+    entry_points={
+        "console_scripts": ["org2ical=org2ical.cli:main"],
+    },
     extras_require={
-        "testing": ["pytest", "mypy", "flake8", "pylint", "icalendar", "python-dateutil"],
+        "clock": ["numpy"],
+        "recur": ["python-dateutil"],
+        "testing": ["pytest", "mypy", "flake8", "pylint", "icalendar", "python-dateutil", "numpy"],
     },
 )
 
@@ -0,0 +1,135 @@
+import random
+import textwrap
+from datetime import date, datetime, timedelta, timezone
+
+import org2ical
+from org2ical import agenda
+
+NOW = datetime(2022, 1, 1)
+UTC = timezone.utc
+
+ORG_STR = textwrap.dedent("""\
+    * Standup
+      <2022-01-03 Mon 09:00-09:15 +1w>
+    * Conference
+      <2022-01-05 Wed>--<2022-01-07 Fri>
+    * Dentist
+      <2022-01-04 Tue 14:00>
+    * TODO Report
+      DEADLINE: <2022-01-10 Mon>
+    * 10:00-12:00 Workshop
+      <%%(diary-block 2022 1 4 2022 1 6)>
+    """)
+
+
+def _summaries(occurrences):
+    return [(o.event.summary, o.start.astimezone(UTC).strftime("%m-%d %H:%M")) for o in occurrences]
+
+
+def _calendar():
+    cal, warnings = agenda.loads(ORG_STR, now=NOW, include_types={
+        org2ical.TIMESTAMP, org2ical.DEADLINE, org2ical.DIARY})
+    assert warnings == []
+    return cal
+
+
+def test_between():
+    cal = _calendar()
+    assert len(cal) == 5
+    assert _summaries(cal.between(datetime(2022, 1, 4, tzinfo=UTC), datetime(2022, 1, 6, tzinfo=UTC))) == [
+        ("Workshop", "01-04 09:00"),  # 10:00 Vienna
+        ("Dentist", "01-04 14:00"),
+        ("Conference", "01-05 00:00"),
+        ("Workshop", "01-05 09:00"),
+    ]
+    assert _summaries(cal.between(datetime(2022, 1, 17, 9, 10), datetime(2022, 1, 17, 10))) == [
+        ("Standup", "01-17 09:00"),
+    ]
+    assert cal.between(datetime(2022, 1, 2), datetime(2022, 1, 2)) == []
+
+
+def test_next():
+    cal = _calendar()
+    assert _summaries(cal.next(4, after=datetime(2022, 1, 6, 9, 30))) == [
+        ("Report", "01-10 00:00"),
+        ("Standup", "01-10 09:00"),
+        ("Standup", "01-17 09:00"),
+        ("Standup", "01-24 09:00"),
+    ]
+    assert _summaries(cal.next(2, after=datetime(2022, 1, 4, 9))) == [
+        ("Workshop", "01-04 09:00"),
+        ("Dentist", "01-04 14:00"),
+    ]
+    assert agenda.Calendar([]).next(3) == []
+
+
+def test_matches_brute_force():
+    rng = random.Random(0)
+    events = []
+    for i in range(300):
+        start = datetime(2022, 1, 1, tzinfo=UTC) + timedelta(minutes=15 * rng.randrange(4 * 24 * 60))
+        if i % 5 == 0:
+            events.append(org2ical.Event(start.strftime("%Y%m%d"), None, str(i), "", set(),
+                                         is_dayevent=True))
+        else:
+            end = start + timedelta(minutes=15 * rng.randrange(0, 4 * 24 * 10))
+            events.append(org2ical.Event(start.strftime("%Y%m%dT%H%M%SZ"),
+                                         end.strftime("%Y%m%dT%H%M%SZ"), str(i), "", set()))
+    cal = agenda.Calendar(events)
+    occurrences = [agenda.Occurrence(cal._anchor(s.start), cal._anchor(s.end), s.all_day, e)
+                   for e in events for s in [org2ical.recurrence.span(e)]]
+    for _ in range(200):
+        a = datetime(2022, 1, 1, tzinfo=UTC) + timedelta(hours=rng.randrange(24 * 70))
+        b = a + timedelta(hours=rng.randrange(1, 24 * 5))
+        expected = [o for o in occurrences if a <= o.start < b or o.start < a < o.end]
+        key = lambda o: (o.start, o.end, o.event.summary)
+        assert sorted(cal.between(a, b), key=key) == sorted(expected, key=key)
+        following = sorted((o for o in occurrences if o.start >= a), key=lambda o: o.start)
+        assert [o.start for o in cal.next(10, after=a)] == [o.start for o in following[:10]]
+
+
+def test_last_occurrence():
+    event = org2ical.Event("20220103", None, "", "", set(), rrule="RRULE:FREQ=DAILY;COUNT=3",
+                           is_dayevent=True)
+    assert org2ical.recurrence.last(event) == (date(2022, 1, 5), date(2022, 1, 6))
+    event = event._replace(rrule="RRULE:FREQ=WEEKLY;INTERVAL=1")
+    assert org2ical.recurrence.last(event) is None
+
+
+def test_old_series(monkeypatch):
+    rules = ["RRULE:FREQ=DAILY;INTERVAL=3", "RRULE:FREQ=WEEKLY;INTERVAL=2;COUNT=2000",
+             "RRULE:FREQ=MONTHLY;BYSETPOS=-1;BYDAY=FR;INTERVAL=1", "RRULE:FREQ=YEARLY;INTERVAL=1",
+             "RRULE:FREQ=MONTHLY;INTERVAL=1;COUNT=500"]
+    events = [org2ical.Event("19850115T100000", "19850115T110000", rule, "", set(), rrule=rule,
+                             tzprefix=";TZID=Europe/Vienna") for rule in rules]
+    events.append(org2ical.Event("19840229", None, "Leap", "", set(),
+                                 rrule="RRULE:FREQ=YEARLY;INTERVAL=1", is_dayevent=True))
+    a, b = datetime(2024, 2, 1, tzinfo=UTC), datetime(2024, 4, 1, tzinfo=UTC)
+    cal = agenda.Calendar(events)
+    expected = {}
+    for event in events:
+        first = org2ical.recurrence.span(event)
+        duration = first.end - first.start
+        starts = []
+        for dt in org2ical.recurrence._rule(event, first):
+            start = dt.date() if first.all_day else dt
+            if start >= (b.date() if first.all_day else b):
+                break
+            if start + duration > (a.date() if first.all_day else a):
+                starts.append(cal._anchor(start))
+        expected[event.summary] = starts
+
+    # The rules are expanded from just before the window, not from 1985
+    expanded = []
+    rule = org2ical.recurrence._rule
+    monkeypatch.setattr(org2ical.recurrence, "_rule",
+                        lambda *args: expanded.append(rule(*args)) or expanded[-1])
+    got = {event.summary: [] for event in events}
+    for occurrence in cal.between(a, b):
+        got[occurrence.event.summary].append(occurrence.start)
+    assert got == expected
+    assert got["Leap"] == [datetime(2024, 2, 29, tzinfo=UTC)]
+    assert len(got["RRULE:FREQ=WEEKLY;INTERVAL=2;COUNT=2000"]) == 4
+    following = sorted(start for starts in expected.values() for start in starts if start >= a)
+    assert [o.start for o in cal.next(5, after=a)] == following[:5]
+    assert all(r._dtstart.year >= 2022 for r in expanded)
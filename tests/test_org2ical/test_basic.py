@@ -1,6 +1,8 @@
 import textwrap
+from datetime import timedelta
 
 import dateutil.tz
+import pytest
 
 from .utils import compare, iCalEntry
 
@@ -192,6 +194,44 @@ def test_clock():
     compare(org_str, icals, include_types={"CLOCK"})
     compare(org_str, [], ignore_states={"DONE", "CANCELED", None, "TODO"}, include_types={"CLOCK"})
 
+def test_clock_merge():
+    org_str = textwrap.dedent("""\
+    * Pomodoro
+    :LOGBOOK:
+    CLOCK: [2022-01-01 Sat 10:00]--[2022-01-01 Sat 10:25] =>  0:25
+    CLOCK: [2022-01-01 Sat 09:00]--[2022-01-01 Sat 09:25] =>  0:25
+    CLOCK: [2022-01-01 Sat 09:30]--[2022-01-01 Sat 09:55] =>  0:25
+    CLOCK: [2022-01-01 Sat 09:50]--[2022-01-01 Sat 09:55] =>  0:05
+    CLOCK: [2022-01-02 Sun 09:00]
+    :END:
+    * Other
+    :LOGBOOK:
+    CLOCK: [2022-01-01 Sat 14:00]--[2022-01-01 Sat 15:00] =>  1:00
+    CLOCK: [2022-01-02 Sun 08:00]--[2022-01-02 Sun 08:30] =>  0:30
+    :END:
+    """)
+    logbook = ":LOGBOOK:\n:END:"
+    icals = [
+        iCalEntry("2022-01-01 09:00:00+00:00", "2022-01-01 10:25:00+00:00", "Pomodoro", "Clocked: 1:15 in 4 intervals\n\n" + logbook, "CLOCK"),
+        iCalEntry("2022-01-01 14:00:00+00:00", "2022-01-01 15:00:00+00:00", "Other", "Clocked: 1:00 in 1 interval\n\n" + logbook, "CLOCK"),
+        iCalEntry("2022-01-02 08:00:00+00:00", "2022-01-02 08:30:00+00:00", "Other", "Clocked: 0:30 in 1 interval\n\n" + logbook, "CLOCK"),
+    ]
+    compare(org_str, icals, include_types={"CLOCK"}, clock_merge="heading",
+            clock_merge_gap=timedelta(minutes=5))
+    icals[0:1] = [
+        iCalEntry("2022-01-01 09:00:00+00:00", "2022-01-01 09:25:00+00:00", "Pomodoro", "Clocked: 0:25 in 1 interval\n\n" + logbook, "CLOCK"),
+        iCalEntry("2022-01-01 09:30:00+00:00", "2022-01-01 09:55:00+00:00", "Pomodoro", "Clocked: 0:25 in 2 intervals\n\n" + logbook, "CLOCK"),
+        iCalEntry("2022-01-01 10:00:00+00:00", "2022-01-01 10:25:00+00:00", "Pomodoro", "Clocked: 0:25 in 1 interval\n\n" + logbook, "CLOCK"),
+    ]
+    compare(org_str, icals, include_types={"CLOCK"}, clock_merge="heading")
+    icals = [
+        iCalEntry("2022-01-01 09:00:00+00:00", "2022-01-01 15:00:00+00:00", "Clocked 2:15", "- Pomodoro: 1:15\n- Other: 1:00", "CLOCK", path=False),
+        iCalEntry("2022-01-02 08:00:00+00:00", "2022-01-02 08:30:00+00:00", "Clocked 0:30", "- Other: 0:30", "CLOCK", path=False),
+    ]
+    compare(org_str, icals, include_types={"CLOCK"}, clock_merge="day")
+    with pytest.raises(ValueError):
+        compare(org_str, [], include_types={"CLOCK"}, clock_merge="week")
+
 def test_mixed():
     org_str = textwrap.dedent("""\
     Lorem ipsum
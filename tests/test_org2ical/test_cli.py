@@ -0,0 +1,98 @@
+import os
+import subprocess
+import sys
+import textwrap
+import time
+
+import icalendar
+
+from org2ical.cli import main
+
+# Extra wall-clock seconds `org2ical` may take for converting a tiny file
+# over an interpreter that only imports orgparse and parses the file.
+# Editor save hooks run it on every save.
+STARTUP_BUDGET = 0.05
+
+
+def _write(path, text):
+    path.write_text(textwrap.dedent(text), encoding="utf-8")
+    return str(path)
+
+
+def test_cli_multiple_inputs(tmp_path, capsys):
+    a = _write(tmp_path / "a.org", """\
+    * Meet Peter at the movies
+      <2006-11-01 Wed 19:15>
+    """)
+    b = _write(tmp_path / "b.org", """\
+    Preamble
+    * TODO Call Trillian
+      SCHEDULED: <2004-12-25 Sat>
+    * Broken
+      SCHEDULED:
+    """)
+    out = tmp_path / "out.ics"
+    assert main([a, b, "-o", str(out), "--now", "2021-01-01T00:00:00",
+                 "--category", "ORG"]) == 0
+    cal = icalendar.Calendar.from_ical(out.read_text(encoding="utf-8"))
+    events = [c for c in cal.walk() if c.name == "VEVENT"]
+    assert [str(e["summary"]) for e in events] == [
+        "Meet Peter at the movies", "Call Trillian"]
+    assert str(events[0]["dtstamp"].dt) == "2021-01-01 00:00:00+00:00"
+    assert "ORG" in events[1]["categories"].to_ical().decode("utf-8")
+    assert capsys.readouterr().err == (
+        "WARNING: SCHEDULED keyword found but no timestamp"
+        " in node: `Broken`.\n")
+
+
+def test_cli_options(tmp_path, capsys):
+    a = _write(tmp_path / "a.org", """\
+    * Entry
+      <2022-01-01 Sat 10:00>
+      CLOCK: [2022-01-01 Sat 00:00]--[2022-01-01 Sat 01:11] =>  1:11
+    """)
+    assert main([a, "--include-type", "CLOCK", "--just-entries",
+                 "--to-tz", "+01:00"]) == 0
+    out = capsys.readouterr().out
+    assert out.startswith("BEGIN:VEVENT")
+    assert "DTSTART:20211231T230000Z" in out
+    assert "CATEGORIES:CLOCK" in out
+    assert "VCALENDAR" not in out
+
+    assert main([a, "--include-type", "CLOCK", "--just-entries",
+                 "--clock-merge", "day"]) == 0
+    assert "SUMMARY:Clocked 1:11" in capsys.readouterr().out
+
+
+def test_import_is_lazy():
+    code = ("import sys, org2ical.cli; "
+            "print(sorted(m for m in sys.modules if m.startswith(('orgparse', 'org2ical.'))))")
+    result = subprocess.run([sys.executable, "-c", code], check=True,
+                            capture_output=True, text=True)
+    assert result.stdout.strip() == str(
+        ["org2ical.cli", "org2ical.diagnostics", "org2ical.event", "org2ical.extractors"])
+    code = "import org2ical; print(org2ical.include.Loader.__name__)"
+    result = subprocess.run([sys.executable, "-c", code], check=True,
+                            capture_output=True, text=True)
+    assert result.stdout.strip() == "Loader"
+
+
+def _best_of(cmd, n=5):
+    # Like an installed package, the first run leaves bytecode for the others
+    env = {k: v for k, v in os.environ.items() if k != "PYTHONDONTWRITEBYTECODE"}
+    best = float("inf")
+    for _ in range(n):
+        start = time.perf_counter()
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, env=env)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def test_startup_budget(tmp_path):
+    a = _write(tmp_path / "a.org", """\
+    * Meet Peter at the movies
+      <2006-11-01 Wed 19:15>
+    """)
+    baseline = _best_of([sys.executable, "-c", f"import orgparse; orgparse.load({a!r})"])
+    elapsed = _best_of([sys.executable, "-m", "org2ical", a, "-q"])
+    assert elapsed - baseline < STARTUP_BUDGET, f"{elapsed:.3f}s (parsing only: {baseline:.3f}s)"
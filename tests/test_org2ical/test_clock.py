@@ -0,0 +1,85 @@
+import textwrap
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import org2ical.clock  # noqa: E402  pylint: disable=wrong-import-position
+
+
+ORG_STR = textwrap.dedent("""\
+* Project :work:
+** TODO Write report :writing:
+CLOCK: [2022-01-03 Mon 09:00]--[2022-01-03 Mon 10:30] =>  1:30
+CLOCK: [2022-01-04 Tue 09:00]--[2022-01-04 Tue 09:45] =>  0:45
+CLOCK: [2022-01-05 Wed 09:00]
+** DONE Review
+CLOCK: [2022-01-09 Sun 23:00]--[2022-01-10 Mon 00:30] =>  1:30
+* Archived :ARCHIVE:
+CLOCK: [2022-01-03 Mon 12:00]--[2022-01-03 Mon 13:00] =>  1:00
+""")
+
+
+def test_extract():
+    table = org2ical.clock.loads(ORG_STR, ignore_states=set())
+    assert len(table) == 3
+    assert table.paths == ["Project > Write report", "Project > Review"]
+    assert table.duration.tolist() == [5400, 2700, 5400]
+    assert str(table.start[2]) == "2022-01-09T23:00:00"
+
+    paths, totals = table.totals_by_path()
+    assert dict(zip(paths, totals.tolist())) == {
+        "Project > Write report": 8100, "Project > Review": 5400}
+    tags, totals = table.totals_by_tag()
+    assert dict(zip(tags, totals.tolist())) == {"work": 13500, "writing": 8100}
+    days, totals = table.totals_by_day()
+    assert [str(d) for d in days] == ["2022-01-03", "2022-01-04", "2022-01-09"]
+    assert totals.tolist() == [5400, 2700, 5400]
+    weeks, totals = table.totals_by_week()
+    assert [str(w) for w in weeks] == ["2022-01-03"]
+    assert totals.tolist() == [13500]
+
+
+def test_ignored_nodes():
+    table = org2ical.clock.loads(ORG_STR)
+    assert table.paths == ["Project > Write report"]
+    assert len(org2ical.clock.loads("* Empty\n")) == 0
+
+
+def test_files(tmp_path):
+    table = org2ical.clock.loads(ORG_STR, ignore_states=set())
+    table.to_csv(str(tmp_path / "clocks.csv"))
+    lines = (tmp_path / "clocks.csv").read_text(encoding="utf-8").splitlines()
+    assert lines[0] == "start,end,duration,path,tags"
+    assert lines[1] == "2022-01-03T09:00:00,2022-01-03T10:30:00,5400,Project > Write report,work:writing"
+
+    table.save(str(tmp_path / "clocks.npz"))
+    loaded = org2ical.clock.ClockTable.load(str(tmp_path / "clocks.npz"))
+    assert loaded.paths == table.paths
+    assert loaded.tags == table.tags
+    assert (loaded.duration == table.duration).all()
+    assert loaded.totals_by_tag()[1].tolist() == table.totals_by_tag()[1].tolist()
+
+
+def test_aggregation_speed():
+    # About 15 years of a dozen clocks a day over 1000 headings and 50 tags.
+    n = 65536
+    rng = np.random.default_rng(0)
+    start = (np.datetime64("2010-01-01T00:00:00")
+             + rng.integers(0, 15 * 365 * 86400, n).astype("timedelta64[s]"))
+    end = start + rng.integers(60, 7200, n).astype("timedelta64[s]")
+    counts = rng.integers(0, 4, n)
+    tag_offsets = np.concatenate([[0], np.cumsum(counts)])
+    table = org2ical.clock.ClockTable(
+        start, end, rng.integers(0, 1000, n).astype(np.int32),
+        [f"Heading {i}" for i in range(1000)], tag_offsets,
+        rng.integers(0, 50, tag_offsets[-1]).astype(np.int32),
+        [f"tag{i}" for i in range(50)])
+    begin = time.perf_counter()
+    table.totals_by_path()
+    table.totals_by_tag()
+    table.totals_by_day()
+    table.totals_by_week()
+    elapsed = time.perf_counter() - begin
+    assert elapsed < 0.5, f"aggregated {n} clocks in {elapsed:.3f}s"
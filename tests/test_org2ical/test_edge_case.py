@@ -1,6 +1,12 @@
+import gc
 import textwrap
+import weakref
 
 import dateutil.tz
+import pytest
+
+import org2ical
+from org2ical import lint
 
 from .utils import compare, iCalEntry
 
@@ -139,3 +145,68 @@ def test_timestamp_range_with_timezone():
         iCalEntry("2023-12-05", "2023-12-21", "Entry", "<2023-12-05 Tue>--<2023-12-20 Wed>", "TIMESTAMP"),
     ]
     compare(org_str, icals, include_types={"TIMESTAMP"}, to_tz=dateutil.tz.gettz('Asia/Taipei'))
+
+def test_warning_objects():
+    org_str = textwrap.dedent("""\
+    * Parent
+    ** Entry
+    SCHEDULED:
+    * Other
+    DEADLINE:
+    """)
+    _, warnings = org2ical.loads(org_str)
+    assert [(w.code, w.line, w.path) for w in warnings] == [
+        ("missing-timestamp", 2, "Parent > Entry"),
+        ("missing-timestamp", 4, "Other"),
+    ]
+    assert str(warnings[0]) == \
+        "WARNING: SCHEDULED keyword found but no timestamp in node: `Parent > Entry`."
+
+    _, warnings = org2ical.loads(org_str, max_warnings=1)
+    assert warnings == [
+        "WARNING: SCHEDULED keyword found but no timestamp in node: `Parent > Entry`."]
+    assert warnings.dropped == 1
+
+    _, warnings = org2ical.loads(org_str, max_warnings=0)
+    assert warnings == []
+    assert warnings.dropped == 0
+
+    with pytest.raises(ValueError):
+        org2ical.loads(org_str, max_warnings=-1)
+
+
+def test_warnings_do_not_keep_the_tree(tmp_path):
+    org_str = "* Parent\n** Entry\nSCHEDULED:\n* Other\nDEADLINE:\n"
+    converter = org2ical.Converter()
+    source = converter.parse(org_str)
+    tree = weakref.ref(source)
+    _, warnings = converter.events(source)
+    del source
+    gc.collect()
+    assert tree() is None
+    assert [w.path for w in warnings] == ["Parent > Entry", "Other"]
+
+    path = tmp_path / "a.org"
+    path.write_text('#+INCLUDE: "missing.org"\n' + org_str, encoding="utf-8")
+    _, warnings = org2ical.load(str(path), max_warnings=2)
+    assert len(warnings) == 2
+    assert warnings.dropped == 1
+
+
+def test_warning_paths_are_not_rebuilt(monkeypatch):
+    # Each warning of a deep tree takes the path the traversal already built
+    org_str = "".join("*" * level + f" {level}\nSCHEDULED:\n" for level in range(1, 200))
+    full_path = org2ical._node_full_path
+    uncached = []
+
+    def node_full_path(node, cache=None):
+        if cache is None:
+            uncached.append(node)
+        return full_path(node, cache)
+
+    monkeypatch.setattr(org2ical, "_node_full_path", node_full_path)
+    _, warnings = org2ical.loads(org_str)
+    assert len(warnings) == 199
+    assert warnings[-1].path == " > ".join(str(level) for level in range(1, 200))
+    assert lint.check(org_str) == warnings
+    assert uncached == []
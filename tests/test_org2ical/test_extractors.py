@@ -0,0 +1,67 @@
+import textwrap
+from datetime import datetime
+
+import pytest
+
+import org2ical
+from org2ical import extractors
+
+ORG_STR = textwrap.dedent("""\
+    * Wedding
+    :PROPERTIES:
+    :ANNIVERSARY: 2015-06-20
+    :END:
+    * Meeting
+      <2022-01-03 Mon 10:00>
+    """)
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(extractors, "_REGISTRY", dict(extractors._REGISTRY))
+
+
+def test_custom_extractor(registry):
+    calls = []
+
+    @extractors.register("ANNIVERSARY", markers=[":ANNIVERSARY:"])
+    def anniversary(ctx):
+        calls.append(ctx.node.heading)
+        day = datetime.strptime(ctx.node.get_property("ANNIVERSARY"), "%Y-%m-%d")
+        return [org2ical.Event(
+            day.strftime("%Y%m%d"), None, f"{ctx.summary} Anniversary", ctx.description,
+            ctx.converter.categories.union({"ANNIVERSARY"}),
+            rrule="RRULE:FREQ=YEARLY;INTERVAL=1", is_dayevent=True)]
+
+    converter = org2ical.Converter(include_types={"ANNIVERSARY", "TIMESTAMP"})
+    events, _ = converter.events(converter.parse(ORG_STR))
+    assert [(e.summary, e.start, sorted(e.categories)) for e in events] == [
+        ("Wedding Anniversary", "20150620", ["ANNIVERSARY"]),
+        ("Meeting", "20220103T100000Z", ["TIMESTAMP"]),
+    ]
+    # Dispatched only to the node with the marker
+    assert calls == ["Wedding"]
+
+
+def test_marker_dispatch(registry):
+    calls = []
+
+    @extractors.register("EVERYTHING", markers=["*", "<"])
+    def everything(ctx):
+        calls.append(ctx.node.heading)
+        return []
+
+    @extractors.register("NOTHING", markers=["NO SUCH MARKER"])
+    def nothing(ctx):
+        raise AssertionError("dispatched without marker")
+
+    converter = org2ical.Converter(include_types={"EVERYTHING", "NOTHING"})
+    assert converter.events(converter.parse(ORG_STR))[0] == []
+    assert calls == ["Wedding", "Meeting"]
+
+
+def test_unknown_include_type():
+    with pytest.raises(ValueError):
+        org2ical.Converter(include_types={"ANNIVERSARY"})
+    with pytest.raises(ValueError):
+        extractors.register("EMPTY", markers=[])
@@ -0,0 +1,83 @@
+import textwrap
+from datetime import datetime, timedelta, timezone
+
+import icalendar
+
+import org2ical
+from org2ical import freebusy
+from org2ical.cli import main
+
+UTC = timezone.utc
+START = datetime(2022, 1, 3, tzinfo=UTC)
+END = START + timedelta(days=7)
+ORG_STR = textwrap.dedent("""\
+    * Meeting
+      <2022-01-03 Mon 10:00-11:00>
+    * Overlapping
+      <2022-01-03 Mon 10:30>
+    * Weekly
+      SCHEDULED: <2021-12-28 Tue 09:00 +1w>
+    * Deadline
+      DEADLINE: <2022-01-05 Wed 12:00>
+    * Holiday
+      <2022-01-06 Thu>
+    * Work
+      CLOCK: [2022-01-07 Fri 08:00]--[2022-01-07 Fri 09:30] =>  1:30
+    * Outside
+      <2022-02-01 Tue 10:00>
+    * 19:00-20:00 Choir
+      <%%(diary-float t 5 1)>
+    """)
+
+
+def _periods(ical_str):
+    cal = icalendar.Calendar.from_ical(ical_str)
+    (vfreebusy,) = [c for c in cal.walk() if c.name == "VFREEBUSY"]
+    assert not [c for c in cal.walk() if c.name == "VEVENT"]
+    values = vfreebusy.get("FREEBUSY")
+    values = values if isinstance(values, list) else [values]
+    return [v.to_ical().decode("utf-8") for v in values]
+
+
+def test_freebusy():
+    ical_str, warnings = freebusy.loads(
+        ORG_STR, START, END, now=datetime(2022, 1, 1),
+        include_types={"TIMESTAMP", "SCHEDULED", "DEADLINE", "CLOCK", "DIARY"})
+    assert warnings == []
+    assert "DTSTAMP:20220101T000000Z" in ical_str
+    assert _periods(ical_str) == [
+        "20220103T100000Z/20220103T113000Z",
+        "20220104T090000Z/20220104T100000Z",
+        "20220107T080000Z/20220107T093000Z",
+        # First Friday, 19:00-20:00 in Vienna (CET)
+        "20220107T180000Z/20220107T190000Z",
+    ]
+
+
+def test_periods_clip_and_gap():
+    converter = org2ical.Converter()
+    events, _ = converter.events(converter.parse(textwrap.dedent("""\
+        * A
+          <2022-01-02 Sun 23:30-23:59>
+        * B
+          <2022-01-03 Mon 00:00-01:00>
+        * C
+          <2022-01-03 Mon 01:10-02:00>
+        """)))
+    assert freebusy.periods(events, START, END) == [
+        (START, START + timedelta(hours=1)),
+        (START + timedelta(minutes=70), START + timedelta(hours=2)),
+    ]
+    assert freebusy.periods(events, START, END, gap=timedelta(minutes=10)) == [
+        (START, START + timedelta(hours=2)),
+    ]
+
+
+def test_cli_freebusy(tmp_path, capsys):
+    org = tmp_path / "a.org"
+    org.write_text(ORG_STR, encoding="utf-8")
+    assert main([str(org), "--freebusy", "7", "--now", "2022-01-03T12:00:00"]) == 0
+    assert _periods(capsys.readouterr().out)[:2] == [
+        "20220103T100000Z/20220103T113000Z",
+        "20220104T090000Z/20220104T100000Z",
+    ]
@@ -0,0 +1,103 @@
+import os
+import textwrap
+
+import org2ical
+from org2ical.include import Loader
+
+
+def _write(path, text):
+    path.write_text(textwrap.dedent(text), encoding="utf-8")
+    return str(path)
+
+
+def test_include_and_setupfile(tmp_path):
+    (tmp_path / "shared").mkdir()
+    _write(tmp_path / "shared" / "setup.org", """\
+    #+TODO: NEXT(n) WAITING | FINISHED(f!) DROPPED
+    """)
+    _write(tmp_path / "shared" / "meetings.org", """\
+    * Standup
+      <2022-01-03 Mon 09:00>
+    * FINISHED Retro
+      <2022-01-07 Fri 15:00>
+    """)
+    _write(tmp_path / "snippet.org", """\
+    * Line 1 <2022-02-01 Tue>
+    * Line 2 <2022-02-02 Wed>
+    * Line 3 <2022-02-03 Thu>
+    """)
+    project = _write(tmp_path / "project.org", """\
+    #+SETUPFILE: shared/setup.org
+    * NEXT Kickoff
+      SCHEDULED: <2022-01-01 Sat>
+    ** Meetings
+    #+INCLUDE: "shared/meetings.org" :minlevel 3
+    #+INCLUDE: "snippet.org" :lines "2-3"
+    #+INCLUDE: "missing.org"
+    """)
+    ical_str, warnings = org2ical.load(project, just_entries=True, ignore_states={"FINISHED"})
+    assert "SUMMARY:Kickoff" in ical_str
+    assert "Org Path: Kickoff > Meetings > Standup" in ical_str
+    assert "Retro" not in ical_str
+    assert "SUMMARY:Line 2" in ical_str
+    assert "Line 1" not in ical_str
+    assert "Line 3" not in ical_str  # :lines "2-3" excludes line 3
+    assert warnings == [
+        f"WARNING: Included file `{tmp_path / 'missing.org'}` not found in `{project}`."]
+
+
+def test_loader_cache(tmp_path):
+    shared = _write(tmp_path / "shared.org", """\
+    * Holiday
+      <2022-12-24 Sat>
+    """)
+    paths = [_write(tmp_path / f"p{i}.org", f"""\
+    * Project {i}
+    #+INCLUDE: "shared.org" :minlevel 2
+    """) for i in range(30)]
+    loader = Loader()
+    for path in paths:
+        ical_str, _ = org2ical.load(path, loader=loader, just_entries=True)
+        assert ical_str.count("SUMMARY:Holiday") == 1
+    assert loader.reads == 31
+
+    loader.load(paths[0])
+    assert loader.reads == 31
+    stat = os.stat(shared)
+    with open(shared, "a", encoding="utf-8") as f:
+        f.write("* New\n")
+    os.utime(shared, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert "* New" in loader.load(paths[0]).text
+    assert loader.reads == 32
+
+
+def test_recursive_include(tmp_path):
+    a = _write(tmp_path / "a.org", """\
+    * A
+    #+INCLUDE: "b.org"
+    """)
+    _write(tmp_path / "b.org", """\
+    * B
+    #+INCLUDE: "a.org" src org
+    """)
+    org_file = Loader().load(a)
+    assert org_file.text == "* A\n* B\n"
+    assert org_file.warnings == [
+        f"WARNING: Recursive include of `{a}` in `{tmp_path / 'b.org'}`."]
+
+
+def test_invalid_include_options(tmp_path):
+    _write(tmp_path / "b.org", "* B\n")
+    a = _write(tmp_path / "a.org", """\
+    * A
+    #+INCLUDE: "b.org" :minlevel x
+    #+INCLUDE: "b.org" :lines "x-2"
+    #+INCLUDE: "b.org" :lines "1-"
+    """)
+    org_file = Loader().load(a)
+    assert org_file.text.endswith("* B\n")
+    assert org_file.warnings == [
+        'WARNING: Invalid INCLUDE line `#+INCLUDE: "b.org" :minlevel x`.',
+        'WARNING: Invalid INCLUDE line `#+INCLUDE: "b.org" :lines "x-2"`.',
+    ]
+    assert org2ical.load(a)[1] == org_file.warnings
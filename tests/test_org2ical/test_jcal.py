@@ -0,0 +1,109 @@
+import io
+import json
+import textwrap
+from datetime import datetime
+
+import icalendar
+
+import org2ical
+from org2ical import jcal
+from org2ical.cli import main
+
+NOW = datetime(2022, 1, 1)
+OPTIONS = {"now": NOW, "include_types": {org2ical.TIMESTAMP, org2ical.DEADLINE, org2ical.DIARY}}
+
+ORG_STR = textwrap.dedent("""\
+    * Standup :work:
+      :PROPERTIES:
+      :LOCATION: Room 1
+      :END:
+      <2022-01-03 Mon 09:00-09:15 +1w>
+    * TODO Report
+      DEADLINE: <2022-01-10 Mon>
+    * 10:00-12:00 Workshop
+      <%%(diary-float t 2 1)>
+    """)
+
+
+def _properties(component):
+    return {p[0]: p for p in component[1]}
+
+
+def test_jcal_matches_ical():
+    out, warnings = jcal.loads(ORG_STR, **OPTIONS)
+    assert warnings == []
+    name, properties, components = json.loads(out)
+    assert name == "vcalendar"
+    assert ["prodid", {}, "text", org2ical._PROD_ID] in properties
+    assert components[0][0] == "vtimezone"
+    vevents = [_properties(c) for c in components[1:]]
+
+    ical_str, _ = org2ical.loads(ORG_STR, **OPTIONS)
+    expected = [c for c in icalendar.Calendar.from_ical(ical_str).walk() if c.name == "VEVENT"]
+    assert [v["summary"][3] for v in vevents] == [str(e["summary"]) for e in expected]
+    for v, e in zip(vevents, expected):
+        assert v["dtstart"][3].replace("-", "").replace(":", "") == e["dtstart"].to_ical().decode()
+        assert v["description"][3] == str(e["description"])
+        assert v["categories"][3:] == [str(c) for c in e["categories"].cats]
+
+    standup, report, workshop = vevents
+    assert standup["dtend"] == ["dtend", {}, "date-time", "2022-01-03T09:15:00Z"]
+    assert standup["rrule"] == ["rrule", {}, "recur", {"freq": "WEEKLY", "interval": 1}]
+    assert standup["location"][3] == "Room 1"
+    assert report["dtstart"] == ["dtstart", {}, "date", "2022-01-10"]
+    assert "dtend" not in report
+    assert workshop["dtstart"] == ["dtstart", {"tzid": "Europe/Vienna"}, "date-time",
+                                   "1985-01-01T10:00:00"]
+    assert workshop["rrule"][3] == {"freq": "MONTHLY", "bysetpos": 1, "byday": "TU", "interval": 1}
+
+
+def test_ndjson():
+    out, _ = jcal.loads(ORG_STR, ndjson=True, **OPTIONS)
+    objects = [json.loads(line) for line in out.splitlines()]
+    assert [o["summary"] for o in objects] == ["Standup", "Report", "Workshop"]
+    assert objects[1] == {
+        "uid": objects[1]["uid"],
+        "dtstamp": "2022-01-01T00:00:00Z",
+        "start": "2022-01-10",
+        "end": None,
+        "all_day": True,
+        "tzid": None,
+        "summary": "Report",
+        "description": "Org Path: Report",
+        "categories": ["DEADLINE"],
+        "rrule": None,
+        "rdates": [],
+        "location": None,
+    }
+    # UIDs do not depend on the time of the conversion
+    later, _ = jcal.loads(ORG_STR, ndjson=True, **dict(OPTIONS, now=datetime(2023, 1, 1)))
+    assert [json.loads(line)["uid"] for line in later.splitlines()] == [o["uid"] for o in objects]
+
+
+def test_dump_streams():
+    converter = org2ical.Converter(**OPTIONS)
+    events, _ = converter.events(converter.parse(ORG_STR))
+    fp = io.StringIO()
+    written = []
+
+    def generate():
+        for event in events:
+            written.append(len(fp.getvalue()))
+            yield event
+
+    jcal.dump(generate(), fp, dtstamp="20220101T000000Z")
+    assert 0 < written[0] < written[1] < written[2]
+    assert len(json.loads(fp.getvalue())[2]) == 4
+    assert jcal.dumps([], dtstamp="20220101T000000Z").count("vtimezone") == 1
+
+
+def test_cli_format(tmp_path, capsys):
+    path = tmp_path / "a.org"
+    path.write_text(ORG_STR, encoding="utf-8")
+    assert main([str(path), "--format", "ndjson", "--now", "2022-01-01T00:00:00",
+                 "--include-type", "DEADLINE"]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(line)["summary"] for line in lines] == ["Report"]
+    out = tmp_path / "out.json"
+    assert main([str(path), "--format", "jcal", "-o", str(out)]) == 0
+    assert json.loads(out.read_text(encoding="utf-8"))[0] == "vcalendar"
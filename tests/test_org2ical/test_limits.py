@@ -0,0 +1,100 @@
+import textwrap
+import time
+from datetime import datetime
+
+import pytest
+
+import org2ical
+from org2ical import include
+from org2ical.cli import main
+
+ORG_STR = textwrap.dedent("""\
+    * A
+      <2022-01-01 Sat>
+    ** B
+       <2022-01-02 Sun>
+    *** C
+        <2022-01-03 Mon>
+    * D
+      Lorem ipsum dolor sit amet
+      <2022-01-04 Tue>
+    """)
+
+
+def _convert(**limits):
+    converter = org2ical.Converter(limits=org2ical.Limits(**limits), now=datetime(2022, 1, 1))
+    warnings = org2ical.diagnostics.Warnings()
+    source = converter.parse(ORG_STR, warnings=warnings)
+    events, warnings = converter.events(source, warnings=warnings)
+    return [event.summary for event in events], [str(w) for w in warnings]
+
+
+@pytest.mark.parametrize("limits, summaries, warnings", [
+    ({}, ["A", "B", "C", "D"], []),
+    ({"max_input_bytes": 60}, ["A", "B"],
+     ["WARNING: Input truncated to 60 bytes."]),
+    ({"max_nodes": 2}, ["A", "B"],
+     ["WARNING: Stopped after 2 nodes."]),
+    ({"max_depth": 1}, ["A", "D"],
+     ["WARNING: Skipped 2 nodes deeper than level 1."]),
+    ({"max_events": 3}, ["A", "B", "C"],
+     ["WARNING: Stopped after 3 events."]),
+    ({"max_events": 4}, ["A", "B", "C", "D"], []),
+    ({"deadline": 0}, [],
+     ["WARNING: Stopped after the deadline of 0 seconds."]),
+])
+def test_limits(limits, summaries, warnings):
+    assert _convert(**limits) == (summaries, warnings)
+
+
+def test_max_body_length():
+    ical_str, warnings = org2ical.loads(
+        ORG_STR, limits=org2ical.Limits(max_body_length=20), just_entries=True)
+    assert "DESCRIPTION:  Lorem ipsum dolor \\n\\nOrg Path: D" in ical_str
+    assert [w.code for w in warnings] == ["limit"]
+    assert str(warnings[0]) == "WARNING: Body truncated to 20 characters in node: `D`."
+
+
+def test_invalid_limits():
+    with pytest.raises(ValueError):
+        org2ical.Converter(limits=org2ical.Limits(max_nodes=-1))
+
+
+def test_cli_limits(tmp_path, capsys):
+    org = tmp_path / "a.org"
+    org.write_text(ORG_STR, encoding="utf-8")
+    assert main([str(org), "--limit", "max_events=1", "--just-entries"]) == 0
+    captured = capsys.readouterr()
+    assert captured.out.count("BEGIN:VEVENT") == 1
+    assert "Stopped after 1 events" in captured.err
+    with pytest.raises(SystemExit):
+        main([str(org), "--limit", "max_bananas=1"])
+
+
+def _elapsed(f, *args):
+    start = time.perf_counter()
+    f(*args)
+    return time.perf_counter() - start
+
+
+def test_cached_paths():
+    source = org2ical.Converter().parse(ORG_STR)
+    cache = {}
+    # Children first, caching their ancestors on the way
+    for node in reversed(list(source[1:])):
+        assert org2ical._node_full_path(node, cache) == org2ical._node_full_path(node)
+    assert sorted(cache.values()) == ["A", "A > B", "A > B > C", "D"]
+
+
+def test_max_depth_guards_deep_nesting():
+    org_str = "".join("*" * (i + 1) + f" H{i}\n  <2022-01-01 Sat>\n" for i in range(5000))
+    converter = org2ical.Converter(limits=org2ical.Limits(max_depth=100))
+    events, warnings = converter.events(converter.parse(org_str))
+    assert len(events) == 100
+    assert warnings == ["WARNING: Skipped 4900 nodes deeper than level 100."]
+
+
+def test_directive_patterns_are_linear():
+    hostile = "#+TODO: A" + " " * 20000 + "B (" + "(" * 20000 + "\n"
+    assert _elapsed(include._scan_text, hostile, ".", (0, 0)) < 0.5
+    assert _elapsed(include._parse_todo_line, "TODO" + "(" * 20000 + " DONE") < 0.5
@@ -0,0 +1,93 @@
+import textwrap
+from datetime import datetime
+
+import pytest
+
+import org2ical
+from org2ical import lint
+from org2ical.cli import main
+
+NOW = datetime(2022, 1, 1)
+
+ORG_STR = textwrap.dedent("""\
+    * TODO Report
+      SCHEDULED: <2022-01-05 Wed>
+      SCHEDULED: <2022-01-06 Thu>
+    * Broken
+      DEADLINE:
+    * Fine
+      DEADLINE: <2022-01-10 Mon>
+    * DONE Ignored
+      SCHEDULED:
+    * Anniversary
+      <%%(diary-float t 9 1)>
+    ** Deep
+       SCHEDULED:
+    """)
+
+
+@pytest.mark.parametrize("options", [
+    {},
+    {"include_types": {"SCHEDULED", "DEADLINE", "DIARY"}},
+    {"include_types": {"DIARY"}},
+    {"include_types": {"SCHEDULED", "DIARY"}, "max_warnings": 1},
+    {"include_types": {"SCHEDULED", "DEADLINE"}, "limits": org2ical.Limits(max_depth=1)},
+    {"ignore_states": set()},
+    {"max_warnings": 0},
+])
+def test_check_matches_conversion(options):
+    assert lint.check(ORG_STR, now=NOW, **options) == org2ical.loads(ORG_STR, now=NOW, **options)[1]
+
+
+def test_line_numbers():
+    warnings = lint.check(ORG_STR, include_types={"SCHEDULED", "DEADLINE", "DIARY"})
+    assert [(w.line, w.code) for w in warnings] == [
+        (1, "multiple-keywords"),
+        (4, "missing-timestamp"),
+        (10, "invalid-diary"),
+        (12, "missing-timestamp"),
+    ]
+
+
+def test_check_does_not_build_events(monkeypatch):
+    monkeypatch.setattr(org2ical.Converter, "_node_context",
+                        lambda *args: pytest.fail("built a node context"))
+    assert len(lint.check(ORG_STR, include_types={"SCHEDULED", "DEADLINE", "DIARY"})) == 4
+
+
+def test_cli_check(tmp_path, capsys):
+    path = tmp_path / "notes.org"
+    path.write_text(ORG_STR, encoding="utf-8")
+    assert main([str(path), "--check", "--include-type", "DEADLINE"]) == 1
+    assert capsys.readouterr().out == (
+        f"{path}:4: WARNING: DEADLINE keyword found but no timestamp in node: `Broken`.\n")
+    assert main([str(path), "--check", "-q"]) == 1
+    assert capsys.readouterr().out == ""
+    assert main([str(path), "--check", "--include-type", "TIMESTAMP"]) == 0
+
+
+def test_cli_check_includes(tmp_path, capsys):
+    (tmp_path / "inc.org").write_text(
+        "* Included\n  body\n* Bad include\n  SCHEDULED:\n", encoding="utf-8")
+    (tmp_path / "snippet.org").write_text(
+        "* One\n* Two\n  SCHEDULED:\n", encoding="utf-8")
+    main_org = tmp_path / "main.org"
+    main_org.write_text(
+        '#+INCLUDE: "inc.org"\n'
+        '#+INCLUDE: "snippet.org" :lines "2-" src org\n'
+        "* Main\n  SCHEDULED:\n", encoding="utf-8")
+    assert main([str(main_org), "--check", "--include-type", "SCHEDULED"]) == 1
+    assert capsys.readouterr().out.splitlines() == [
+        f"{tmp_path / 'inc.org'}:3: WARNING: SCHEDULED keyword found but no timestamp "
+        "in node: `Bad include`.",
+        f"{tmp_path / 'snippet.org'}:2: WARNING: SCHEDULED keyword found but no timestamp "
+        "in node: `Two`.",
+        f"{main_org}:3: WARNING: SCHEDULED keyword found but no timestamp in node: `Main`.",
+    ]
+    org_file = org2ical.include.Loader().load(str(main_org))
+    lines = org_file.text.splitlines()
+    assert [org_file.locate(i + 1) for i, line in enumerate(lines) if line.startswith("*")] == [
+        (str(tmp_path / "inc.org"), 1), (str(tmp_path / "inc.org"), 3),
+        (str(tmp_path / "snippet.org"), 2), (str(main_org), 3)]
+    assert org_file.locate(lines.index("#+BEGIN_SRC org") + 1) == (str(main_org), 2)
+    assert org_file.locate(lines.index("#+END_SRC") + 1) == (str(main_org), 2)
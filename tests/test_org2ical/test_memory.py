@@ -0,0 +1,33 @@
+import importlib.util
+import os
+import textwrap
+
+# Peak memory of a full conversion per input byte (i.e. MB per input MB).
+# Currently about 22; lower this when memory use improves.
+PEAK_BYTES_PER_INPUT_BYTE = 32
+
+_spec = importlib.util.spec_from_file_location(
+    "memory_benchmark",
+    os.path.join(os.path.dirname(__file__), "..", "..", "benchmarks", "memory.py"))
+memory = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(memory)
+
+
+def test_memory_phases():
+    stats = memory.measure(textwrap.dedent("""\
+    * Meet Peter at the movies
+      <2006-11-01 Wed 19:15>
+    * TODO Call Trillian for a date on New Years Eve.
+      SCHEDULED: <2004-12-25 Sat>
+    """))
+    assert stats["events_count"] == 2
+    for phase in memory.PHASES + ["peak"]:
+        assert stats[phase] > 0
+
+
+def test_peak_memory_per_input_mb():
+    stats = memory.measure(memory.synthetic_org(1000))
+    ratio = stats["peak"] / stats["input"]
+    assert stats["events_count"] > 1000
+    assert ratio < PEAK_BYTES_PER_INPUT_BYTE, \
+        f"peak: {stats['peak']} B for {stats['input']} B input ({ratio:.1f}x)"
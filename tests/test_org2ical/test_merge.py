@@ -0,0 +1,115 @@
+import textwrap
+from datetime import datetime
+import tracemalloc
+
+import icalendar
+
+import org2ical
+from org2ical.cli import main
+from org2ical.merge import MergeResult, merge, merge_file
+
+MANUAL = textwrap.dedent("""\
+    BEGIN:VEVENT
+    UID:manual-1
+    DTSTART:20220101T100000Z
+    SUMMARY:Dentist
+    END:VEVENT
+    """)
+
+
+def _entries(org_str, now=datetime(2021, 1, 1)):
+    return org2ical.loads(org_str, now=now, just_entries=True)[0]
+
+
+def _summaries(ical_str):
+    cal = icalendar.Calendar.from_ical(ical_str)
+    return [str(c["summary"]) for c in cal.walk() if c.name == "VEVENT"]
+
+
+def test_merge_replaces_owned_events(tmp_path):
+    path = tmp_path / "calendar.ics"
+    result = merge_file(str(path), _entries("* A\n  <2022-01-01 Sat>\n* B\n  <2022-01-02 Sun>\n"))
+    assert result == MergeResult(0, 0, 0, 2)
+    assert _summaries(path.read_text(encoding="utf-8")) == ["A", "B"]
+
+    # Add a manual event, with CRLF line endings like most clients write.
+    text = path.read_text(encoding="utf-8").replace(
+        "END:VCALENDAR", MANUAL + "END:VCALENDAR").replace("\n", "\r\n")
+    path.write_bytes(text.encode("utf-8"))
+
+    result = merge_file(str(path), _entries("* A\n  <2022-01-01 Sat>\n* C\n  <2022-01-03 Mon>\n"))
+    assert result == MergeResult(kept=1, replaced=1, removed=1, added=1)
+    data = path.read_bytes()
+    assert b"\n" not in data.replace(b"\r\n", b"")
+    assert _summaries(data.decode("utf-8")) == ["A", "Dentist", "C"]
+    assert MANUAL.replace("\n", "\r\n").encode("utf-8") in data
+    assert data.count(b"BEGIN:VTIMEZONE") == 1
+
+
+def test_merge_matches_across_runs(tmp_path):
+    path = tmp_path / "calendar.ics"
+    org_str = "* A\n  <2022-01-01 Sat>\n* A\n  <2022-01-01 Sat>\n* B\n  <2022-01-02 Sun>\n"
+    merge_file(str(path), _entries(org_str))
+    before = path.read_text(encoding="utf-8")
+    text = before.replace("END:VCALENDAR", MANUAL + "END:VCALENDAR")
+    path.write_text(text, encoding="utf-8")
+
+    # A later run stamps the events differently, but they are the same.
+    result = merge_file(str(path), _entries(org_str, now=datetime(2021, 6, 1)))
+    assert result == MergeResult(kept=1, replaced=3, removed=0, added=0)
+    assert path.read_text(encoding="utf-8") == text
+    assert _summaries(text) == ["A", "A", "B", "Dentist"]
+
+
+def test_merge_sources(tmp_path):
+    path = tmp_path / "calendar.ics"
+    merge_file(str(path), _entries("* Work\n  <2022-01-01 Sat>\n"), source="work")
+    merge_file(str(path), _entries("* Home\n  <2022-01-01 Sat>\n"), source="home")
+    merge_file(str(path), "", source="work")
+    ical_str = path.read_text(encoding="utf-8")
+    assert _summaries(ical_str) == ["Home"]
+    assert "X-ORG2ICAL:home" in ical_str
+
+
+def test_merge_bounded_memory():
+    def existing(n):
+        yield "BEGIN:VCALENDAR\n"
+        for i in range(n):
+            yield "BEGIN:VEVENT\n"
+            yield f"UID:manual-{i}\n"
+            yield "SUMMARY:" + "x" * 200 + "\n"
+            yield "END:VEVENT\n"
+        yield "END:VCALENDAR\n"
+
+    class Sink:
+        size = 0
+
+        def write(self, s):
+            self.size += len(s)
+
+        def writelines(self, lines):
+            for line in lines:
+                self.write(line)
+
+    sink = Sink()
+    tracemalloc.start()
+    try:
+        result = merge(existing(20000), _entries("* A\n  <2022-01-01 Sat>\n"), sink)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert result == MergeResult(20000, 0, 0, 1)
+    assert sink.size > 4_000_000
+    assert peak < 200_000
+
+
+def test_cli_merge(tmp_path, capsys):
+    org = tmp_path / "a.org"
+    org.write_text("* Entry\n  <2022-01-01 Sat>\n", encoding="utf-8")
+    ics = tmp_path / "calendar.ics"
+    ics.write_text("BEGIN:VCALENDAR\nVERSION:2.0\n" + MANUAL + "END:VCALENDAR\n", encoding="utf-8")
+    assert main([str(org), "--merge", str(ics)]) == 0
+    assert _summaries(capsys.readouterr().out) == ["Dentist", "Entry"]
+    assert main([str(org), "--merge", str(ics), "-o", str(ics)]) == 0
+    assert main([str(org), "--merge", str(ics), "-o", str(ics)]) == 0
+    assert _summaries(ics.read_text(encoding="utf-8")) == ["Dentist", "Entry"]
@@ -0,0 +1,72 @@
+import textwrap
+from datetime import datetime, timedelta
+
+import pytest
+
+import org2ical
+from org2ical import profiles
+
+NOW = datetime(2022, 1, 1)
+
+ORG_STR = textwrap.dedent("""\
+    #+TODO: TODO NEXT | DONE
+    * NEXT Report :work:
+      DEADLINE: <2022-01-10 Mon>
+      SCHEDULED: <2022-01-05 Wed>
+      SCHEDULED: <2022-01-06 Thu>
+    * Standup :work:
+      <2022-01-03 Mon 09:00-09:15 +1w>
+      :LOGBOOK:
+      CLOCK: [2022-01-03 Mon 09:00]--[2022-01-03 Mon 09:20] =>  0:20
+      :END:
+    * Dinner :private:
+      <2022-01-04 Tue 19:00>
+    ** Long notes
+       <2022-01-05 Wed>
+       Lorem ipsum dolor sit amet, consectetur adipiscing elit.
+    * DONE Old
+      DEADLINE: <2021-12-01 Wed>
+    * Regular
+      <%%(diary-float t 2 1)>
+    """)
+
+PROFILES = {
+    "deadlines": {"include_types": {"DEADLINE", "SCHEDULED"}, "categories": {"DUE"}},
+    "meetings": {"include_types": {"TIMESTAMP", "DIARY"}, "ignore_tags": {"private"}},
+    "timelog": {"include_types": {"CLOCK"}, "clock_merge": org2ical.DAY},
+    "work": {"include_types": {"TIMESTAMP", "DEADLINE", "CLOCK"}, "select": "+work"},
+    "limited": {"include_types": {"TIMESTAMP"},
+                "limits": org2ical.Limits(max_events=2, max_body_length=20, max_depth=1)},
+    "quiet": {"include_types": {"SCHEDULED"}, "max_warnings": 0},
+    "vienna": {"include_types": {"TIMESTAMP"}, "to_tz": org2ical.timezone(timedelta(hours=1))},
+    "states": {"include_types": {"DEADLINE"}, "todo_states": ["TODO"], "done_states": ["DONE"]},
+}
+
+
+@pytest.mark.parametrize("just_entries", [False, True])
+def test_profiles_match_separate_conversions(just_entries):
+    results = profiles.loads(ORG_STR, {name: dict(options, now=NOW)
+                                       for name, options in PROFILES.items()},
+                             just_entries=just_entries)
+    assert list(results) == list(PROFILES)
+    for name, options in PROFILES.items():
+        expected = org2ical.loads(ORG_STR, now=NOW, just_entries=just_entries, **options)
+        assert results[name] == expected, name
+    assert "DUE" in results["deadlines"][0]
+    assert [str(w) for w in results["deadlines"][1]] == [
+        "WARNING: SCHEDULED keyword found but no timestamp in node: `Report`."]
+    assert results["quiet"][1] == []
+
+
+def test_single_traversal(monkeypatch):
+    calls = []
+    traverse = org2ical._traverse
+    monkeypatch.setattr(org2ical, "_traverse",
+                        lambda *args: calls.append(len(args[2])) or traverse(*args))
+    converters = {name: org2ical.Converter(now=NOW, **options)
+                  for name, options in PROFILES.items() if name in ("deadlines", "meetings", "work")}
+    source = converters["work"].parse(ORG_STR)
+    results = profiles.events(source, converters)
+    assert calls == [3]
+    for name, converter in converters.items():
+        assert results[name] == converter.events(source), name
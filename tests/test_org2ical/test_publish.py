@@ -0,0 +1,67 @@
+import gzip
+import hashlib
+import os
+
+import pytest
+
+from org2ical.cli import main
+from org2ical.publish import MANIFEST, publish
+
+
+def _publish(tmp_path, org, *args):
+    out = tmp_path / "site" / "calendar.ics"
+    out.parent.mkdir(exist_ok=True)
+    assert main([str(org), "-o", str(out), "--publish",
+                 "--category", "ORG", "--category", "HOME", *args]) == 0
+    return out
+
+
+def _uids(data):
+    return [line for line in data.decode("utf-8").splitlines() if line.startswith("UID:")]
+
+
+def test_publish_only_on_change(tmp_path):
+    org = tmp_path / "a.org"
+    org.write_text("* Entry\n  SCHEDULED: <2022-01-01 Sat>\n* Other\n  <2022-01-05 Wed>\n",
+                   encoding="utf-8")
+    out = _publish(tmp_path, org)
+    first = out.read_bytes()
+    assert b"DTSTAMP:19700101T000000Z" in first
+    assert b"CATEGORIES:HOME,ORG,SCHEDULED" in first
+    assert gzip.decompress((tmp_path / "site" / "calendar.ics.gz").read_bytes()) == first
+    manifest = (tmp_path / "site" / MANIFEST).read_text(encoding="utf-8")
+    assert f"{hashlib.sha256(first).hexdigest()}  calendar.ics\n" in manifest
+    mtimes = {p: os.stat(p).st_mtime_ns for p in (out.parent).iterdir()}
+
+    # A later run with the same input keeps every file as it is.
+    os.utime(org)
+    out = _publish(tmp_path, org)
+    assert out.read_bytes() == first
+    assert {p: os.stat(p).st_mtime_ns for p in (out.parent).iterdir()} == mtimes
+
+    # A changed event gets a new UID, the others keep theirs.
+    org.write_text("* Entry\n  SCHEDULED: <2022-01-02 Sun>\n* Other\n  <2022-01-05 Wed>\n",
+                   encoding="utf-8")
+    out = _publish(tmp_path, org)
+    second = out.read_bytes()
+    assert _uids(second)[1] == _uids(first)[1]
+    assert _uids(second)[0] != _uids(first)[0]
+    assert gzip.decompress((tmp_path / "site" / "calendar.ics.gz").read_bytes()) == second
+    assert sorted(os.listdir(out.parent)) == [MANIFEST, "calendar.ics", "calendar.ics.gz"]
+
+    out = _publish(tmp_path, org, "--now", "2021-06-01T00:00:00")
+    assert b"DTSTAMP:20210601T000000Z" in out.read_bytes()
+
+
+def test_publish_manifest(tmp_path):
+    assert publish(str(tmp_path / "a.ics"), "A\n", compress=False)
+    assert publish(str(tmp_path / "b.ics"), "B\n")
+    assert not publish(str(tmp_path / "b.ics"), "B\n")
+    lines = (tmp_path / MANIFEST).read_text(encoding="utf-8").splitlines()
+    assert [line.split("  ")[1] for line in lines] == ["a.ics", "b.ics", "b.ics.gz"]
+    assert lines[0].split("  ")[0] == hashlib.sha256(b"A\n").hexdigest()
+
+
+def test_publish_requires_output(capsys):
+    with pytest.raises(SystemExit):
+        main(["--publish"])
@@ -4,6 +4,8 @@ Test samples found online
 
 import textwrap
 
+import org2ical
+
 from .utils import iCalEntry, compare
 
 
@@ -179,4 +181,44 @@ def test_location_properties():
         iCalEntry("2025-02-05 09:30:00+00:00", "2025-02-05 11:30:00+00:00", "Test duration <2025-02-05 Wed 09:30-11:30>", "", "TIMESTAMP", path_override="Test duration <2025-02-05 Wed 09:30-11:30>", location="Gösser Bräu Graz, Neutorgasse 48, A-8010 Graz"),
 
     ]
-    compare(org_str, icals)
\ No newline at end of file
+    compare(org_str, icals)
+
+# Ref: https://orgmode.org/manual/Timestamps.html (diary-style expression entries)
+def test_diary_sexps():
+    org_str = textwrap.dedent("""\
+    * Calendar
+    ** First Monday in March and September
+      <%%(diary-float '(3 9) 1 1)>
+    ** Last Friday on or before the 20th
+      <%%(diary-float t 5 -1 20)>
+    ** Birthday
+      <%%(diary-anniversary 10 31 1948)>
+    ** 10:00-12:00 Course
+      <%%(diary-block 2022 1 3 2022 1 7)>
+    ** Vacation
+      <%%(diary-block 7 1 2022 7 14 2022)>
+    ** Water plants
+      <%%(diary-cyclic 3 1 1 2022) 8:00>
+    ** Invalid <%%(diary-float t 9 1)>
+    ** Unsupported
+      <%%(diary-lunar-phases)>""")
+
+    icals = [
+        iCalEntry("1985-01-01", "1985-01-02", "First Monday in March and September", "  <%%(diary-float '(3 9) 1 1)>", "REGULAR", "FREQ=YEARLY;INTERVAL=1;BYDAY=1MO;BYMONTH=3,9", parents=["Calendar"]),
+        iCalEntry("1985-01-01", "1985-01-02", "Last Friday on or before the 20th", "  <%%(diary-float t 5 -1 20)>", "REGULAR", "FREQ=MONTHLY;INTERVAL=1;BYDAY=FR;BYMONTHDAY=14,15,16,17,18,19,20", parents=["Calendar"]),
+        iCalEntry("1948-10-31", "1948-11-01", "Birthday", "  <%%(diary-anniversary 10 31 1948)>", "REGULAR", "FREQ=YEARLY;INTERVAL=1", parents=["Calendar"]),
+        iCalEntry("2022-01-03 10:00:00+01:00", "2022-01-03 12:00:00+01:00", "Course", "  <%%(diary-block 2022 1 3 2022 1 7)>", "REGULAR", "FREQ=DAILY;COUNT=5", parents=["Calendar"], path_override="10:00-12:00 Course"),
+        iCalEntry("2022-07-01", "2022-07-15", "Vacation", "  <%%(diary-block 7 1 2022 7 14 2022)>", "REGULAR", parents=["Calendar"]),
+        iCalEntry("2022-01-01 08:00:00+01:00", "2022-01-01 09:00:00+01:00", "Water plants", "  <%%(diary-cyclic 3 1 1 2022) 8:00>", "REGULAR", "FREQ=DAILY;INTERVAL=3", parents=["Calendar"]),
+    ]
+    warnings = [
+        "WARNING: Invalid diary-float in node: `Calendar > Invalid <%%(diary-float t 9 1)>`.",
+        "WARNING: Unsupported diary sexp `diary-lunar-phases` in node: `Calendar > Unsupported`.",
+    ]
+
+    compare(org_str, icals, warnings, include_types={"DIARY"})
+    # Untimed sexps are all-day events in no time zone
+    ical_str, _ = org2ical.loads(org_str, include_types={"DIARY"})
+    assert "DTSTART;VALUE=DATE:19481031\nDTEND:19481101\n" in ical_str
+    assert "DTSTART;VALUE=DATE:20220701\nDTEND:20220715\n" in ical_str
+    assert "DTSTART;TZID=Europe/Vienna:20220103T100000\n" in ical_str
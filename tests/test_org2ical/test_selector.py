@@ -0,0 +1,65 @@
+import textwrap
+
+import pytest
+
+import org2ical
+from org2ical.cli import main
+from org2ical.selector import compile_selector
+
+ORG_STR = textwrap.dedent("""\
+    #+CATEGORY: home
+    * Projects :work:
+    :PROPERTIES:
+    :CATEGORY: job
+    :END:
+    ** NEXT [#A] Write report
+       SCHEDULED: <2022-01-03 Mon>
+    ** TODO Review :someday:
+    :PROPERTIES:
+    :LOCATION: Room 1
+    :END:
+       SCHEDULED: <2022-01-04 Tue>
+    * TODO Groceries :errand:
+      SCHEDULED: <2022-01-05 Wed>
+    """)
+
+
+def _selected(select):
+    converter = org2ical.Converter(select=select, todo_states=["TODO", "NEXT"])
+    events, _ = converter.events(converter.parse(ORG_STR))
+    return [event.summary for event in events]
+
+
+@pytest.mark.parametrize("select, summaries", [
+    ("work", ["Write report", "Review"]),
+    ("+work -someday", ["Write report"]),
+    ("work & !someday", ["Write report"]),
+    ("todo=NEXT | errand", ["Write report", "Groceries"]),
+    ("todo!=NEXT", ["Review", "Groceries"]),
+    ("priority=A", ["Write report"]),
+    ("category=job", ["Write report", "Review"]),
+    ("category=home", ["Groceries"]),
+    ('LOCATION="Room 1"', ["Review"]),
+    ("heading={^Gro}", ["Groceries"]),
+    ("path={^Projects > }", ["Write report", "Review"]),
+    ("-(work | errand)", []),
+])
+def test_select(select, summaries):
+    assert _selected(select) == summaries
+
+
+@pytest.mark.parametrize("select", ["", "work |", "(work", "todo=", "heading={(}", "work)"])
+def test_invalid_selector(select):
+    with pytest.raises(ValueError):
+        compile_selector(select)
+
+
+def test_cli_select(tmp_path, capsys):
+    org = tmp_path / "a.org"
+    org.write_text(ORG_STR, encoding="utf-8")
+    assert main([str(org), "--select", "errand", "--just-entries"]) == 0
+    out = capsys.readouterr().out
+    assert "SUMMARY:Groceries" in out
+    assert "SUMMARY:Review" not in out
+    with pytest.raises(SystemExit):
+        main([str(org), "--select", "(errand"])
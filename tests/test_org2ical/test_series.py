@@ -0,0 +1,71 @@
+import textwrap
+from datetime import datetime, timezone
+
+import icalendar
+
+import org2ical
+from org2ical import agenda, series
+
+NOW = datetime(2022, 1, 1)
+UTC = timezone.utc
+
+ORG_STR = textwrap.dedent("""\
+    * Yoga
+      <2022-01-03 Mon 18:00> <2022-01-10 Mon 18:00> <2022-01-17 Mon 18:00>
+      <2022-01-05 Wed 07:00> <2022-01-06 Thu 07:00> <2022-01-09 Sun 07:00>
+    * Rent
+      <2022-01-31 Mon> <2022-03-31 Thu> <2022-05-31 Tue>
+    * Course
+      <2022-01-04 Tue 10:00-12:00> <2022-01-06 Thu 10:00-12:00>
+      <2022-01-13 Thu 10:00-12:00> <2022-01-20 Thu 10:00-11:00>
+      <2022-02-01 Tue 10:00 +1w>
+    """)
+
+
+def _events(**options):
+    converter = org2ical.Converter(now=NOW, **options)
+    events, warnings = converter.events(converter.parse(ORG_STR))
+    assert warnings == []
+    return events
+
+
+def test_collapse():
+    events = _events(collapse_series=True)
+    assert [(e.summary, e.start, e.rrule, e.rdates) for e in events] == [
+        ("Yoga", "20220103T180000Z", "RRULE:FREQ=WEEKLY;INTERVAL=1;COUNT=3", ()),
+        ("Yoga", "20220105T070000Z", "", ("20220106T070000Z", "20220109T070000Z")),
+        ("Rent", "20220131", "RRULE:FREQ=MONTHLY;INTERVAL=2;COUNT=3", ()),
+        ("Course", "20220201T100000Z", "RRULE:FREQ=WEEKLY;INTERVAL=1", ()),
+        ("Course", "20220104T100000Z", "", ("20220106T100000Z", "20220113T100000Z")),
+        ("Course", "20220120T100000Z", "", ()),
+    ]
+    assert events[0].end == "20220103T190000Z"
+    assert events[4].end == "20220104T120000Z"
+
+
+def test_same_occurrences():
+    start, end = datetime(2022, 1, 1, tzinfo=UTC), datetime(2023, 1, 1, tzinfo=UTC)
+
+    def occurrences(events):
+        return sorted((o.event.summary, o.start, o.end)
+                      for o in agenda.Calendar(events).between(start, end))
+
+    assert occurrences(_events(collapse_series=True)) == occurrences(_events())
+    assert len(_events(collapse_series=True)) < len(_events())
+
+
+def test_ical_output():
+    ical_str, _ = org2ical.loads(ORG_STR, now=NOW, collapse_series=True)
+    assert "RDATE:20220106T070000Z,20220109T070000Z\n" in ical_str
+    calendar = icalendar.Calendar.from_ical(ical_str)
+    assert len([c for c in calendar.walk() if c.name == "VEVENT"]) == 6
+    # Off by default
+    assert "RDATE" not in org2ical.loads(ORG_STR, now=NOW)[0]
+
+
+def test_all_day_rdates():
+    events = [org2ical.Event(start, None, "A", "", set(), is_dayevent=True)
+              for start in ("20220110", "20220103", "20220104")]
+    collapsed, = series.collapse(events)
+    assert (collapsed.start, collapsed.rdates) == ("20220103", ("20220104", "20220110"))
+    assert "RDATE;VALUE=DATE:20220104,20220110\n" in org2ical.Converter().dumps([collapsed])
@@ -0,0 +1,95 @@
+import textwrap
+from datetime import datetime
+
+import org2ical
+from org2ical.cli import main
+from org2ical.store import Store, UpdateResult
+
+NOW = datetime(2022, 1, 1)
+OPTIONS = {"now": NOW, "include_types": {"TIMESTAMP", "DEADLINE"}, "categories": {"ORG"}}
+
+
+def _write(path, text):
+    path.write_text(textwrap.dedent(text), encoding="utf-8")
+    return str(path)
+
+
+def _files(tmp_path):
+    work = _write(tmp_path / "work.org", """\
+    * Projects
+    ** Report :work:
+       DEADLINE: <2022-01-10 Mon>
+    ** Standup :work:
+       <2022-01-03 Mon 09:00-09:15 +1w>
+    """)
+    home = _write(tmp_path / "home.org", """\
+    #+TODO: TODO WAIT | DONE
+    * WAIT Dentist
+      <2021-06-01 Tue 14:00>
+    * DONE Taxes
+      DEADLINE: <2021-04-30 Fri>
+    """)
+    return work, home
+
+
+def test_update_is_incremental(tmp_path):
+    work, home = _files(tmp_path)
+    with Store(str(tmp_path / "events.db"), **OPTIONS) as store:
+        assert store.update([work, home]) == (UpdateResult(2, 0, 0, 3, 0), [])
+        assert store.update([work, home]) == (UpdateResult(0, 2, 0, 0, 0), [])
+        _write(tmp_path / "work.org", """\
+        * Projects
+        ** Report :work:
+           DEADLINE: <2022-01-12 Wed>
+        ** Standup :work:
+           <2022-01-03 Mon 09:00-09:15 +1w>
+        """)
+        assert store.update([work, home]) == (UpdateResult(1, 1, 0, 1, 1), [])
+        assert store.update([work], prune=True) == (UpdateResult(0, 1, 1, 0, 1), [])
+        assert [e.summary for e in store.events()] == ["Standup", "Report"]
+
+    # Other options convert everything again
+    with Store(str(tmp_path / "events.db"), **dict(OPTIONS, categories=set())) as store:
+        assert store.update([work]) == (UpdateResult(1, 0, 0, 2, 2), [])
+
+
+def test_queries(tmp_path):
+    work, home = _files(tmp_path)
+    with Store(str(tmp_path / "events.db"), **OPTIONS) as store:
+        store.update([work, home])
+        assert [e.summary for e in store.events()] == ["Dentist", "Standup", "Report"]
+        assert [e.summary for e in store.events(start=datetime(2022, 1, 4))] == [
+            "Standup", "Report"]
+        assert [e.summary for e in store.events(end=datetime(2022, 1, 3, 9))] == ["Dentist"]
+        assert [e.summary for e in store.events(
+            start=datetime(2021, 6, 1, 14, 30), end=datetime(2021, 6, 2))] == ["Dentist"]
+        assert [e.summary for e in store.events(category="DEADLINE")] == ["Report"]
+        assert [e.summary for e in store.events(path="Projects > S")] == ["Standup"]
+        assert [e.summary for e in store.events(file=home)] == ["Dentist"]
+        assert store.events(category="ORG", start=datetime(2023, 1, 1)) == [
+            e for e in store.events(file=work) if e.rrule]
+
+        plan = store._db.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM events WHERE start_utc < ?", ("2022",)).fetchall()
+        assert "events_start" in str(plan)
+
+
+def test_dumps_matches_conversion(tmp_path):
+    work, _ = _files(tmp_path)
+    with Store(str(tmp_path / "events.db"), **OPTIONS) as store:
+        store.update([work])
+        # The same events, sorted by start instead of in file order
+        stored = store.dumps(file=work, now=NOW, just_entries=True).split("BEGIN:VEVENT")
+        converted = org2ical.load(work, just_entries=True, **OPTIONS)[0].split("BEGIN:VEVENT")
+        assert sorted(e.strip() for e in stored) == sorted(e.strip() for e in converted)
+        assert [e.summary for e in store.events(file=work)] == ["Standup", "Report"]
+
+
+def test_cli_store(tmp_path, capsys):
+    work, home = _files(tmp_path)
+    database = str(tmp_path / "events.db")
+    assert main([work, home, "--store", database]) == 0
+    assert main([work, home, "--store", database]) == 0
+    with Store(database) as store:
+        assert store.update([work, home])[0].unchanged == 2
+        assert len(store.events()) == 3
@@ -0,0 +1,69 @@
+import textwrap
+import threading
+from datetime import datetime
+
+import org2ical
+
+NOW = datetime(2022, 1, 1)
+OPTIONS = {
+    "now": NOW,
+    "include_types": {org2ical.TIMESTAMP, org2ical.SCHEDULED, org2ical.CLOCK, org2ical.DIARY},
+    "clock_merge": org2ical.DAY,
+}
+
+
+def _document(i):
+    return textwrap.dedent(f"""\
+    * Meeting {i}
+      <2022-01-{1 + i % 28:02d} Sat 1{i % 10}:00>
+    * TODO Task {i}
+      SCHEDULED: <2022-02-{1 + i % 28:02d} Tue>
+      SCHEDULED: <2022-02-02 Wed>
+    * Clocked {i}
+      :LOGBOOK:
+      CLOCK: [2022-01-03 Mon 09:00]--[2022-01-03 Mon 10:{i % 60:02d}] =>  1:{i % 60:02d}
+      :END:
+    * Regular {i}
+      <%%(diary-float t {i % 7} 1)>
+    """)
+
+
+def test_loads_many_matches_serial():
+    documents = [_document(i) for i in range(40)]
+    expected = [org2ical.loads(doc, **OPTIONS) for doc in documents]
+    assert org2ical.loads_many(documents, max_workers=8, **OPTIONS) == expected
+    assert org2ical.loads_many([], max_workers=2, **OPTIONS) == []
+
+
+def test_shared_converter_is_reentrant():
+    converter = org2ical.Converter(**OPTIONS)
+    documents = [_document(i) for i in range(8)]
+    expected = [converter.loads(doc) for doc in documents]
+    barrier = threading.Barrier(len(documents))
+    results = [None] * len(documents)
+
+    def convert(i):
+        barrier.wait()
+        results[i] = [converter.loads(documents[i]) for _ in range(5)]
+
+    threads = [threading.Thread(target=convert, args=(i,)) for i in range(len(documents))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for i, result in enumerate(results):
+        assert result == [expected[i]] * 5
+
+
+def test_load_many_shares_loader(tmp_path):
+    (tmp_path / "shared.org").write_text("* Shared\n  <2022-01-01 Sat>\n", encoding="utf-8")
+    paths = []
+    for i in range(6):
+        path = tmp_path / f"{i}.org"
+        path.write_text(f"#+INCLUDE: \"shared.org\"\n* Own {i}\n  <2022-01-02 Sun>\n",
+                        encoding="utf-8")
+        paths.append(str(path))
+    loader = org2ical.include.Loader()
+    results = org2ical.load_many(paths, max_workers=3, loader=loader, now=NOW)
+    assert results == [org2ical.load(path, now=NOW) for path in paths]
+    assert 7 <= loader.reads <= 12  # Each file at least once, `shared.org` at most once per file
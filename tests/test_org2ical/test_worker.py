@@ -0,0 +1,126 @@
+import io
+import json
+import textwrap
+
+from org2ical.worker import (INVALID_PARAMS, METHOD_NOT_FOUND, PARSE_ERROR,
+                             SERVER_ERROR, Worker, serve)
+
+
+def _request(worker, method, params=None, request_id=1):
+    line = json.dumps({"jsonrpc": "2.0", "id": request_id,
+                       "method": method, "params": params})
+    return json.loads(worker.handle_line(line))
+
+
+def test_convert_text():
+    worker = Worker()
+    org_str = textwrap.dedent("""\
+    * Meet Peter at the movies
+      <2006-11-01 Wed 19:15>
+    * Entry
+    SCHEDULED:
+    """)
+    response = _request(worker, "convert", {
+        "text": org_str,
+        "options": {"now": "2021-01-01T00:00:00", "categories": ["ORG"]},
+    })
+    result = response["result"]
+    assert response["id"] == 1
+    assert [e["summary"] for e in result["events"]] == ["Meet Peter at the movies"]
+    assert result["events"][0]["start"] == "20061101T191500Z"
+    assert result["events"][0]["categories"] == ["ORG", "TIMESTAMP"]
+    assert result["warnings"] == [{
+        "code": "missing-timestamp",
+        "message": "SCHEDULED keyword found but no timestamp",
+        "line": 3,
+        "path": "Entry",
+        "text": "WARNING: SCHEDULED keyword found but no timestamp in node: `Entry`.",
+    }]
+    assert result["ical"].startswith("BEGIN:VCALENDAR")
+    assert "DTSTAMP:20210101T000000Z" in result["ical"]
+
+
+def test_update_path(tmp_path):
+    worker = Worker()
+    org = tmp_path / "a.org"
+    ics = tmp_path / "a.ics"
+    org.write_text("* Entry\n  <2022-01-01 Sat>\n", encoding="utf-8")
+    params = {"path": str(org), "output": str(ics)}
+    result = _request(worker, "update", params)["result"]
+    assert result["changed"] is True
+    assert "ical" not in result
+    assert "SUMMARY:Entry" in ics.read_text(encoding="utf-8")
+
+    assert _request(worker, "update", params)["result"] == {"changed": False}
+
+    params["options"] = {"include_types": ["DEADLINE"]}
+    result = _request(worker, "update", params)["result"]
+    assert result["changed"] is True
+    assert result["events"] == []
+
+    org.write_text("* Other\n  DEADLINE: <2022-01-02 Sun>\n", encoding="utf-8")
+    result = _request(worker, "update", params)["result"]
+    assert result["changed"] is True
+    assert [e["summary"] for e in result["events"]] == ["Other"]
+
+
+def test_parse_is_cached():
+    worker = Worker()
+    text = "* Entry\n  <2022-01-01 Sat>\n"
+    _request(worker, "convert", {"text": text})
+    _request(worker, "convert", {"text": text, "options": {"categories": ["A"]}})
+    assert len(worker._parses) == 1
+    assert len(worker._converters) == 2
+    _request(worker, "convert", {"text": text, "options": {"todo_states": ["NEXT"]}})
+    assert len(worker._parses) == 2
+
+
+def test_errors():
+    worker = Worker()
+    assert json.loads(worker.handle_line("{"))["error"]["code"] == PARSE_ERROR
+    assert _request(worker, "nope")["error"]["code"] == METHOD_NOT_FOUND
+    assert _request(worker, "convert", {})["error"]["code"] == INVALID_PARAMS
+    assert _request(worker, "convert", {
+        "text": "", "options": {"include_types": ["X"]},
+    })["error"]["code"] == INVALID_PARAMS
+    assert _request(worker, "convert", {
+        "text": "", "options": {"unknown": 1},
+    })["error"]["code"] == INVALID_PARAMS
+    for options in ({"clock_merge_gap": "5"}, {"categories": "ORG"}, {"todo_states": [1]},
+                    {"collapse_series": "false"}, {"max_warnings": True}, {"prod_id": 1}):
+        assert _request(worker, "convert", {
+            "text": "", "options": options,
+        })["error"]["code"] == INVALID_PARAMS
+    assert "error" in _request(worker, "convert", {"path": "/nonexistent.org"})
+    for params in ({"path": 1}, {"text": "", "document": ["a"]}, {"text": "", "output": 2}):
+        assert _request(worker, "update", params)["error"]["code"] == INVALID_PARAMS
+
+
+def test_conversion_errors_keep_serving(tmp_path):
+    worker = Worker()
+    latin1 = tmp_path / "latin1.org"
+    latin1.write_bytes("* Caf\xe9\n".encode("latin-1"))
+    assert _request(worker, "convert", {"path": str(latin1)})["error"]["code"] == SERVER_ERROR
+    response = _request(worker, "convert", {
+        "text": "* A\n  :PROPERTIES:\n  :BIRTHDAY: 1990-13-45\n  :END:\n",
+        "options": {"include_types": ["BIRTHDAY"]},
+    })
+    assert response["error"]["code"] == SERVER_ERROR
+    assert "result" in _request(worker, "convert", {"text": "* A\n<2022-01-01 Sat>"})
+
+
+def test_serve():
+    lines = [
+        json.dumps({"jsonrpc": "2.0", "method": "convert",
+                    "params": {"text": ""}}),  # Notification
+        json.dumps({"jsonrpc": "2.0", "id": 7, "method": "convert",
+                    "params": {"text": "* A\n<2022-01-01 Sat>"}}),
+        json.dumps({"jsonrpc": "2.0", "id": 8, "method": "shutdown"}),
+        json.dumps({"jsonrpc": "2.0", "id": 9, "method": "convert",
+                    "params": {"text": ""}}),
+    ]
+    stdout = io.StringIO()
+    serve(io.StringIO("\n".join(lines) + "\n"), stdout)
+    responses = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    assert [r["id"] for r in responses] == [7, 8]
+    assert responses[1]["result"] is None
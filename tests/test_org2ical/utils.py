@@ -47,6 +47,7 @@ def compare(org_str: str, icals: List[iCalEntry], warnings=[], *,
         include_types: Set[str] = None,
         from_tz: timezone = timezone.utc,
         to_tz: timezone = timezone.utc,
+        **options,
     ):
     ical_str, warnings_ = org2ical.loads(
         org_str,
@@ -58,6 +59,7 @@ def compare(org_str: str, icals: List[iCalEntry], warnings=[], *,
         include_types=include_types,
         from_tz=from_tz,
         to_tz=to_tz,
+        **options,
     )
     cal = icalendar.Calendar.from_ical(ical_str)
     now = now.replace(tzinfo=to_tz)